@@ -0,0 +1,10 @@
+import numpy as np
+
+
+def grow_array(array, size, fill=0):
+    """Увеличить массив (с запасом) так, чтобы в нём был индекс size - 1"""
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 64), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
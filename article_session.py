@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+
+class Article:
+    """Загруженная статья Википедии"""
+
+    def __init__(self, title, content, summary, url, revision_id=None, language='ru',
+                 redirects=()):
+        self.title = title
+        self.content = content
+        self.summary = summary
+        self.url = url
+        self.revision_id = revision_id
+        self.language = language
+        self.redirects = list(redirects)   # заголовки-перенаправления на статью
+
+    @classmethod
+    def from_dict(cls, data):
+        """Статья из словаря (например, из кэша страниц)"""
+        return cls(data['title'], data['content'], data['summary'], data['url'],
+                   data.get('revision_id'), data.get('language', 'ru'),
+                   data.get('redirects', ()))
+
+    def to_dict(self):
+        """Словарь для кэша страниц"""
+        return {
+            'title': self.title,
+            'content': self.content,
+            'summary': self.summary,
+            'url': self.url,
+            'revision_id': self.revision_id,
+            'language': self.language,
+            'redirects': self.redirects,
+        }
+
+    def to_kb_record(self):
+        """Запись для базы знаний"""
+        return {
+            'content': self.content,
+            'summary': self.summary,
+            'url': self.url,
+            'language': self.language,
+            'redirects': self.redirects,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class ArticleSession:
+    """Статьи текущего сеанса: просмотр, добавление в базу и ответ
+    используют одну и ту же загрузку страницы.
+
+    Одновременные запросы одной статьи ждут единственную загрузку.
+    Статьи разных языковых разделов хранятся под разными ключами.
+    """
+
+    def __init__(self, fetch, max_articles=32):
+        self.fetch = fetch
+        self.max_articles = max_articles
+        self.current = None
+        self._articles = OrderedDict()   # (язык, нормализованный запрос/заголовок) -> Article
+        self._pending = {}               # ключ -> threading.Event
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(topic, language):
+        return language, " ".join(topic.replace("_", " ").lower().split())
+
+    def peek(self, topic, language='ru'):
+        """Статья из сеанса без загрузки (или None)"""
+        key = self._key(topic, language)
+        with self._lock:
+            article = self._articles.get(key)
+            if article is not None:
+                self._articles.move_to_end(key)
+            return article
+
+    def get(self, topic, language='ru', **fetch_options):
+        """Статья из сеанса; загружается не более одного раза"""
+        key = self._key(topic, language)
+        while True:
+            with self._lock:
+                article = self._articles.get(key)
+                if article is not None:
+                    self._articles.move_to_end(key)
+                    return article
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            # Статью уже загружает другой поток - ждём его результата
+            event.wait()
+
+        try:
+            article = self.fetch(topic, language=language, **fetch_options)
+            self.remember(article, topic)
+            return article
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+
+    def remember(self, article, *aliases):
+        """Запомнить статью под её заголовком и под запросами, которые к ней привели"""
+        with self._lock:
+            for name in (article.title,) + aliases:
+                key = self._key(name, article.language)
+                self._articles[key] = article
+                self._articles.move_to_end(key)
+            while len(self._articles) > self.max_articles:
+                self._articles.popitem(last=False)
+
+    def open(self, topic, language='ru', **fetch_options):
+        """Загрузить статью для просмотра и сделать её текущей"""
+        article = self.get(topic, language, **fetch_options)
+        self.current = article
+        return article
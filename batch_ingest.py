@@ -0,0 +1,106 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class RateLimiter:
+    """Ограничение частоты запросов к каждому хосту"""
+
+    def __init__(self, rate=10.0):
+        self.interval = 1.0 / rate
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Дождаться своей очереди на запрос к host"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BatchIngestor:
+    """Параллельная загрузка списка статей с ограничением частоты запросов
+
+    fetch(заголовок, язык, ревизия) загружает одну статью. Если задан
+    resolve(заголовки, язык), заголовки сначала проверяются пачками по
+    resolve_batch за запрос: отсутствующие страницы и неоднозначности
+    отсеиваются без загрузки, несколько заголовков одной статьи загружаются
+    один раз, а fetch получает номер ревизии (None без resolve).
+    resolve возвращает заголовок -> (точный заголовок, ревизия) или исключение.
+    """
+
+    def __init__(self, fetch, max_workers=8, rate=10.0, resolve=None, resolve_batch=50):
+        self.fetch = fetch
+        self.resolve = resolve
+        self.resolve_batch = resolve_batch
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+
+    def _resolve(self, titles, language, host, errors, cancel_event):
+        """Проверить заголовки пачками: заголовок -> (точный заголовок, ревизия)"""
+        targets = {}
+        for start in range(0, len(titles), self.resolve_batch):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            chunk = titles[start:start + self.resolve_batch]
+            self.limiter.acquire(host)
+            try:
+                resolved = self.resolve(chunk, language)
+            except Exception as e:
+                errors.extend((title, e) for title in chunk)
+                continue
+            for title in chunk:
+                target = resolved.get(title)
+                if isinstance(target, Exception):
+                    errors.append((title, target))
+                elif target is not None:
+                    targets[title] = target
+        return targets
+
+    def run(self, titles, language='ru', on_progress=None, cancel_event=None):
+        """Загрузить статьи; вернуть (список статей, список (заголовок, ошибка))"""
+        titles = list(dict.fromkeys(t.strip() for t in titles if t.strip()))
+        host = f"{language}.wikipedia.org"
+        articles, errors = [], []
+
+        if self.resolve is None:
+            targets = {title: (title, None) for title in titles}
+        else:
+            targets = self._resolve(titles, language, host, errors, cancel_event)
+        done = len(errors)
+        if done and on_progress:
+            on_progress(done, len(titles))
+
+        # Перенаправления на одну статью - одна загрузка
+        jobs = {}
+        for title, target in targets.items():
+            jobs.setdefault(target, []).append(title)
+
+        def fetch_one(target):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            self.limiter.acquire(host)
+            return self.fetch(target[0], language, target[1])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="ingest") as executor:
+            futures = {executor.submit(fetch_one, target): requested
+                       for target, requested in jobs.items()}
+            for future in as_completed(futures):
+                requested = futures[future]
+                try:
+                    article = future.result()
+                    if article is not None:
+                        articles.append(article)
+                except Exception as e:
+                    errors.extend((title, e) for title in requested)
+                done += len(requested)
+                if on_progress:
+                    on_progress(done, len(titles))
+
+        # Разные запросы могли привести к одной статье
+        unique = {article.title: article for article in articles}
+        return list(unique.values()), errors
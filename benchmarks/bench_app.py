@@ -0,0 +1,291 @@
+"""Горячие пути приложения на синтетических базах 100 / 10 000 / 100 000 статей
+
+Замеряются загрузка и сохранение базы, поиск по базе, перерисовка вкладки
+базы знаний и ответ на вопрос, в том числе мимо базы (Википедия подменена
+локальной заглушкой, данные NLTK не загружаются - сеть не нужна). Для каждой операции - p50/p95 и пропускная способность,
+для каждого размера - пиковая память процесса. Каждый размер замеряется
+в отдельном процессе.
+
+Запуск из корня проекта:
+    python benchmarks/bench_app.py [--sizes 100,10000,100000] [--save-baseline]
+
+Результаты сравниваются с сохранённым базовым замером (benchmarks/baseline.json);
+операции, ставшие медленнее допуска, отмечаются, и код возврата - 1.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import iter_articles
+
+from engine import WikiEngine
+from kb_store import KnowledgeBaseStore
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class OfflineEngine(WikiEngine):
+    """Движок, у которого Википедия - заглушка с синтетическими статьями"""
+
+    wiki_requests = 0
+
+    def ensure_nltk_data(self):
+        """Только уже установленные данные NLTK: замеры не загружают их из сети"""
+        import nltk
+        try:
+            nltk.data.find('corpora/stopwords')
+            return True
+        except LookupError:
+            return False
+
+    def download_article(self, topic, auto_suggest=True, language='ru'):
+        self.wiki_requests += 1
+        content = f"{topic} - статья-заглушка для замеров. " * 20
+        return {'title': topic, 'content': content, 'summary': content[:300],
+                'url': f"https://{language}.wikipedia.org/wiki/Stub", 'revision_id': 1,
+                'language': language, 'redirects': []}
+
+    def fetch_search_results(self, query, language='ru'):
+        return [f"{query} {i}" for i in range(10)]
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def peak_rss_mb():
+    """Пиковая память процесса в МБ (None, если ОС не сообщает)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает килобайты, macOS - байты
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(func, args_list):
+    """Время каждого вызова func(*args) в секундах"""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples, items=1, unit="оп/с"):
+    """p50/p95 в миллисекундах и пропускная способность (items на вызов)"""
+    ordered = sorted(samples)
+    total = sum(ordered) or 1e-9
+    return {'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+            'p95_ms': round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 3),
+            'throughput': round(items * len(ordered) / total, 1), 'unit': unit,
+            'calls': len(ordered)}
+
+
+def build_store(data_dir, size, words, seed):
+    """Записать синтетическую базу в хранилище; вернуть заголовки"""
+    store = KnowledgeBaseStore(os.path.join(data_dir, "knowledge_base.db"))
+    titles, batch = [], []
+    for title, data in iter_articles(size, words, seed):
+        titles.append(title)
+        batch.append((title, data))
+        if len(batch) >= 1000:
+            with store.transaction():
+                for item in batch:
+                    store.upsert_article(*item)
+            batch = []
+    with store.transaction():
+        for item in batch:
+            store.upsert_article(*item)
+    store.close()
+    return titles
+
+
+def make_queries(rng, titles, engine, count):
+    """Вопросы: заголовки с опечаткой и пары частых слов из текстов"""
+    queries = []
+    for title in rng.sample(titles, min(count // 2, len(titles))):
+        word = title.split()[0]
+        if len(word) > 4:
+            cut = rng.randrange(1, len(word) - 1)
+            word = word[:cut] + word[cut + 1:]
+        queries.append(f"{word} {title.split()[-1]}")
+    words = [word for _, data in engine.knowledge_base.items()
+             for word in data['summary'].split()[:30] if len(word) > 3][:5000]
+    while len(queries) < count:
+        queries.append(" ".join(rng.sample(words, 2)).strip(".").lower())
+    return queries
+
+
+def bench_display(engine, repeat):
+    """Перерисовка вкладки базы знаний (нужен дисплей); None, если окна нет"""
+    try:
+        import tkinter as tk
+        from main import ModernWikipediaAI
+    except ImportError as e:
+        log(f"   update_knowledge_base_display пропущен: {e}")
+        return None
+    try:
+        app = ModernWikipediaAI(engine=engine)
+    except tk.TclError as e:
+        log(f"   update_knowledge_base_display пропущен: {e}")
+        return None
+    try:
+        app.window.withdraw()
+
+        def redraw():
+            app.update_knowledge_base_display()
+            app.window.update_idletasks()
+
+        return measure(redraw, [()] * repeat)
+    finally:
+        app.window.destroy()
+
+
+def run_size(size, words, seed, n_queries):
+    """Все замеры для базы одного размера (выполняется в отдельном процессе)"""
+    rng = random.Random(seed)
+    data_dir = tempfile.mkdtemp(prefix=f"wikiai_bench_{size}_")
+    results = {}
+    try:
+        log(f"▶ {size} статей: генерация базы...")
+        start = time.perf_counter()
+        titles = build_store(data_dir, size, words, seed)
+        log(f"   записано за {time.perf_counter() - start:.1f} с")
+
+        engine = OfflineEngine(data_dir, notify=lambda message: None)
+        results['start'] = summarize(measure(engine.start, [()]), size, "статей/с")
+        log(f"   индексы построены за {results['start']['p50_ms'] / 1000:.1f} с")
+
+        # Повторов меньше для больших баз, но не меньше трёх
+        repeat = max(3, min(30, 300_000 // size))
+        results['load_knowledge_base'] = summarize(
+            measure(engine.load_knowledge_base, [()] * repeat), size, "статей/с")
+        results['save_knowledge_base'] = summarize(
+            measure(engine.save_knowledge_base, [()] * repeat), size, "статей/с")
+        keys = list(engine.knowledge_base)
+        results['save_knowledge_base(key)'] = summarize(
+            measure(engine.save_knowledge_base, [(rng.choice(keys),) for _ in range(200)]))
+
+        queries = make_queries(rng, titles, engine, n_queries)
+        results['search_in_knowledge_base'] = summarize(
+            measure(engine.search_in_knowledge_base, [(q,) for q in queries]))
+
+        # Другие вопросы (без готовых фрагментов и кэша ответов), затем они же повторно
+        queries = make_queries(rng, titles, engine, n_queries)
+        engine.response_cache.invalidate()
+        results['generate_response'] = summarize(
+            measure(engine.generate_response, [(q,) for q in queries]))
+        results['generate_response (кэш)'] = summarize(
+            measure(engine.generate_response, [(q,) for q in queries]))
+
+        # Вопросы мимо базы: ответ через заглушку Википедии
+        misses = [f"ъхщ{i}ыж жщъ{i}ьэ" for i in range(n_queries)]
+        requests_before = engine.wiki_requests
+        results['generate_response (Википедия)'] = summarize(
+            measure(engine.generate_response, [(q,) for q in misses]))
+        log(f"   через заглушку Википедии: {engine.wiki_requests - requests_before} "
+            f"из {len(misses)} вопросов")
+
+        samples = bench_display(engine, 20)
+        if samples is not None:
+            results['update_knowledge_base_display'] = summarize(samples)
+
+        engine.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {'size': size, 'results': results, 'peak_rss_mb': peak_rss_mb()}
+
+
+def print_report(report, baseline, tolerance):
+    """Таблица замеров; возвращает список регрессий"""
+    regressions = []
+    for entry in report:
+        size = str(entry['size'])
+        base = baseline.get(size, {}).get('results', {})
+        print(f"\n=== {entry['size']} статей, пик памяти: {entry['peak_rss_mb']} МБ ===")
+        print(f"{'операция':<32} {'p50, мс':>10} {'p95, мс':>10} {'пропускная сп.':>22}"
+              f" {'к базовому':>11}")
+        for name, row in entry['results'].items():
+            compare = ""
+            if name in base and base[name]['p50_ms'] > 0:
+                ratio = row['p50_ms'] / base[name]['p50_ms']
+                compare = f"{ratio:.2f}x"
+                if ratio > 1 + tolerance:
+                    compare += " ⚠️"
+                    regressions.append((size, name, ratio))
+            throughput = f"{row['throughput']:,.1f} {row['unit']}"
+            print(f"{name:<32} {row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f} {throughput:>22}"
+                  f" {compare:>11}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000",
+                        help="размеры баз через запятую")
+    parser.add_argument("--words", type=int, default=200, help="слов в статье (в среднем)")
+    parser.add_argument("--queries", type=int, default=200, help="вопросов на замер")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="файл базового замера")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="сохранить результаты как новый базовый замер")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="допустимое замедление p50 относительно базового (0.25 = 25%%)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_size(args.child, args.words, args.seed, args.queries),
+                         ensure_ascii=False))
+        return 0
+
+    report = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        # Отдельный процесс на размер: пик памяти не накапливается между замерами
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(size),
+             "--words", str(args.words), "--seed", str(args.seed),
+             "--queries", str(args.queries)],
+            stdout=subprocess.PIPE, text=True, encoding="utf-8", check=True).stdout
+        report.append(json.loads(output.strip().splitlines()[-1]))
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = print_report(report, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({str(entry['size']): entry for entry in report}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"\nБазовый замер сохранён: {args.baseline}")
+    elif not baseline:
+        print("\nБазового замера нет - сохраните его с --save-baseline")
+    elif regressions:
+        print(f"\n⚠️ Медленнее базового более чем на {args.tolerance:.0%}:")
+        for size, name, ratio in regressions:
+            print(f"   {name} ({size} статей): {ratio:.2f}x")
+        return 1
+    else:
+        print("\n✅ Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
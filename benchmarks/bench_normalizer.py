@@ -0,0 +1,71 @@
+"""Скорость нормализации текста (токенов в секунду): до и после словаря основ
+
+Запуск из корня проекта:
+    python benchmarks/bench_normalizer.py [--articles 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nltk.stem import SnowballStemmer
+
+from normalizer import TextNormalizer, TOKEN_RE
+from synthetic import make_articles
+
+
+STOP_WORDS = {"и", "в", "на", "с", "по", "для", "из", "что", "как", "это", "при", "его"}
+
+
+def baseline(stemmer, texts):
+    """Прежний способ: Snowball для каждого токена"""
+    for text in texts:
+        for token in TOKEN_RE.findall(text.lower()):
+            if len(token) < 2 or token in STOP_WORDS:
+                continue
+            stemmer.stem(token)
+
+
+def measure(name, func, tokens):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed:8.3f} с  {tokens / elapsed:12,.0f} токенов/с")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=500)
+    args = parser.parse_args()
+
+    texts = [data['content'] for _, data in make_articles(args.articles)]
+    tokens = sum(len(TOKEN_RE.findall(text)) for text in texts)
+    print(f"Статей: {len(texts)}, токенов: {tokens:,}\n")
+
+    stemmer = SnowballStemmer("russian")
+    before = measure("Snowball на каждый токен", lambda: baseline(stemmer, texts), tokens)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.stems")
+    normalizer = TextNormalizer(stemmer, STOP_WORDS, path=path)
+    measure("Словарь основ, холодный", lambda: normalizer.analyze_batch(texts), tokens)
+    after = measure("Словарь основ, тёплый", lambda: normalizer.analyze_batch(texts), tokens)
+    for text in texts[:1]:
+        assert normalizer.analyze(text) == [stemmer.stem(t) for t in TOKEN_RE.findall(text.lower())
+                                            if len(t) >= 2 and t not in STOP_WORDS]
+
+    # Словарь, сохранённый прошлым запуском
+    normalizer.save()
+    restored = TextNormalizer(stemmer, STOP_WORDS, path=path)
+    restored.load()
+    measure("Словарь основ, с диска", lambda: restored.analyze_batch(texts), tokens)
+
+    print(f"\nУскорение: {before / after:.1f}x, словарь: {len(normalizer):,} слов")
+
+
+if __name__ == "__main__":
+    main()
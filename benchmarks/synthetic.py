@@ -0,0 +1,81 @@
+"""Синтетические русские тексты и статьи для замеров производительности"""
+
+import random
+from itertools import accumulate
+
+
+STEMS = (
+    "город", "стран", "истори", "войн", "государств", "район", "област", "рек",
+    "люд", "народ", "язык", "культур", "наук", "университет", "школ", "книг",
+    "писател", "поэт", "художник", "музык", "компози", "театр", "фильм", "режиссёр",
+    "президент", "министр", "парти", "выбор", "закон", "прав", "суд", "армии",
+    "флот", "корабл", "самолёт", "поезд", "дорог", "мост", "здани", "храм",
+    "церкв", "монастыр", "памятник", "музе", "библиотек", "завод", "фабрик",
+    "промышленност", "экономик", "торговл", "рынк", "банк", "деньг", "налог",
+    "земл", "лес", "пол", "гор", "озер", "мор", "остров", "берег", "климат",
+    "погод", "зим", "лет", "весн", "осен", "солнц", "звезд", "планет", "космос",
+    "физик", "хими", "математик", "биологи", "медицин", "врач", "больниц",
+    "животн", "растени", "птиц", "рыб", "насеком", "дерев", "цвет", "камн",
+    "металл", "золот", "серебр", "желез", "угл", "нефт", "газ", "энерги",
+)
+
+ENDINGS = ("", "а", "у", "е", "ом", "ы", "ов", "ам", "ами", "ах", "ой", "ей",
+           "ий", "ая", "ое", "ие", "ого", "ому", "ым", "ых", "ую", "ию", "ия")
+
+FUNCTION_WORDS = ("и", "в", "на", "с", "по", "для", "из", "что", "как", "это",
+                  "также", "является", "был", "была", "было", "году", "который",
+                  "после", "однако", "более", "около", "между", "при", "его")
+
+
+def vocabulary(size=20000, seed=0):
+    """Словарь словоформ: основы с окончаниями и редкие «имена собственные»"""
+    rng = random.Random(seed)
+    words = [stem + ending for stem in STEMS for ending in ENDINGS]
+    while len(words) < size:
+        length = rng.randint(4, 11)
+        words.append("".join(rng.choice("бвгдзклмнпрстфхцчшаеиоуыэюя")
+                             for _ in range(length)))
+    return words
+
+
+def zipf_weights(words):
+    """Накопленные веса словаря по закону Ципфа (для random.choices)"""
+    return list(accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+
+
+def russian_text(rng, words, n_words, cum_weights=None):
+    """Текст с распределением частот, близким к закону Ципфа"""
+    chosen = rng.choices(words, cum_weights=cum_weights or zipf_weights(words), k=n_words)
+    sentences = []
+    for start in range(0, n_words, 12):
+        sentence = []
+        for word in chosen[start:start + 12]:
+            if rng.random() < 0.3:
+                sentence.append(rng.choice(FUNCTION_WORDS))
+            sentence.append(word)
+        sentences.append(" ".join(sentence).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def iter_articles(count, words_per_article=400, seed=0):
+    """Статьи (заголовок, данные базы знаний) по одной - для больших баз"""
+    rng = random.Random(seed)
+    words = vocabulary(seed=seed)
+    cum_weights = zipf_weights(words)
+    for i in range(count):
+        title = f"{rng.choice(words).capitalize()} {i}"
+        content = russian_text(rng, words, rng.randint(words_per_article // 2,
+                                                       words_per_article * 3 // 2),
+                               cum_weights)
+        yield title, {
+            'content': content,
+            'summary': content[:300],
+            'url': f"https://ru.wikipedia.org/wiki/Synthetic_{i}",
+            'language': 'ru',
+            'timestamp': f"2024-01-01T00:00:{i % 60:02d}",
+        }
+
+
+def make_articles(count, words_per_article=400, seed=0):
+    """Список статей (заголовок, данные базы знаний)"""
+    return list(iter_articles(count, words_per_article, seed))
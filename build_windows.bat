@@ -130,14 +130,11 @@ if exist "requirements.txt" (
     echo ⚠️ Файл requirements.txt не найден
     echo Создаем requirements.txt...
     (
-echo wikipedia==1.4.0
-echo nltk==3.8.1
-echo scikit-learn==1.3.0
-echo beautifulsoup4==4.12.2
-echo requests==2.31.0
-echo numpy==1.24.3
-echo pyinstaller==5.13.0
-echo Pillow^>=9.0.0
+echo nltk==3.9.2
+echo requests==2.32.5
+echo numpy==2.4.0
+echo scipy==1.16.3
+echo pyinstaller==6.17.0
     ) > requirements.txt
     echo Устанавливаем зависимости вручную...
     pip install -r requirements.txt
@@ -186,16 +183,12 @@ if errorlevel 3 (
         pyinstaller --clean --onefile --windowed --name "WikipediaAI" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     ) else (
         pyinstaller --clean --onefile --windowed --name "WikipediaAI" ^
                     --icon "%ICON_FILE%" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     )
     set BUILD_TYPE=minimal
@@ -205,16 +198,12 @@ if errorlevel 3 (
         pyinstaller --clean --windowed --name "WikipediaAI" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     ) else (
         pyinstaller --clean --windowed --name "WikipediaAI" ^
                     --icon "%ICON_FILE%" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     )
     set BUILD_TYPE=folder
@@ -225,8 +214,6 @@ if errorlevel 3 (
                     --add-data "nltk_data;nltk_data" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     ) else (
         pyinstaller --clean --onefile --windowed --name "WikipediaAI" ^
@@ -234,8 +221,6 @@ if errorlevel 3 (
                     --add-data "nltk_data;nltk_data" ^
                     --exclude-module PyQt5 ^
                     --exclude-module matplotlib ^
-                    --hidden-import "sklearn.utils._weight_vector" ^
-                    --hidden-import "sklearn.neighbors._typedefs" ^
                     main.py
     )
     set BUILD_TYPE=onefile
@@ -0,0 +1,72 @@
+import os
+import json
+import threading
+from array import array
+from datetime import datetime
+
+
+class ChatHistory:
+    """Полная история чата в журнале JSON Lines (только дозапись)
+
+    В памяти хранятся лишь смещения строк в файле, поэтому любое сообщение
+    читается одним seek, сколько бы их ни накопилось.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = array('q')
+
+        # Восстанавливаем смещения сообщений прошлых сеансов
+        if os.path.exists(path):
+            offset = valid_end = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        self._offsets.append(offset)
+                        valid_end = offset + len(line)
+                    offset += len(line)
+            # Обрезаем недописанную строку после аварийного завершения
+            if valid_end != offset:
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_end)
+
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def append(self, message, is_user=False):
+        """Дописать сообщение в журнал; вернуть его номер"""
+        line = json.dumps({'t': datetime.now().isoformat(timespec='seconds'),
+                           'u': is_user, 'm': message},
+                          ensure_ascii=False).encode('utf-8') + b"\n"
+        with self._lock:
+            self._offsets.append(self._size)
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            return len(self._offsets) - 1
+
+    def read(self, start, end):
+        """Сообщения с номерами [start, end): список (текст, от пользователя)"""
+        with self._lock:
+            start = max(start, 0)
+            end = min(end, len(self._offsets))
+            if start >= end:
+                return []
+            first = self._offsets[start]
+
+        messages = []
+        with open(self.path, 'rb') as f:
+            f.seek(first)
+            for _ in range(end - start):
+                record = json.loads(f.readline())
+                messages.append((record['m'], record['u']))
+        return messages
+
+    def close(self):
+        """Закрыть журнал"""
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,210 @@
+import re
+import bz2
+import sqlite3
+import multiprocessing
+from itertools import groupby
+from operator import itemgetter
+from datetime import datetime
+from urllib.parse import quote
+from xml.etree.ElementTree import iterparse
+
+from mediawiki_client import intro
+
+
+# Служебные пространства имён, ссылки на которые из текста убираются целиком
+FILE_LINK_RE = re.compile(r"\[\[(?:Файл|Изображение|File|Image|Категория|Category):"
+                          r"[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]", re.IGNORECASE)
+COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+REF_RE = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+TEMPLATE_RE = re.compile(r"\{\{[^{}]*\}\}")
+TABLE_RE = re.compile(r"\{\|[^{}]*?\|\}", re.DOTALL)
+LINK_RE = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]")
+EXTERNAL_LINK_RE = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+QUOTES_RE = re.compile(r"'{2,}")
+LIST_MARK_RE = re.compile(r"^[*#:;]+\s*", re.MULTILINE)
+HEADING_RE = re.compile(r"^(=+)\s*(.*?)\s*=+\s*$", re.MULTILINE)
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def strip_wikitext(text):
+    """Вики-разметка -> простой текст в формате extracts API (заголовки «== ... ==»)"""
+    text = COMMENT_RE.sub("", text)
+    text = REF_RE.sub("", text)
+    # Шаблоны и таблицы бывают вложенными - снимаем их изнутри наружу
+    while True:
+        stripped = TABLE_RE.sub("", TEMPLATE_RE.sub("", text))
+        if stripped == text:
+            break
+        text = stripped
+    text = FILE_LINK_RE.sub("", text)
+    text = LINK_RE.sub(r"\1", text)
+    text = EXTERNAL_LINK_RE.sub(r"\1", text)
+    text = TAG_RE.sub("", text)
+    text = QUOTES_RE.sub("", text)
+    text = LIST_MARK_RE.sub("", text)
+    text = HEADING_RE.sub(lambda m: f"{m.group(1)} {m.group(2)} {m.group(1)}", text)
+    text = text.replace("&nbsp;", " ").replace("&mdash;", "—").replace("&ndash;", "–")
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    return BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _local(tag):
+    """Имя тега без пространства имён XML"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_pages(path):
+    """Страницы дампа по одной: словари title, ns, redirect, timestamp, text
+
+    Файл читается потоково (*.bz2 распаковывается на лету), разобранные
+    элементы сразу освобождаются, поэтому память не зависит от размера дампа.
+    """
+    opener = bz2.open if path.endswith(".bz2") else open
+    with opener(path, "rb") as f:
+        context = iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        page = None
+        for event, elem in context:
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag == "page":
+                    page = {'title': '', 'ns': '0', 'redirect': None,
+                            'timestamp': '', 'text': ''}
+                continue
+            if page is None:
+                continue
+            if tag in ("title", "ns", "timestamp", "text"):
+                # Берём метку времени первой (последней по дате) ревизии
+                if not (tag == "timestamp" and page['timestamp']):
+                    page[tag] = elem.text or ''
+            elif tag == "redirect":
+                page['redirect'] = elem.get("title")
+            elif tag == "page":
+                yield page
+                page = None
+                root.clear()
+
+
+def process_page(page, language='ru'):
+    """Статья для базы знаний из страницы дампа (выполняется в процессе-обработчике)"""
+    content = strip_wikitext(page['text'])
+    title = page['title']
+    return title, {
+        'content': content,
+        'summary': intro(content),
+        'url': f"https://{language}.wikipedia.org/wiki/{quote(title.replace(' ', '_'))}",
+        'language': language,
+        'timestamp': page['timestamp'] or datetime.now().isoformat(),
+    }
+
+
+def _process_batch(args):
+    pages, language = args
+    return [process_page(page, language) for page in pages]
+
+
+def _batches(pages, size, limit=None):
+    """Статьи (без перенаправлений) пачками вместе с перенаправлениями,
+    встреченными с прошлой пачки: {целевой заголовок: [перенаправления]}"""
+    batch, redirects, taken = [], {}, 0
+    for page in pages:
+        if page['ns'] != '0':
+            continue
+        if page['redirect']:
+            redirects.setdefault(page['redirect'].split('#')[0], []).append(page['title'])
+            if len(redirects) >= size:
+                yield batch, redirects
+                batch, redirects = [], {}
+            continue
+        if limit is not None and taken >= limit:
+            break
+        batch.append(page)
+        taken += 1
+        if len(batch) >= size:
+            yield batch, redirects
+            batch, redirects = [], {}
+    yield batch, redirects
+
+
+def ingest_dump(store, path, language='ru', limit=None, processes=None, batch_size=1000,
+                on_batch=None, on_progress=None, cancel_event=None):
+    """Загрузить статьи из XML-дампа Википедии (*.xml или *.xml.bz2) в базу знаний
+
+    Разбор идёт в основном процессе, очистка разметки - в пуле процессов,
+    пока предыдущая пачка сохраняется одной транзакцией вместе со своими
+    перенаправлениями. on_batch([(заголовок, данные), ...]) вызывается для
+    каждой сохранённой пачки, чтобы индексировать её целиком. Возвращает
+    число статей.
+    """
+    written = 0
+    # Перенаправления встречаются в дампе в любом порядке: те, чья статья
+    # ещё не сохранена, ждут конца во временной базе на диске, а не в памяти
+    unresolved = sqlite3.connect("")
+    unresolved.execute("CREATE TABLE redirects (target TEXT NOT NULL, alias TEXT NOT NULL)")
+
+    def save(job, redirects):
+        nonlocal written
+        articles = [article for chunk in job.get() for article in chunk]
+        with store.transaction():
+            for title, data in articles:
+                store.upsert_article(title, data)
+            for target, aliases in redirects.items():
+                if not store.set_redirects(target, aliases, language):
+                    unresolved.executemany("INSERT INTO redirects VALUES (?, ?)",
+                                           [(target, alias) for alias in aliases])
+        if on_batch and articles:
+            on_batch(articles)
+        written += len(articles)
+        if on_progress:
+            on_progress(written)
+
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            pending = None
+            for batch, redirects in _batches(iter_pages(path), batch_size, limit):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                # Следующая пачка обрабатывается, пока сохраняется предыдущая
+                job = pool.map_async(_process_batch, [(batch[i:i + 50], language)
+                                                      for i in range(0, len(batch), 50)])
+                if pending is not None:
+                    save(*pending)
+                pending = (job, redirects)
+            if pending is not None:
+                save(*pending)
+
+        rows = unresolved.execute("SELECT target, alias FROM redirects ORDER BY target")
+        with store.transaction():
+            for target, group in groupby(rows, key=itemgetter(0)):
+                store.set_redirects(target, [alias for _, alias in group], language)
+    finally:
+        unresolved.close()
+    return written
+
+
+def main():
+    """Загрузка дампа из командной строки, без окна приложения"""
+    import argparse
+    from kb_store import KnowledgeBaseStore
+
+    parser = argparse.ArgumentParser(description="Загрузка дампа Википедии в базу знаний")
+    parser.add_argument("dump", help="файл дампа (*.xml или *.xml.bz2)")
+    parser.add_argument("db", help="файл базы знаний (knowledge_base.db)")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--limit", type=int, default=None, help="не более N статей")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    store = KnowledgeBaseStore(args.db)
+    try:
+        count = ingest_dump(store, args.dump, language=args.language, limit=args.limit,
+                            processes=args.processes,
+                            on_progress=lambda done: print(f"   загружено {done} статей"))
+        print(f"✅ Загружено статей: {count}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
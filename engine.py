@@ -0,0 +1,550 @@
+import os
+import re
+import threading
+
+from kb_store import KnowledgeBaseStore, ArticleKey
+from page_cache import PageCache
+from article_session import Article, ArticleSession
+from response_cache import ResponseCache
+from prefetcher import Prefetcher
+from mediawiki_client import PageNotFoundError, DisambiguationError
+from instrumentation import timed
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Папка данных приложения по умолчанию
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".wikipedia_ai")
+
+
+class WikiEngine:
+    """База знаний, поиск и ответы на вопросы - без окна Tk
+
+    Используется окном приложения и пакетным режимом командной строки.
+    Сообщения о ходе работы передаются в notify(текст).
+    """
+
+    # Минимальное сходство заголовка с запросом, чтобы статья шла первой в ответе
+    TITLE_MATCH_THRESHOLD = 0.6
+    # Минимальная доля запроса (по весам idf), найденная в статье, чтобы ответить
+    # из базы знаний, а не из Википедии
+    MIN_QUERY_COVERAGE = 0.5
+
+    def __init__(self, data_dir=DATA_DIR, notify=print, use_wikipedia=True):
+        self.notify = notify
+        # Без Википедии вопросы отвечаются только по базе знаний
+        self.use_wikipedia = use_wikipedia
+
+        # Создаем папку для данных, если её нет
+        self.data_dir = data_dir
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+
+        # Путь к файлу базы знаний (старый JSON-формат, переносится в SQLite)
+        self.kb_path = os.path.join(self.data_dir, "knowledge_base.json")
+        self.db_path = os.path.join(self.data_dir, "knowledge_base.db")
+        self.kb_store = KnowledgeBaseStore(self.db_path)
+
+        # Клиент Википедии и NLP-компоненты создаются в start();
+        # рабочие потоки ждут события ready перед обращением к ним
+        self.ready = threading.Event()
+        self.wiki_clients = None
+        self.stemmer = None
+        self.stop_words_ru = set()
+        self.punkt_available = True
+        self.normalizer = None
+        self.index_path = os.path.join(self.data_dir, "knowledge_base.index")
+        self.stems_path = os.path.join(self.data_dir, "knowledge_base.stems")
+        self.search_index = None
+        self.passage_index = None
+        self.title_index = None
+
+        # База знаний (загружается в start) и её размер, обновляемый при изменениях.
+        # Читается и меняется из разных потоков - под kb_lock
+        self.knowledge_base = {}
+        self.kb_bytes = 0
+        self.kb_lock = threading.RLock()
+
+        # Локальный кэш страниц Википедии: неделя хранения, не более 200 МБ
+        self.page_cache = PageCache(os.path.join(self.data_dir, "page_cache.db"),
+                                    ttl=7 * 24 * 3600, max_bytes=200 * 1024 * 1024)
+
+        # Статьи текущего сеанса: одна загрузка на просмотр, добавление и ответ
+        self.article_session = ArticleSession(self.fetch_article)
+
+        # Результаты поиска загружаются заранее: описания всех, текст первых трёх
+        self.prefetcher = Prefetcher(
+            self.fetch_summaries,
+            lambda title, language: self.article_session.get(title, language,
+                                                             auto_suggest=False),
+            full=3, max_workers=2, rate=4.0)
+
+        # Готовые ответы на повторные вопросы (сбрасываются при изменении базы)
+        self.response_cache = ResponseCache(max_entries=256)
+
+    def start(self, on_loaded=None, on_ready=None):
+        """Загрузить базу знаний, клиент Википедии и NLP-компоненты (блокирующий вызов)
+
+        on_loaded() вызывается сразу после загрузки базы, on_ready() - когда
+        можно отвечать на вопросы; досинхронизация индекса идёт уже после него.
+        """
+        try:
+            self.load_knowledge_base()
+            if on_loaded:
+                on_loaded()
+            self.initialize()
+        except Exception as e:
+            self.notify(f"❌ Ошибка инициализации: {str(e)}")
+        finally:
+            self.ready.set()
+            if on_ready:
+                on_ready()
+
+        # Досинхронизация индекса с базой может занять время - уже после готовности
+        self.sync_search_index()
+
+    def initialize(self):
+        """Создать клиент Википедии, нормализатор и индексы"""
+        from mediawiki_client import MediaWikiClients
+        from nltk.stem import SnowballStemmer
+        from normalizer import TextNormalizer
+        from search_index import SearchIndex
+        from passages import PassageIndex
+        from title_index import TitleIndex
+
+        # Свой клиент с пулом соединений для каждого языка (создаётся при первом запросе)
+        self.wiki_clients = MediaWikiClients()
+
+        # NLP компоненты для русского (стоп-слова - если их данные установлены)
+        self.stemmer = SnowballStemmer("russian")
+        self.ensure_nltk_data()
+        from nltk.corpus import stopwords
+        try:
+            self.stop_words_ru = set(stopwords.words('russian'))
+        except LookupError:
+            pass
+
+        # Общая нормализация текста с запоминанием основ слов
+        self.normalizer = TextNormalizer(self.stemmer, self.stop_words_ru,
+                                         path=self.stems_path)
+        try:
+            self.normalizer.load()
+        except Exception as e:
+            print(f"Ошибка загрузки словаря основ: {e}")
+
+        # Поисковый индекс BM25 (хранится рядом с базой знаний)
+        self.search_index = SearchIndex(self.normalizer, path=self.index_path)
+        self.load_search_index()
+
+        # Фрагменты статей для извлечения ответов
+        self.passage_index = PassageIndex(self.kb_store, self.tokenize,
+                                          self.normalizer)
+
+        # Нечёткий поиск по заголовкам и перенаправлениям (опечатки в запросе)
+        title_index = TitleIndex()
+        with self.kb_lock:
+            articles = list(self.knowledge_base.items())
+        for key, data in articles:
+            title_index.add(key, [key.title] + data.get('redirects', []))
+        self.title_index = title_index
+
+    def tokenize(self, text):
+        """Токенизация NLTK, а без данных punkt - регулярным выражением"""
+        if self.punkt_available:
+            try:
+                from nltk.tokenize import word_tokenize
+                return word_tokenize(text, language='russian')
+            except LookupError:
+                # Данных нет - не ищем их на диске при каждом вопросе
+                self.punkt_available = False
+        return TOKEN_RE.findall(text)
+
+    @timed("fetch.search")
+    def fetch_search_results(self, query, language='ru'):
+        """Поиск статей (выполняется в рабочем потоке)"""
+        self.ready.wait()
+        return self.page_cache.get_or_fetch(
+            language, "search", query,
+            lambda: self.wiki_clients.get(language).search(query, limit=10))
+
+    def fetch_article(self, topic, auto_suggest=True, language='ru'):
+        """Загрузить страницу целиком (выполняется в рабочем потоке)
+
+        Заголовки из списка результатов точные, для них auto_suggest не нужен;
+        свободные запросы из чата разрешаются с подсказкой Википедии.
+        """
+        self.ready.wait()
+        kind = "page:suggest" if auto_suggest else "page"
+        data = self.page_cache.get_or_fetch(
+            language, kind, topic, lambda: self.download_article(topic, auto_suggest, language))
+        # Запоминаем и под настоящим заголовком, если запрос был другим
+        if kind != "page" or self.page_cache.normalize(data['title']) != self.page_cache.normalize(topic):
+            self.page_cache.put(language, "page", data['title'], data)
+        return Article.from_dict(data)
+
+    @timed("fetch.summaries")
+    def fetch_summaries(self, titles, language='ru'):
+        """Краткие описания статей одним запросом (выполняется в рабочем потоке)"""
+        self.ready.wait()
+        return self.wiki_clients.get(language).get_summaries(titles)
+
+    @timed("fetch.info")
+    def resolve_titles(self, titles, language='ru'):
+        """Проверить заголовки пачками по 50 за запрос (выполняется в рабочем потоке)
+
+        Возвращает заголовок -> (точный заголовок, ревизия) или исключение
+        для отсутствующих страниц и неоднозначностей.
+        """
+        self.ready.wait()
+        info = self.wiki_clients.get(language).page_info(titles)
+        resolved = {}
+        for title in titles:
+            page = info.get(title)
+            if page is None:
+                resolved[title] = PageNotFoundError(title)
+            elif page['disambiguation']:
+                resolved[title] = DisambiguationError(page['title'], [])
+            else:
+                resolved[title] = (page['title'], page['revision_id'])
+        return resolved
+
+    def fetch_revision(self, title, revision_id=None, language='ru'):
+        """Статья по точному заголовку; неизменившаяся ревизия берётся из кэша страниц"""
+        self.ready.wait()
+        data = self.page_cache.get(language, "page", title)
+        if data is None or revision_id is None or data.get('revision_id') != revision_id:
+            data = self.download_article(title, False, language)
+            self.page_cache.put(language, "page", data['title'], data)
+        return Article.from_dict(data)
+
+    @timed("fetch.article")
+    def download_article(self, topic, auto_suggest=True, language='ru'):
+        """Скачать страницу из Википедии"""
+        # Текст, url и номер ревизии приходят одним запросом
+        client = self.wiki_clients.get(language)
+        return client.get_article(topic, auto_suggest=auto_suggest).to_dict()
+
+    def fetch_and_index_article(self, topic, language='ru'):
+        """Загрузить статью и подготовить её для поиска (в рабочем потоке)"""
+        self.ready.wait()
+        # Уже открытая статья берётся из сеанса без повторной загрузки
+        article = self.article_session.get(topic, language, auto_suggest=False)
+        key = ArticleKey(article.language, article.title)
+
+        data = article.to_kb_record()
+        self.kb_store.upsert_article(key.title, data)
+        self.search_index.add_document(key, data['content'], data['timestamp'])
+        self.passage_index.add_article(key, data['content'])
+        return key, self.kb_metadata(data)
+
+    @timed("answer")
+    def generate_response(self, query, language='ru'):
+        """Сгенерировать ответ (в рабочем потоке)"""
+        self.ready.wait()
+        try:
+            # Проверяем команды
+            response = self.check_russian_commands(query)
+            if response:
+                return response
+
+            # Повторный вопрос (с точностью до словоформ) отвечается из кэша
+            cache_key = self.response_cache_key(query, language)
+            version = self.response_cache.version
+            response = self.response_cache.get(cache_key)
+            if response is None:
+                # Ищем в базе знаний
+                response = self.search_in_knowledge_base(query)
+
+                # Если не нашли, ищем в Википедии (кроме режима --offline)
+                if response is None and self.use_wikipedia:
+                    response = self.search_in_wikipedia_direct(query, language)
+                if not response:
+                    response = self.kb_miss_response()
+
+                # Сетевые ошибки не запоминаем - следующая попытка может пройти
+                if not response.startswith("❌"):
+                    self.response_cache.put(cache_key, response, version)
+
+            return response
+
+        except Exception as e:
+            return f"❌ Ошибка: {str(e)}"
+
+    def response_cache_key(self, query, language='ru'):
+        """Ключ кэша ответов: язык и основы слов запроса (или сам запрос, если в нём одни стоп-слова)"""
+        stems = self.normalizer.analyze(query) if self.normalizer is not None else []
+        return language, tuple(stems) or " ".join(query.lower().split())
+
+    def check_russian_commands(self, query):
+        """Проверка русских команд"""
+        query_lower = query.lower()
+
+        commands = {
+            'привет': "Привет! Чем могу помочь? 😊",
+            'здравствуй': "Здравствуйте! Задавайте вопросы.",
+            'как дела': "Отлично! Готов помочь вам.",
+            'что ты умеешь': "Я могу искать статьи в Википедии и отвечать на вопросы.",
+            'спасибо': "Пожалуйста! Рад помочь!",
+            'помощь': "Задавайте вопросы на любые темы!",
+            'очистить': "Чат очищен!",
+            'база знаний': f"В базе {len(self.knowledge_base)} статей.",
+        }
+
+        for cmd, response in commands.items():
+            if cmd in query_lower:
+                return response
+
+        return None
+
+    def search_in_knowledge_base(self, query):
+        """Поиск в базе знаний; None, если подходящих статей нет"""
+        if not self.knowledge_base:
+            return None
+
+        results = self.search_articles(query, min_coverage=self.MIN_QUERY_COVERAGE)
+        if not results:
+            return None
+
+        key, score, data = results[0]
+        response = "📚 **Нашел в базе знаний:**\n"
+        response += f"**Статья:** {key.title} (релевантность {score:.2f})\n\n"
+
+        # Лучшие фрагменты из найденных статей вместо начала краткого описания
+        passages = self.passage_index.best_passages(
+            query, [k for k, _, _ in results[:3]], top_n=3,
+            term_weights=self.search_index.term_idf)
+        if passages:
+            response += "**Ответ:**\n"
+            for passage_key, passage, _ in passages:
+                source = f" ({passage_key.title})" if passage_key != key else ""
+                response += f"• {passage}{source}\n"
+            response += "\n"
+        else:
+            response += f"**Кратко:** {data['summary'][:150]}...\n\n"
+        if len(results) > 1:
+            response += "**Также по теме:** "
+            response += ", ".join(f"{k.title} ({s:.2f})" for k, s, _ in results[1:])
+            response += "\n\n"
+        response += "📖 Откройте вкладку 'База знаний' для подробностей"
+        return response
+
+    def kb_miss_response(self):
+        """Ответ при промахе базы знаний без обращения к Википедии (режим --offline)"""
+        if not self.knowledge_base:
+            return "База знаний пуста. Добавьте статьи из Википедии."
+        return "В базе знаний нет информации по этому вопросу."
+
+    def search_articles(self, query, limit=5, min_coverage=0.0):
+        """Статьи базы по запросу: [(ключ, релевантность, метаданные)]
+
+        Найденные по содержимому статьи, в которых встречается меньше
+        min_coverage запроса, отбрасываются (совпадения заголовков остаются).
+        """
+        # Похожие заголовки (с опечатками) идут первыми, затем поиск по содержимому
+        title_matches = self.title_index.match(query, limit=min(limit, 3))
+        content_matches = self.search_index.search(query, top_k=limit)
+        if min_coverage > 0 and content_matches:
+            coverage = self.search_index.coverage(query, [key for key, _ in content_matches])
+            content_matches = [(key, score) for key, score in content_matches
+                               if coverage[key] >= min_coverage]
+        with self.kb_lock:
+            results = [(key, score) for key, score in title_matches
+                       if score >= self.TITLE_MATCH_THRESHOLD and key in self.knowledge_base]
+            found = {key for key, _ in results}
+            results += [(key, score) for key, score in content_matches
+                        if key in self.knowledge_base and key not in found]
+            return [(key, score, self.knowledge_base[key]) for key, score in results[:limit]]
+
+    def load_search_index(self):
+        """Загрузить сохранённый поисковый индекс"""
+        try:
+            self.search_index.load(self.index_path)
+        except Exception as e:
+            print(f"Ошибка загрузки поискового индекса: {e}")
+
+    def sync_search_index(self):
+        """Доиндексировать статьи, изменённые после сохранения индекса"""
+        if self.search_index is None:
+            return
+        try:
+            with self.kb_lock:
+                knowledge_base = dict(self.knowledge_base)
+            if self.search_index.sync(knowledge_base,
+                                      lambda key: self.kb_store.get_content(key.title,
+                                                                            key.language)):
+                self.search_index.compact()
+        except Exception as e:
+            print(f"Ошибка обновления поискового индекса: {e}")
+
+    def search_in_wikipedia_direct(self, query, language='ru'):
+        """Прямой поиск в Википедии"""
+        try:
+            try:
+                # Ищем в выбранном разделе (повторные вопросы отвечаются из кэша)
+                article = self.article_session.get(query, language)
+
+                response = "🔍 **Нашел в Википедии:**\n"
+                response += f"**Статья:** {article.title}\n\n"
+                response += f"{article.summary}\n\n"
+                response += f"🔗 **Ссылка:** {article.url}"
+
+                return response
+
+            except DisambiguationError as e:
+                options = e.options[:5]
+                response = "🔍 **Уточните запрос:**\n"
+                response += "Найдено несколько вариантов:\n\n"
+                for i, option in enumerate(options, 1):
+                    response += f"{i}. {option}\n"
+                return response
+
+        except Exception:
+            return "❌ Не удалось найти информацию."
+
+    @staticmethod
+    def kb_metadata(data):
+        """Метаданные статьи без полного текста (вместо него - его длина)"""
+        metadata = {key: value for key, value in data.items() if key != 'content'}
+        metadata['size'] = len(data.get('content', ''))
+        return metadata
+
+    @staticmethod
+    def record_size(data):
+        """Размер записи базы знаний в символах"""
+        return data.get('size', 0) + sum(len(value) for value in data.values()
+                                         if isinstance(value, str))
+
+    def set_kb_article(self, key, data, index_title=True):
+        """Добавить или заменить статью (ключ - язык и заголовок) в памяти, обновив размер базы"""
+        with self.kb_lock:
+            old = self.knowledge_base.get(key)
+            if old is not None:
+                self.kb_bytes -= self.record_size(old)
+            self.knowledge_base[key] = data
+            self.kb_bytes += self.record_size(data)
+            self.response_cache.invalidate()
+        if index_title and self.title_index is not None:
+            self.title_index.add(key, [key.title] + data.get('redirects', []))
+
+    def remove_kb_article(self, key):
+        """Убрать статью из памяти, обновив размер базы"""
+        with self.kb_lock:
+            old = self.knowledge_base.pop(key, None)
+            if old is not None:
+                self.kb_bytes -= self.record_size(old)
+                self.response_cache.invalidate()
+        if self.title_index is not None:
+            self.title_index.remove(key)
+
+    def clear_knowledge_base(self):
+        """Очистить базу знаний: хранилище, индексы и кэш ответов"""
+        with self.kb_lock:
+            self.knowledge_base = {}
+            self.kb_bytes = 0
+        self.kb_store.clear()
+        self.search_index.clear()
+        self.passage_index.forget()
+        self.title_index.clear()
+        self.response_cache.invalidate()
+
+    def load_knowledge_base(self):
+        """Загрузить базу знаний"""
+        try:
+            # Однократный перенос старых JSON-файлов (в папке данных и в текущей папке)
+            for json_path in (self.kb_path, "knowledge_base.json"):
+                try:
+                    self.kb_store.migrate_json(json_path)
+                except Exception as e:
+                    print(f"Ошибка переноса {json_path}: {e}")
+
+            # Текст статей распаковывается из хранилища только по требованию
+            knowledge_base = self.kb_store.load_metadata()
+            with self.kb_lock:
+                self.kb_bytes = sum(self.record_size(data) for data in knowledge_base.values())
+                self.knowledge_base = knowledge_base
+        except Exception as e:
+            print(f"Ошибка загрузки базы знаний: {e}")
+
+    def save_knowledge_base(self, key=None):
+        """Сохранить статью (или всю базу, если key не указан)"""
+        try:
+            with self.kb_lock:
+                if key is None:
+                    articles = list(self.knowledge_base.items())
+                else:
+                    articles = [(key, self.knowledge_base[key])]
+            with self.kb_store.transaction():
+                for key, data in articles:
+                    self.kb_store.upsert_article(key.title, data)
+        except Exception as e:
+            print(f"Ошибка сохранения базы знаний: {e}")
+
+    def ensure_nltk_data(self):
+        """Проверить данные NLTK и загрузить недостающие; True, если все данные есть
+
+        В режиме --offline ничего не загружается: используется только то,
+        что уже установлено.
+        """
+        import nltk
+        missing = []
+        for package, resource in (('punkt_tab', 'tokenizers/punkt_tab'),
+                                  ('stopwords', 'corpora/stopwords')):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                missing.append(package)
+        if not missing:
+            return True
+        if not self.use_wikipedia:
+            self.notify(f"⚠️ Нет данных NLTK ({', '.join(missing)}) - работаю без них")
+            return False
+
+        self.notify("📥 Загружаю необходимые данные NLTK...")
+        try:
+            # nltk.download сообщает об ошибке не исключением, а результатом False
+            failed = [package for package in missing if not nltk.download(package, quiet=True)]
+        except Exception as e:
+            self.notify(f"❌ Ошибка загрузки данных NLTK: {e}")
+            return False
+        if failed:
+            self.notify(f"❌ Не удалось загрузить данные NLTK: {', '.join(failed)}")
+            return False
+        self.notify("✅ Данные NLTK загружены")
+        return True
+
+    def cache_stats(self):
+        """Попадания и промахи кэшей ответов и страниц (для диагностики и /metrics)"""
+        return {'responses': self.response_cache.stats(), 'pages': self.page_cache.stats()}
+
+    def close(self):
+        """Сохранить индексы и закрыть соединения и хранилища"""
+        try:
+            if self.search_index is not None:
+                self.search_index.save(self.index_path)
+        except Exception as e:
+            print(f"Ошибка сохранения поискового индекса: {e}")
+        try:
+            if self.normalizer is not None:
+                self.normalizer.save()
+        except Exception as e:
+            print(f"Ошибка сохранения словаря основ: {e}")
+        self.prefetcher.shutdown()
+        if self.wiki_clients is not None:
+            self.wiki_clients.close()
+        self.page_cache.close()
+        self.kb_store.close()
+
+
+def answer_batch(engine, queries, language='ru', workers=8):
+    """Ответить на вопросы параллельно: записи (номер, вопрос, ответ, секунды) в порядке вопросов"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def answer(item):
+        number, query = item
+        start = time.perf_counter()
+        response = engine.generate_response(query, language)
+        return {'n': number, 'query': query, 'language': language,
+                'response': response, 'seconds': round(time.perf_counter() - start, 4)}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        yield from executor.map(answer, enumerate(queries, 1))
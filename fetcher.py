@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FetchPipeline:
+    """Фоновые сетевые запросы с доставкой результата в поток Tk
+
+    Задачи выполняются в ограниченном пуле потоков. Задачи одного канала
+    (например, 'article') вытесняют друг друга: новая задача отменяет
+    ещё не начатую предыдущую, а результат устаревшей задачи отбрасывается.
+    """
+
+    def __init__(self, window, max_workers=4):
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="fetch")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._current = {}       # канал -> номер последней задачи
+        self._futures = {}       # номер задачи -> Future
+
+    def submit(self, channel, func, *args, on_success=None, on_error=None, **kwargs):
+        """Поставить задачу; channel=None - задача не вытесняется другими"""
+        superseded = None
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if channel is not None:
+                superseded = self._futures.get(self._current.get(channel))
+                self._current[channel] = generation
+
+            future = self.executor.submit(self._run, channel, generation,
+                                          func, args, kwargs, on_success, on_error)
+            self._futures[generation] = future
+
+        # cancel() синхронно вызывает колбэки Future, поэтому - вне блокировки
+        if superseded is not None:
+            superseded.cancel()
+        future.add_done_callback(lambda f, g=generation: self._forget(g))
+        return generation
+
+    def _forget(self, generation):
+        with self._lock:
+            self._futures.pop(generation, None)
+
+    def is_current(self, channel, generation):
+        """Не вытеснена ли задача более новой"""
+        if channel is None:
+            return True
+        with self._lock:
+            return self._current.get(channel) == generation
+
+    def cancel(self, channel):
+        """Отменить текущую задачу канала"""
+        with self._lock:
+            generation = self._current.pop(channel, None)
+            future = self._futures.get(generation)
+        if future is not None:
+            future.cancel()
+
+    def _run(self, channel, generation, func, args, kwargs, on_success, on_error):
+        """Выполнить задачу в рабочем потоке"""
+        if not self.is_current(channel, generation):
+            return
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._deliver(channel, generation, on_error, e)
+        else:
+            self._deliver(channel, generation, on_success, result)
+
+    def _deliver(self, channel, generation, callback, value):
+        """Передать результат в поток Tk, если задача ещё актуальна"""
+        if callback is None:
+            return
+
+        def deliver():
+            if self.is_current(channel, generation):
+                callback(value)
+
+        try:
+            self.window.after(0, deliver)
+        except RuntimeError:
+            # Окно уже закрыто
+            pass
+
+    def shutdown(self):
+        """Остановить пул, отменив ожидающие задачи"""
+        with self._lock:
+            futures = list(self._futures.values())
+            self._current.clear()
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import bisect
+import threading
+from functools import wraps
+
+
+# Границы корзин гистограмм в секундах (как у клиентов Prometheus)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Распределение длительностей по корзинам: число, сумма, максимум"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # последняя корзина - +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Оценка квантиля - верхняя граница корзины, в которую он попал"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _NoSpan:
+    """Пустой замер, когда инструментирование выключено"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Замеры горячих путей (сеть, разбор, запись в базу, поиск, отрисовка)
+
+    Выключенные замеры почти ничего не стоят: span() возвращает общий
+    пустой объект без обращения к часам и блокировкам.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Контекстный менеджер: with metrics.span("kb.write"): ..."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """Декоратор: каждый вызов функции - замер name"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds):
+        """Учесть длительность замера name"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def snapshot(self):
+        """{замер: {count, total_s, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            histograms = {name: (h.count, h.total, h.max, h.quantile(0.5), h.quantile(0.95),
+                                 h.quantile(0.99))
+                          for name, h in self._histograms.items()}
+        return {name: {'count': count, 'total_s': round(total, 4),
+                       'mean_ms': round(total / count * 1000, 3) if count else 0.0,
+                       'p50_ms': round(p50 * 1000, 3), 'p95_ms': round(p95 * 1000, 3),
+                       'p99_ms': round(p99 * 1000, 3), 'max_ms': round(peak * 1000, 3)}
+                for name, (count, total, peak, p50, p95, p99) in sorted(histograms.items())}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix="wikiai_span_seconds"):
+        """Гистограммы в текстовом формате Prometheus"""
+        with self._lock:
+            histograms = {name: (list(h.counts), h.count, h.total)
+                          for name, h in self._histograms.items()}
+        lines = [f"# HELP {prefix} Длительность горячих путей приложения",
+                 f"# TYPE {prefix} histogram"]
+        for name, (counts, count, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                lines.append(f'{prefix}_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_bucket{{span="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_count{{span="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+# Общие замеры приложения; включаются флагом --metrics, переменной
+# окружения WIKIAI_METRICS=1 или на вкладке «Диагностика»
+metrics = Metrics(enabled=os.environ.get("WIKIAI_METRICS", "") not in ("", "0"))
+span = metrics.span
+timed = metrics.timed
@@ -0,0 +1,93 @@
+import gzip
+import json
+
+
+ARTICLE_FIELDS = ('content', 'summary', 'url', 'language', 'timestamp')
+LIST_FIELDS = ('redirects',)
+
+
+def open_archive(path, mode):
+    """Открыть файл JSON Lines; файлы *.gz сжимаются gzip"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export_jsonl(store, path, on_progress=None):
+    """Выгрузить базу в JSON Lines: одна статья на строку, память не растёт с размером базы"""
+    count = 0
+    with open_archive(path, 'w') as f:
+        for title, data in store.iter_articles():
+            record = {'title': title}
+            record.update(data)
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+            if on_progress and count % 1000 == 0:
+                on_progress(count)
+    return count
+
+
+def iter_jsonl(path):
+    """Статьи из файла JSON Lines по одной: (заголовок, данные)"""
+    with open_archive(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                title = record['title']
+            except (ValueError, KeyError) as e:
+                print(f"Ошибка чтения строки {line_number} в {path}: {e}")
+                continue
+            data = {field: record.get(field, '') for field in ARTICLE_FIELDS}
+            data.update((field, record.get(field) or []) for field in LIST_FIELDS)
+            yield title, data
+
+
+def import_jsonl(store, path, on_batch=None, on_progress=None, batch_size=500):
+    """Слить статьи из файла JSON Lines с базой
+
+    Дубликаты ищутся по языку и заголовку и по url; из двух версий остаётся более
+    новая по timestamp. on_batch([(заголовок, данные, заменённый заголовок), ...])
+    вызывается после записи каждой порции, уже вне транзакции.
+    Возвращает (записано, пропущено дубликатов).
+    """
+    written = skipped = 0
+    articles = iter_jsonl(path)
+    while True:
+        batch, records = [], []
+        for item in articles:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                break
+        if not batch:
+            break
+
+        # Одна транзакция на порцию: быстро и без долгой блокировки базы
+        with store.transaction():
+            for title, data in batch:
+                language = data['language'] or 'ru'
+                data['language'] = language
+                duplicate = store.find_duplicate(title, data['url'], language)
+                if duplicate is not None:
+                    old_title, old_timestamp = duplicate
+                    if old_timestamp >= data['timestamp']:
+                        skipped += 1
+                        continue
+                    if old_title != title:
+                        # Та же статья под другим заголовком (переименование)
+                        store.delete_article(old_title, language)
+                else:
+                    old_title = None
+
+                store.upsert_article(title, data)
+                records.append((title, data, old_title))
+                written += 1
+
+        if on_batch and records:
+            on_batch(records)
+        if on_progress:
+            on_progress(written, skipped)
+    return written, skipped
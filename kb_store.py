@@ -0,0 +1,395 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from instrumentation import span, timed
+
+
+SCHEMA_VERSION = 4
+
+# Статья однозначно определяется языком раздела Википедии и заголовком
+ArticleKey = namedtuple('ArticleKey', 'language title')
+
+# Признак сжатого текста: обычный UTF-8 текст не начинается с нулевого байта
+COMPRESSED_MAGIC = b"\x00\x01"
+
+# Общий словарь для сжатия: частые слова и разметка статей русской Википедии.
+# zlib лучше всего использует конец словаря, поэтому самое частое - в конце.
+CONTENT_DICTIONARY = (
+    "== Литература ==\n== Ссылки ==\n== Примечания ==\n== См. также ==\n"
+    "== История ==\n== Биография ==\n== Описание ==\n== География ==\n"
+    "== Население ==\n== Экономика ==\n== Культура ==\n== Награды ==\n"
+    "=== Ранние годы ===\n=== Происхождение ===\n"
+    "Российской Федерации, Советского Союза, Российской империи, СССР, США, "
+    "Москва, Санкт-Петербург, университета, государственный, национальный, "
+    "января февраля марта апреля мая июня июля августа сентября октября ноября декабря "
+    "XIX века, XX века, XXI века, в 1990-х годах, до н. э., н. э., "
+    "км², тыс. человек, населения, территории, области, района, города, "
+    "в частности, в результате, в течение, в том числе, в соответствии с, "
+    "так как, для того чтобы, несмотря на, по данным, а также, "
+    "является одним из, был назначен, была основана, было принято, "
+    "году, годах, года, годы, лет, который, которая, которое, которые, "
+    "также, является, были, было, была, был, его, её, их, этого, этой, "
+    "после, время, первый, первой, между, однако, более, около, "
+    "это, как, что, при, для, или, из, на, по, от, до, за, не, и, в, с, о"
+).encode('utf-8')
+
+
+def compress_content(content):
+    """Сжать текст статьи с общим словарём"""
+    compressor = zlib.compressobj(level=6, zdict=CONTENT_DICTIONARY)
+    return COMPRESSED_MAGIC + compressor.compress(content.encode('utf-8')) + compressor.flush()
+
+
+def decompress_content(blob):
+    """Распаковать текст статьи (старые записи хранятся несжатыми)"""
+    if not blob.startswith(COMPRESSED_MAGIC):
+        return blob.decode('utf-8')
+    decompressor = zlib.decompressobj(zdict=CONTENT_DICTIONARY)
+    data = decompressor.decompress(blob[len(COMPRESSED_MAGIC):]) + decompressor.flush()
+    return data.decode('utf-8')
+
+
+class KnowledgeBaseStore:
+    """Хранилище базы знаний на SQLite (WAL, построчная запись)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+
+        # Одно соединение на всё приложение, доступ сериализуем через блокировку
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Внешние ключи включаются после миграций: пересоздание таблицы
+        # статей не должно каскадно удалять их текст
+        self._create_schema()
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+    def _create_schema(self):
+        """Создать таблицы, если их нет"""
+        with self.transaction() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    summary TEXT NOT NULL DEFAULT '',
+                    url TEXT NOT NULL DEFAULT '',
+                    language TEXT NOT NULL DEFAULT 'ru',
+                    timestamp TEXT NOT NULL DEFAULT '',
+                    redirects TEXT NOT NULL DEFAULT '',
+                    UNIQUE (language, title)
+                )
+            """)
+            # Полный текст хранится отдельно, чтобы метаданные читались быстро
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS contents (
+                    article_id INTEGER PRIMARY KEY
+                        REFERENCES articles(id) ON DELETE CASCADE,
+                    content BLOB NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Фрагменты статьи и их векторы, подготовленные при добавлении
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS passages (
+                    article_id INTEGER PRIMARY KEY
+                        REFERENCES articles(id) ON DELETE CASCADE,
+                    payload BLOB NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS articles_url ON articles (url)
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+
+            version = cur.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0 and cur.execute("SELECT COUNT(*) FROM articles").fetchone()[0]:
+                version = 1
+            if version < 2:
+                self._migrate_compression(cur, version)
+            if version < 3:
+                columns = [row[1] for row in cur.execute("PRAGMA table_info(articles)")]
+                if 'redirects' not in columns:
+                    # Версия 3: перенаправления на статью (для поиска по заголовкам)
+                    cur.execute("ALTER TABLE articles ADD COLUMN redirects TEXT NOT NULL DEFAULT ''")
+            if version < 4:
+                self._migrate_language_keys(cur)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_compression(self, cur, version):
+        """Версия 2: сжатый текст и его размер в отдельном столбце"""
+        columns = [row[1] for row in cur.execute("PRAGMA table_info(contents)")]
+        if 'size' not in columns:
+            cur.execute("ALTER TABLE contents ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+
+        # Однократно пересжимаем статьи, сохранённые без сжатия
+        rows = cur.execute("SELECT article_id FROM contents").fetchall()
+        for (article_id,) in rows:
+            blob = cur.execute("SELECT content FROM contents WHERE article_id = ?",
+                               (article_id,)).fetchone()[0]
+            if blob.startswith(COMPRESSED_MAGIC):
+                continue
+            content = blob.decode('utf-8')
+            cur.execute("UPDATE contents SET content = ?, size = ? WHERE article_id = ?",
+                        (compress_content(content), len(content), article_id))
+
+    def _migrate_language_keys(self, cur):
+        """Версия 4: заголовок уникален в пределах языка, а не во всей базе"""
+        sql = cur.execute("SELECT sql FROM sqlite_master WHERE name = 'articles'").fetchone()[0]
+        if "UNIQUE (language, title)" in sql:
+            return
+        # SQLite не меняет ограничения таблицы - пересоздаём её с теми же id.
+        # Переименовывается новая таблица: ссылки contents и passages на
+        # articles при этом остаются прежними
+        cur.execute("""
+            CREATE TABLE articles_v4 (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL DEFAULT '',
+                url TEXT NOT NULL DEFAULT '',
+                language TEXT NOT NULL DEFAULT 'ru',
+                timestamp TEXT NOT NULL DEFAULT '',
+                redirects TEXT NOT NULL DEFAULT '',
+                UNIQUE (language, title)
+            )
+        """)
+        cur.execute("""
+            INSERT INTO articles_v4 (id, title, summary, url, language, timestamp, redirects)
+            SELECT id, title, summary, url, language, timestamp, redirects FROM articles
+        """)
+        cur.execute("DROP TABLE articles")
+        cur.execute("ALTER TABLE articles_v4 RENAME TO articles")
+        cur.execute("CREATE INDEX IF NOT EXISTS articles_url ON articles (url)")
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция; вложенные вызовы объединяются в одну запись на диск"""
+        with self._lock:
+            self._depth += 1
+            cur = self.conn.cursor()
+            try:
+                yield cur
+            except Exception:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    with span("kb.commit"):
+                        self.conn.commit()
+            finally:
+                cur.close()
+
+    def get_meta(self, key, default=None):
+        """Прочитать служебное значение"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?",
+                                    (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """Записать служебное значение"""
+        with self.transaction() as cur:
+            cur.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (key, value))
+
+    @timed("kb.write")
+    def upsert_article(self, title, data):
+        """Добавить или обновить одну статью (язык берётся из data['language'])
+
+        Если в data нет 'content', обновляются только метаданные.
+        """
+        language = data.get('language', 'ru')
+        with self.transaction() as cur:
+            cur.execute("""
+                INSERT INTO articles (title, summary, url, language, timestamp, redirects)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(language, title) DO UPDATE SET
+                    summary = excluded.summary,
+                    url = excluded.url,
+                    timestamp = excluded.timestamp,
+                    redirects = excluded.redirects
+            """, (title,
+                  data.get('summary', ''),
+                  data.get('url', ''),
+                  language,
+                  data.get('timestamp', ''),
+                  "\n".join(data.get('redirects', ()))))
+            if 'content' not in data:
+                return
+            article_id = cur.execute("SELECT id FROM articles WHERE language = ? AND title = ?",
+                                     (language, title)).fetchone()[0]
+            cur.execute("INSERT OR REPLACE INTO contents (article_id, content, size) "
+                        "VALUES (?, ?, ?)",
+                        (article_id, compress_content(data['content']), len(data['content'])))
+            # Фрагменты старой версии текста больше не действительны
+            cur.execute("DELETE FROM passages WHERE article_id = ?", (article_id,))
+
+    def set_redirects(self, title, redirects, language='ru'):
+        """Добавить перенаправления к статье (без повторов); False, если статьи нет"""
+        with self.transaction() as cur:
+            row = cur.execute("SELECT id, redirects FROM articles WHERE language = ? AND title = ?",
+                              (language, title)).fetchone()
+            if row is None:
+                return False
+            merged = dict.fromkeys((row[1].split("\n") if row[1] else []) + list(redirects))
+            cur.execute("UPDATE articles SET redirects = ? WHERE id = ?",
+                        ("\n".join(merged), row[0]))
+        return True
+
+    def delete_article(self, title, language='ru'):
+        """Удалить одну статью"""
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM articles WHERE language = ? AND title = ?",
+                        (language, title))
+
+    def clear(self):
+        """Удалить все статьи"""
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM passages")
+            cur.execute("DELETE FROM contents")
+            cur.execute("DELETE FROM articles")
+
+    def count(self):
+        """Количество статей"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def get_content(self, title, language='ru'):
+        """Полный текст статьи"""
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT c.content FROM contents c
+                JOIN articles a ON a.id = c.article_id
+                WHERE a.language = ? AND a.title = ?
+            """, (language, title)).fetchone()
+        return decompress_content(row[0]) if row else None
+
+    def put_passages(self, title, payload, language='ru'):
+        """Сохранить сериализованные фрагменты статьи"""
+        with self.transaction() as cur:
+            row = cur.execute("SELECT id FROM articles WHERE language = ? AND title = ?",
+                              (language, title)).fetchone()
+            if row is None:
+                return False
+            cur.execute("INSERT OR REPLACE INTO passages (article_id, payload) "
+                        "VALUES (?, ?)", (row[0], payload))
+        return True
+
+    def get_passages(self, title, language='ru'):
+        """Сериализованные фрагменты статьи или None"""
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT p.payload FROM passages p
+                JOIN articles a ON a.id = p.article_id
+                WHERE a.language = ? AND a.title = ?
+            """, (language, title)).fetchone()
+        return row[0] if row else None
+
+    @timed("kb.load")
+    def load_metadata(self):
+        """Метаданные всех статей без текста: ArticleKey -> данные (с размером текста)"""
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT a.title, a.summary, a.url, a.language, a.timestamp,
+                       a.redirects, COALESCE(c.size, 0)
+                FROM articles a
+                LEFT JOIN contents c ON c.article_id = a.id
+                ORDER BY a.id
+            """).fetchall()
+
+        return {
+            ArticleKey(language, title): {
+                'summary': summary,
+                'url': url,
+                'language': language,
+                'timestamp': timestamp,
+                'redirects': redirects.split("\n") if redirects else [],
+                'size': size
+            }
+            for title, summary, url, language, timestamp, redirects, size in rows
+        }
+
+    def load_all(self):
+        """Загрузить все статьи вместе с текстом в словарь ArticleKey -> данные"""
+        return {ArticleKey(data['language'], title): data
+                for title, data in self.iter_articles()}
+
+    def iter_articles(self, batch_size=200):
+        """Перебрать статьи с текстом по одной, читая базу порциями по batch_size
+
+        Между порциями блокировка не удерживается, поэтому выгрузка большой
+        базы не мешает остальным потокам.
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute("""
+                    SELECT a.id, a.title, a.summary, a.url, a.language, a.timestamp,
+                           a.redirects, c.content
+                    FROM articles a
+                    LEFT JOIN contents c ON c.article_id = a.id
+                    WHERE a.id > ?
+                    ORDER BY a.id
+                    LIMIT ?
+                """, (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for last_id, title, summary, url, language, timestamp, redirects, content in rows:
+                yield title, {
+                    'content': decompress_content(content) if content else '',
+                    'summary': summary,
+                    'url': url,
+                    'language': language,
+                    'timestamp': timestamp,
+                    'redirects': redirects.split("\n") if redirects else []
+                }
+
+    def find_duplicate(self, title, url='', language='ru'):
+        """Статья того же языка с тем же заголовком или url: (заголовок, timestamp) или None"""
+        with self._lock:
+            row = self.conn.execute("SELECT title, timestamp FROM articles "
+                                    "WHERE language = ? AND title = ?",
+                                    (language, title)).fetchone()
+            if row is None and url:
+                row = self.conn.execute("SELECT title, timestamp FROM articles "
+                                        "WHERE language = ? AND url = ?",
+                                        (language, url)).fetchone()
+        return row
+
+    def migrate_json(self, json_path):
+        """Однократно перенести статьи из старого файла knowledge_base.json"""
+        json_path = os.path.abspath(json_path)
+        migrated = json.loads(self.get_meta('migrated_json', '[]'))
+        if json_path in migrated or not os.path.exists(json_path):
+            return 0
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+
+        with self.transaction():
+            for title, data in knowledge_base.items():
+                self.upsert_article(title, data)
+            migrated.append(json_path)
+            self.set_meta('migrated_json', json.dumps(migrated, ensure_ascii=False))
+
+        return len(knowledge_base)
+
+    def close(self):
+        """Закрыть соединение"""
+        with self._lock:
+            self.conn.close()
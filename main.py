@@ -1,30 +1,42 @@
+import time
+
+# Отсчёт времени запуска (для --profile-startup)
+START_TIME = time.perf_counter()
+
 import sys
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import sqlite3
 import json
-import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import SnowballStemmer
 import threading
 from datetime import datetime
-import wikipedia
-import requests
-from bs4 import BeautifulSoup
-import pickle
+from itertools import islice
 import os
-from collections import defaultdict
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import warnings
 
 warnings.filterwarnings('ignore')
-import html
-from urllib.parse import quote
-import time
+
+# Тяжёлые библиотеки (numpy, scipy, nltk, requests) загружаются в фоне
+# после появления окна - см. ModernWikipediaAI.initialize_background
+from kb_store import ArticleKey
+from engine import WikiEngine, DATA_DIR, answer_batch
+from chat_history import ChatHistory
+from fetcher import FetchPipeline
+from batch_ingest import BatchIngestor
+from kb_archive import export_jsonl, import_jsonl
+from dump_ingest import ingest_dump
+from query_scheduler import QueryScheduler
+from instrumentation import metrics, timed
+from mediawiki_client import LANGUAGES, PageNotFoundError, DisambiguationError
+
+# tkinter импортируется только перед созданием окна (load_tkinter), чтобы
+# пакетный режим и сервер работали в сборках Python без _tkinter
+tk = ttk = scrolledtext = messagebox = filedialog = None
+
+
+def load_tkinter():
+    """Импортировать tkinter для окна приложения"""
+    global tk, ttk, scrolledtext, messagebox, filedialog
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, messagebox, filedialog
+
 
 def resource_path(relative_path):
     """ Получить абсолютный путь к ресурсу для PyInstaller """
@@ -36,16 +48,48 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-# Проверка и загрузка NLTK данных
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab')
-    nltk.download('stopwords')
+
+class StartupProfiler:
+    """Замер времени запуска: до первого кадра и до полной готовности"""
+
+    # Бюджет времени запуска в секундах
+    BUDGET = {'first_frame': 1.5, 'ready': 8.0}
+
+    def __init__(self, enabled=False, start=START_TIME):
+        self.enabled = enabled
+        self.start = start
+        self.marks = {}
+
+    def mark(self, name):
+        """Отметить этап запуска"""
+        self.marks[name] = time.perf_counter() - self.start
+
+    def report(self):
+        """Напечатать замеры и сравнить с бюджетом"""
+        if not self.enabled:
+            return
+        print("⏱️ Профиль запуска:")
+        for name, elapsed in self.marks.items():
+            budget = self.BUDGET.get(name)
+            status = ""
+            if budget is not None:
+                status = " ✅" if elapsed <= budget else f" ⚠️ превышен бюджет {budget:.1f} с"
+            print(f"   {name:<12} {elapsed:7.3f} с{status}")
 
 
 class ModernWikipediaAI:
-    def __init__(self):
+    # Сколько статей показывать на одной странице вкладки базы знаний
+    KB_PAGE_SIZE = 50
+
+    # Сколько сообщений держать в окне чата и сколько подгружать из истории за раз
+    CHAT_LIVE_LIMIT = 100
+    CHAT_PAGE_SIZE = 50
+
+    def __init__(self, profiler=None, engine=None):
+        load_tkinter()
+        self.profiler = profiler or StartupProfiler()
+        self.profiler.mark("imports")
+
         self.window = tk.Tk()
         self.window.title("🤖 Modern Wikipedia AI Assistant")
         #self.window.geometry("1400x850")
@@ -73,16 +117,10 @@ class ModernWikipediaAI:
 
         self.window.configure(bg="#0a192f")
 
-        # Создаем папку для данных, если её нет
-        self.data_dir = os.path.join(os.path.expanduser("~"), ".wikipedia_ai")
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-
-        # Путь к файлу базы знаний
-        self.kb_path = os.path.join(self.data_dir, "knowledge_base.json")
-
-        # Установка русского языка для Wikipedia
-        wikipedia.set_lang("ru")
+        # База знаний, поиск и ответы (без окна - см. engine.py); тяжёлые
+        # компоненты создаются в фоне после появления окна
+        self.engine = engine or WikiEngine(notify=self.add_to_chat)
+        self.data_dir = self.engine.data_dir
 
         # Настройка цветовой схемы (синяя тема)
         self.colors = {
@@ -99,19 +137,38 @@ class ModernWikipediaAI:
             'ai_msg': '#1e3a8a',
         }
 
-        # База знаний
-        self.knowledge_base = {}
-        self.load_knowledge_base()
+        # Текущая страница вкладки базы знаний
+        self.kb_page = 0
+
+        # Отложенное обновление вкладки диагностики
+        self.diag_job = None
+
+        # История диалога: полный журнал на диске, в окне - последние сообщения
+        self.conversation_history = ChatHistory(os.path.join(self.data_dir,
+                                                             "chat_history.jsonl"))
+        self.chat_frames = []
+        self.chat_first = self.chat_end = len(self.conversation_history)
+
+        # Фоновые сетевые запросы (результаты возвращаются через window.after)
+        self.fetcher = FetchPipeline(self.window)
+
+        # Открытая статья
+        self.current_article = None
 
-        # NLP компоненты для русского
-        self.stemmer = SnowballStemmer("russian")
-        self.stop_words_ru = set(stopwords.words('russian'))
+        # Пакетное добавление: заголовки проверяются пачками по 50 за запрос,
+        # затем 8 параллельных загрузок, не более 10 запросов в секунду
+        self.batch_ingestor = BatchIngestor(
+            lambda title, language, revision_id: self.engine.fetch_revision(
+                title, revision_id, language),
+            max_workers=8, rate=10.0, resolve=self.engine.resolve_titles)
+        self.batch_running = False
 
-        # TF-IDF векторная модель
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='russian')
+        # Язык, на котором получены текущие результаты поиска
+        self.results_language = "ru"
 
-        # История диалога
-        self.conversation_history = []
+        # Вопросы чата: два рабочих потока, одинаковые вопросы объединяются,
+        # новый вопрос вытесняет ещё не отвеченные старые
+        self.query_scheduler = QueryScheduler(self.engine.generate_response, max_workers=2)
 
         # Создаем интерфейс
         self.create_interface()
@@ -120,6 +177,25 @@ class ModernWikipediaAI:
         self.add_to_chat("🤖 Привет! Я современный Wikipedia AI Assistant с русским интерфейсом.\n"
                          "Я могу искать информацию в русской Википедии и отвечать на ваши вопросы.")
 
+        self.profiler.mark("interface")
+        self.window.after_idle(self.on_first_frame)
+
+    def on_first_frame(self):
+        """Окно отрисовано - запускаем фоновую загрузку остального"""
+        self.profiler.mark("first_frame")
+        threading.Thread(target=self.initialize_background, daemon=True).start()
+
+    def initialize_background(self):
+        """Загрузить базу знаний, клиент Википедии и NLP-компоненты"""
+        self.engine.start(on_loaded=lambda: self.window.after(0,
+                                                              self.update_knowledge_base_display),
+                          on_ready=self.on_engine_ready)
+
+    def on_engine_ready(self):
+        """Всё загружено (в фоновом потоке)"""
+        self.profiler.mark("ready")
+        self.profiler.report()
+
     def create_interface(self):
         """Создать современный интерфейс"""
         # Заголовок
@@ -177,6 +253,18 @@ class ModernWikipediaAI:
         search_entry.pack(fill="x", pady=(0, 10))
         search_entry.bind("<Return>", lambda e: self.search_wikipedia())
 
+        # Язык раздела Википедии
+        language_frame = tk.Frame(search_frame, bg=self.colors['secondary'])
+        language_frame.pack(fill="x", pady=(0, 10))
+        tk.Label(language_frame, text="Язык:",
+                 font=("Arial", 10),
+                 bg=self.colors['secondary'],
+                 fg=self.colors['lighter']).pack(side="left")
+        self.language_var = tk.StringVar(value="ru")
+        ttk.Combobox(language_frame, textvariable=self.language_var,
+                     values=LANGUAGES, state="readonly",
+                     width=5).pack(side="left", padx=(10, 0))
+
         # Кнопка поиска
         search_btn = tk.Button(search_frame, text="🔍 Найти",
                                command=self.search_wikipedia,
@@ -243,8 +331,11 @@ class ModernWikipediaAI:
 
         action_buttons = [
             ("📥 Добавить в базу", self.add_selected_to_kb),
+            ("📦 Пакетное добавление", self.open_batch_dialog),
             ("🧹 Очистить базу", self.clear_knowledge_base),
             ("💾 Экспорт данных", self.export_knowledge_base),
+            ("📂 Импорт данных", self.import_knowledge_base),
+            ("🗄️ Загрузить дамп", self.open_dump_ingest),
             ("🔄 Обновить", self.update_knowledge_base_display),
         ]
 
@@ -257,6 +348,15 @@ class ModernWikipediaAI:
                             padx=20, pady=8)
             btn.pack(fill="x", pady=5)
 
+        # Прогресс пакетного добавления
+        self.batch_progress = ttk.Progressbar(actions_frame, mode="determinate")
+        self.batch_progress.pack(fill="x", pady=(5, 0))
+        self.batch_label = tk.Label(actions_frame, text="",
+                                    font=("Arial", 9),
+                                    bg=self.colors['secondary'],
+                                    fg=self.colors['lighter'])
+        self.batch_label.pack(anchor="w")
+
         # Статистика
         stats_frame = tk.Frame(parent, bg=self.colors['secondary'], padx=15, pady=15)
         stats_frame.pack(fill="x")
@@ -297,6 +397,13 @@ class ModernWikipediaAI:
         chat_container = tk.Frame(chat_tab, bg=self.colors['primary'])
         chat_container.pack(fill="both", expand=True, padx=10, pady=10)
 
+        # Подгрузка ранних сообщений из журнала
+        tk.Button(chat_container, text="⬆ Ранние сообщения",
+                  command=self.load_older_messages,
+                  bg="#1d2b4f", fg=self.colors['light'],
+                  font=("Arial", 9),
+                  relief="flat", cursor="hand2").pack(fill="x", pady=(0, 5))
+
         # История чата
         self.chat_frame = tk.Frame(chat_container, bg=self.colors['primary'])
         self.chat_frame.pack(fill="both", expand=True)
@@ -361,6 +468,24 @@ class ModernWikipediaAI:
         kb_tab = tk.Frame(self.notebook, bg=self.colors['primary'])
         self.notebook.add(kb_tab, text="📚 Моя база знаний")
 
+        # Листание страниц базы знаний
+        kb_nav = tk.Frame(kb_tab, bg=self.colors['primary'])
+        kb_nav.pack(side="bottom", fill="x", padx=10, pady=(0, 10))
+
+        for text, step in (("◀ Назад", -1), ("Вперёд ▶", 1)):
+            tk.Button(kb_nav, text=text,
+                      command=lambda s=step: self.change_kb_page(s),
+                      bg=self.colors['accent'], fg=self.colors['primary'],
+                      font=("Arial", 10, "bold"),
+                      relief="flat", cursor="hand2",
+                      padx=15, pady=3).pack(side="left" if step < 0 else "right")
+
+        self.kb_page_label = tk.Label(kb_nav, text="",
+                                      font=("Arial", 10),
+                                      bg=self.colors['primary'],
+                                      fg=self.colors['lighter'])
+        self.kb_page_label.pack(side="left", expand=True)
+
         self.kb_text = scrolledtext.ScrolledText(kb_tab,
                                                  wrap=tk.WORD,
                                                  font=("Arial", 10),
@@ -371,11 +496,102 @@ class ModernWikipediaAI:
         self.kb_text.pack(fill="both", expand=True, padx=10, pady=10)
         self.kb_text.config(state="disabled")
 
+        # Вкладка 4: Диагностика (замеры горячих путей)
+        diag_tab = tk.Frame(self.notebook, bg=self.colors['primary'])
+        self.notebook.add(diag_tab, text="📊 Диагностика")
+
+        diag_nav = tk.Frame(diag_tab, bg=self.colors['primary'])
+        diag_nav.pack(side="bottom", fill="x", padx=10, pady=(0, 10))
+
+        self.metrics_var = tk.BooleanVar(value=metrics.enabled)
+        tk.Checkbutton(diag_nav, text="Замерять", variable=self.metrics_var,
+                       command=self.toggle_metrics,
+                       bg=self.colors['primary'], fg=self.colors['lighter'],
+                       selectcolor=self.colors['secondary'],
+                       activebackground=self.colors['primary'],
+                       font=("Arial", 10)).pack(side="left")
+
+        for text, command in (("🔄 Обновить", self.render_diagnostics),
+                              ("🧹 Сбросить", self.reset_metrics),
+                              ("💾 JSON", lambda: self.export_metrics("json")),
+                              ("💾 Prometheus", lambda: self.export_metrics("prometheus"))):
+            tk.Button(diag_nav, text=text, command=command,
+                      bg=self.colors['accent'], fg=self.colors['primary'],
+                      font=("Arial", 10, "bold"),
+                      relief="flat", cursor="hand2",
+                      padx=10, pady=3).pack(side="right", padx=(5, 0))
+
+        self.diag_text = scrolledtext.ScrolledText(diag_tab,
+                                                   wrap=tk.NONE,
+                                                   font=("Courier", 10),
+                                                   bg=self.colors['secondary'],
+                                                   fg=self.colors['light'],
+                                                   relief="flat",
+                                                   borderwidth=0)
+        self.diag_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.diag_text.config(state="disabled")
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    @timed("render.chat")
     def add_message_to_chat(self, message, is_user=False):
         """Добавить сообщение в чат"""
+        index = self.conversation_history.append(message, is_user)
+        if index != self.chat_end:
+            # Пользователь листал историю - возвращаемся к последним сообщениям
+            self.show_latest_messages()
+            return
+
+        self.chat_frames.append(self.create_message_frame(message, is_user))
+        self.chat_end = index + 1
+
+        # В окне остаются только последние CHAT_LIVE_LIMIT сообщений
+        while len(self.chat_frames) > self.CHAT_LIVE_LIMIT:
+            self.chat_frames.pop(0).destroy()
+            self.chat_first += 1
+
+        # Прокрутка вниз
+        self.chat_canvas.yview_moveto(1.0)
+
+    def show_latest_messages(self):
+        """Показать последние сообщения журнала"""
+        for frame in self.chat_frames:
+            frame.destroy()
+
+        self.chat_end = len(self.conversation_history)
+        self.chat_first = max(self.chat_end - self.CHAT_LIVE_LIMIT, 0)
+        self.chat_frames = [self.create_message_frame(message, is_user)
+                            for message, is_user in
+                            self.conversation_history.read(self.chat_first, self.chat_end)]
+        self.chat_canvas.yview_moveto(1.0)
+
+    def load_older_messages(self):
+        """Подгрузить из журнала сообщения, предшествующие показанным"""
+        if self.chat_first == 0:
+            return
+
+        start = max(self.chat_first - self.CHAT_PAGE_SIZE, 0)
+        anchor = self.chat_frames[0] if self.chat_frames else None
+        older = [self.create_message_frame(message, is_user, before=anchor)
+                 for message, is_user in
+                 self.conversation_history.read(start, self.chat_first)]
+        self.chat_frames = older + self.chat_frames
+        self.chat_first = start
+
+        # Снизу убираем лишнее, чтобы окно не росло при листании назад
+        while len(self.chat_frames) > self.CHAT_LIVE_LIMIT + self.CHAT_PAGE_SIZE:
+            self.chat_frames.pop().destroy()
+            self.chat_end -= 1
+
+        self.chat_canvas.yview_moveto(0.0)
+
+    def create_message_frame(self, message, is_user=False, before=None):
+        """Создать виджет одного сообщения"""
         message_frame = tk.Frame(self.chat_scrollable_frame,
                                  bg=self.colors['primary'])
-        message_frame.pack(fill="x", padx=10, pady=5)
+        if before is not None:
+            message_frame.pack(fill="x", padx=10, pady=5, before=before)
+        else:
+            message_frame.pack(fill="x", padx=10, pady=5)
 
         # Аватар
         avatar_color = self.colors['user_msg'] if is_user else self.colors['ai_msg']
@@ -404,8 +620,7 @@ class ModernWikipediaAI:
                                  anchor="w")
         message_label.pack(anchor="w", padx=15, pady=10)
 
-        # Прокрутка вниз
-        self.chat_canvas.yview_moveto(1.0)
+        return message_frame
 
     def add_to_chat(self, message, is_user=False):
         """Потокобезопасное добавление в чат"""
@@ -418,35 +633,46 @@ class ModernWikipediaAI:
             self.add_to_chat("⚠️ Введите поисковый запрос", is_user=False)
             return
 
-        self.add_to_chat(f"🔍 Ищу в Википедии: {query}", is_user=True)
+        language = self.language_var.get()
+        self.add_to_chat(f"🔍 Ищу в Википедии ({language}): {query}", is_user=True)
 
-        try:
-            # Очищаем список
-            self.results_listbox.delete(0, tk.END)
+        # Очищаем список
+        self.results_listbox.delete(0, tk.END)
 
-            # Ищем в русской Википедии
-            wikipedia.set_lang("ru")
-            search_results = wikipedia.search(query, results=10)
+        # Сетевой запрос выполняется в фоне, новый поиск вытесняет старый
+        self.fetcher.submit("search", self.engine.fetch_search_results, query, language,
+                            on_success=lambda results: self.show_search_results(results,
+                                                                                language),
+                            on_error=self.on_search_error)
 
-            if not search_results:
-                self.add_to_chat("❌ По вашему запросу ничего не найдено", is_user=False)
-                return
+    def show_search_results(self, search_results, language='ru'):
+        """Показать результаты поиска"""
+        self.results_listbox.delete(0, tk.END)
+        self.results_language = language
+
+        if not search_results:
+            self.add_to_chat("❌ По вашему запросу ничего не найдено", is_user=False)
+            return
+
+        # Добавляем результаты
+        for result in search_results:
+            self.results_listbox.insert(tk.END, result)
 
-            # Добавляем результаты
-            for result in search_results:
-                self.results_listbox.insert(tk.END, result)
+        # Обычно открывают одну-две первые статьи - загружаем их заранее
+        self.engine.prefetcher.prefetch(search_results, language)
 
-            self.add_to_chat(f"✅ Найдено {len(search_results)} статей", is_user=False)
+        self.add_to_chat(f"✅ Найдено {len(search_results)} статей", is_user=False)
 
-        except wikipedia.exceptions.DisambiguationError as e:
+    def on_search_error(self, error):
+        """Обработать ошибку поиска"""
+        if isinstance(error, DisambiguationError):
             self.results_listbox.delete(0, tk.END)
-            for option in e.options[:10]:
+            for option in error.options[:10]:
                 self.results_listbox.insert(tk.END, option)
 
             self.add_to_chat("🔍 Уточните запрос. Выберите вариант из списка:", is_user=False)
-
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка поиска: {str(e)}", is_user=False)
+        else:
+            self.add_to_chat(f"❌ Ошибка поиска: {str(error)}", is_user=False)
 
     def quick_search(self, topic):
         """Быстрый поиск"""
@@ -464,54 +690,84 @@ class ModernWikipediaAI:
 
     def load_wikipedia_article(self, topic):
         """Загрузить статью из Википедии"""
+        language = self.results_language
+
+        # Статья загружена заранее (или уже открывалась) - показываем сразу
+        article = self.engine.article_session.peek(topic, language)
+        if article is not None:
+            self.fetcher.cancel("article")
+            self.engine.article_session.current = article
+            self.show_article(article)
+            return
+
         self.add_to_chat(f"📖 Загружаю статью: {topic}", is_user=False)
 
-        try:
-            # Получаем страницу на русском
-            wikipedia.set_lang("ru")
-            page = wikipedia.page(topic, auto_suggest=True)
+        # Пока идёт загрузка - краткое описание, если оно уже пришло
+        summary = self.engine.prefetcher.summary(topic, language)
+        if summary is not None:
+            self.show_article_preview(summary)
+
+        # Выбор другой статьи отменяет загрузку предыдущей
+        self.fetcher.submit("article", self.engine.article_session.open, topic,
+                            language=language, auto_suggest=False,
+                            on_success=self.show_article,
+                            on_error=lambda e: self.on_article_error(topic, e))
+
+    def show_article_preview(self, article):
+        """Показать краткое описание статьи, пока загружается полный текст"""
+        preview = f"{'═' * 70}\n"
+        preview += f"📚 {article.title}\n"
+        preview += f"{'═' * 70}\n\n"
+        preview += f"{article.summary}\n\n"
+        preview += "⏳ Загружается полный текст...\n"
+
+        self.article_text.config(state="normal")
+        self.article_text.delete(1.0, tk.END)
+        self.article_text.insert(1.0, preview)
+        self.article_text.config(state="disabled")
+        self.notebook.select(1)
 
-            # Отображаем в текстовом поле
-            self.article_text.config(state="normal")
-            self.article_text.delete(1.0, tk.END)
+    @timed("render.article")
+    def show_article(self, article):
+        """Показать загруженную статью"""
+        # Отображаем в текстовом поле
+        self.article_text.config(state="normal")
+        self.article_text.delete(1.0, tk.END)
 
-            # Форматируем статью
-            article_content = f"{'═' * 70}\n"
-            article_content += f"📚 {page.title}\n"
-            article_content += f"{'═' * 70}\n\n"
+        # Форматируем статью
+        article_content = f"{'═' * 70}\n"
+        article_content += f"📚 {article.title}\n"
+        article_content += f"{'═' * 70}\n\n"
 
-            # Берем начало статьи
-            content = page.content[:3000]
+        # Берем начало статьи
+        content = article.content[:3000]
 
-            # Улучшаем форматирование
-            paragraphs = content.split('\n\n')
-            for para in paragraphs[:8]:
-                if para.strip() and len(para.strip()) > 30:
-                    article_content += para.strip() + "\n\n"
+        # Улучшаем форматирование
+        paragraphs = content.split('\n\n')
+        for para in paragraphs[:8]:
+            if para.strip() and len(para.strip()) > 30:
+                article_content += para.strip() + "\n\n"
 
-            article_content += f"\n{'─' * 70}\n"
-            article_content += f"🔗 Полная статья: {page.url}\n"
+        article_content += f"\n{'─' * 70}\n"
+        article_content += f"🔗 Полная статья: {article.url}\n"
 
-            self.article_text.insert(1.0, article_content)
-            self.article_text.config(state="disabled")
+        self.article_text.insert(1.0, article_content)
+        self.article_text.config(state="disabled")
 
-            # Переключаем на вкладку статьи
-            self.notebook.select(1)
+        # Переключаем на вкладку статьи
+        self.notebook.select(1)
 
-            # Сохраняем текущую статью
-            self.current_article = {
-                'title': page.title,
-                'content': page.content,
-                'summary': page.summary,
-                'url': page.url
-            }
+        # Сохраняем текущую статью
+        self.current_article = article
 
-            self.add_to_chat(f"✅ Статья '{page.title}' загружена", is_user=False)
+        self.add_to_chat(f"✅ Статья '{article.title}' загружена", is_user=False)
 
-        except wikipedia.exceptions.PageError:
+    def on_article_error(self, topic, error):
+        """Обработать ошибку загрузки статьи"""
+        if isinstance(error, PageNotFoundError):
             self.add_to_chat(f"❌ Страница '{topic}' не найдена", is_user=False)
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка загрузки: {str(e)}", is_user=False)
+        else:
+            self.add_to_chat(f"❌ Ошибка загрузки: {str(error)}", is_user=False)
 
     def add_selected_to_kb(self):
         """Добавить статью в базу знаний"""
@@ -522,152 +778,255 @@ class ModernWikipediaAI:
 
         topic = self.results_listbox.get(selection[0])
 
-        try:
-            # Получаем статью
-            wikipedia.set_lang("ru")
-            page = wikipedia.page(topic, auto_suggest=True)
-
-            # Добавляем в базу знаний
-            self.knowledge_base[page.title] = {
-                'content': page.content,
-                'summary': page.summary,
-                'url': page.url,
-                'language': 'ru',
-                'timestamp': datetime.now().isoformat()
-            }
-
-            # Обновляем базу
-            self.update_knowledge_base_display()
-
-            self.add_to_chat(f"✅ Статья '{page.title}' добавлена в базу знаний", is_user=False)
+        # Добавления не вытесняют друг друга: каждая выбранная статья сохраняется
+        self.fetcher.submit(None, self.engine.fetch_and_index_article, topic,
+                            self.results_language,
+                            on_success=self.on_article_added,
+                            on_error=lambda e: self.add_to_chat(
+                                f"❌ Ошибка добавления: {str(e)}", is_user=False))
 
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка добавления: {str(e)}", is_user=False)
-
-    def process_query(self):
-        """Обработать запрос пользователя"""
-        query = self.input_var.get().strip()
-        if not query:
-            return
+    def on_article_added(self, result):
+        """Статья сохранена - обновить базу в памяти и отображение"""
+        key, data = result
 
-        # Добавляем запрос в чат
-        self.add_to_chat(query, is_user=True)
-        self.input_var.set("")
+        # Добавляем в базу знаний
+        self.engine.set_kb_article(key, data)
 
-        # Обрабатываем в отдельном потоке
-        threading.Thread(target=self.generate_response,
-                         args=(query,), daemon=True).start()
-
-    def generate_response(self, query):
-        """Сгенерировать ответ"""
-        try:
-            # Проверяем команды
-            response = self.check_russian_commands(query)
-            if response:
-                self.add_to_chat(response, is_user=False)
-                return
-
-            # Ищем в базе знаний
-            response = self.search_in_knowledge_base(query)
-
-            # Если не нашли, ищем в Википедии
-            if not response or "не знаю" in response.lower():
-                wiki_response = self.search_in_wikipedia_direct(query)
-                if wiki_response:
-                    response = wiki_response
-
-            self.add_to_chat(response, is_user=False)
-
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка: {str(e)}", is_user=False)
-
-    def check_russian_commands(self, query):
-        """Проверка русских команд"""
-        query_lower = query.lower()
-
-        commands = {
-            'привет': "Привет! Чем могу помочь? 😊",
-            'здравствуй': "Здравствуйте! Задавайте вопросы.",
-            'как дела': "Отлично! Готов помочь вам.",
-            'что ты умеешь': "Я могу искать статьи в Википедии и отвечать на вопросы.",
-            'спасибо': "Пожалуйста! Рад помочь!",
-            'помощь': "Задавайте вопросы на любые темы!",
-            'очистить': "Чат очищен!",
-            'база знаний': f"В базе {len(self.knowledge_base)} статей.",
-        }
+        # Обновляем базу
+        self.update_knowledge_base_display()
 
-        for cmd, response in commands.items():
-            if cmd in query_lower:
-                return response
+        self.add_to_chat(f"✅ Статья '{key.title}' добавлена в базу знаний", is_user=False)
 
-        return None
+    def open_batch_dialog(self):
+        """Окно пакетного добавления статей"""
+        dialog = tk.Toplevel(self.window)
+        dialog.title("📦 Пакетное добавление")
+        dialog.configure(bg=self.colors['secondary'], padx=15, pady=15)
+        dialog.transient(self.window)
 
-    def search_in_knowledge_base(self, query):
-        """Поиск в базе знаний"""
-        if not self.knowledge_base:
-            return "База знаний пуста. Добавьте статьи из Википедии."
+        tk.Label(dialog, text="Заголовки статей (по одному на строку):",
+                 font=("Arial", 10),
+                 bg=self.colors['secondary'],
+                 fg=self.colors['lighter']).pack(anchor="w")
 
-        # Простой поиск по заголовкам
-        for title, data in self.knowledge_base.items():
-            if query.lower() in title.lower():
-                response = f"📚 **Нашел в базе знаний:**\n"
-                response += f"**Статья:** {title}\n\n"
-                response += f"**Кратко:** {data['summary'][:150]}...\n\n"
-                response += f"📖 Откройте вкладку 'База знаний' для подробностей"
-                return response
+        titles_text = scrolledtext.ScrolledText(dialog, width=50, height=12,
+                                                font=("Arial", 10),
+                                                bg="#1d2b4f", fg=self.colors['light'],
+                                                insertbackground=self.colors['accent'],
+                                                relief="flat")
+        titles_text.pack(fill="both", expand=True, pady=(5, 10))
 
-        return "В базе знаний нет информации по этому вопросу."
+        tk.Label(dialog, text="Или категория Википедии:",
+                 font=("Arial", 10),
+                 bg=self.colors['secondary'],
+                 fg=self.colors['lighter']).pack(anchor="w")
 
-    def search_in_wikipedia_direct(self, query):
-        """Прямой поиск в Википедии"""
-        try:
-            # Ищем на русском
-            wikipedia.set_lang("ru")
+        category_var = tk.StringVar()
+        tk.Entry(dialog, textvariable=category_var,
+                 font=("Arial", 10),
+                 bg="#1d2b4f", fg=self.colors['light'],
+                 insertbackground=self.colors['accent'],
+                 relief="flat").pack(fill="x", pady=(5, 10))
+
+        def start(source):
+            if source == "list":
+                titles = titles_text.get(1.0, tk.END).splitlines()
+                self.start_batch_ingest(titles=titles)
+            elif source == "category":
+                self.start_batch_ingest(category=category_var.get().strip())
+            else:
+                # Результаты поиска - из той Википедии, где искали
+                self.start_batch_ingest(titles=self.results_listbox.get(0, tk.END),
+                                        language=self.results_language)
+            dialog.destroy()
+
+        for text, source in (("📥 Добавить список", "list"),
+                             ("🗂 Добавить категорию", "category"),
+                             ("📚 Все найденные статьи", "results")):
+            tk.Button(dialog, text=text,
+                      command=lambda s=source: start(s),
+                      bg=self.colors['accent'], fg=self.colors['primary'],
+                      font=("Arial", 10, "bold"),
+                      relief="flat", cursor="hand2",
+                      padx=20, pady=5).pack(fill="x", pady=3)
+
+    def start_batch_ingest(self, titles=None, category=None, language=None):
+        """Запустить пакетное добавление в фоне (по умолчанию - на выбранном языке)"""
+        if self.batch_running:
+            self.add_to_chat("⚠️ Пакетное добавление уже выполняется", is_user=False)
+            return
+        if not titles and not category:
+            self.add_to_chat("⚠️ Нет статей для добавления", is_user=False)
+            return
 
-            try:
-                page = wikipedia.page(query, auto_suggest=True)
+        self.batch_running = True
+        self.batch_progress.config(value=0, maximum=1)
+        self.batch_label.config(text="Подготовка...")
+        self.add_to_chat(f"📦 Пакетное добавление: {category or f'{len(titles)} статей'}",
+                         is_user=False)
+
+        self.fetcher.submit(None, self.run_batch_ingest, list(titles or []), category,
+                            language or self.language_var.get(),
+                            on_success=self.on_batch_done,
+                            on_error=self.on_batch_error)
+
+    def run_batch_ingest(self, titles, category, language='ru'):
+        """Загрузить статьи и сохранить их одной транзакцией (в рабочем потоке)"""
+        self.engine.ready.wait()
+        if category:
+            titles = self.engine.wiki_clients.get(language).category_members(category)
+
+        articles, errors = self.batch_ingestor.run(
+            titles, language=language,
+            on_progress=lambda done, total: self.window.after(
+                0, self.update_batch_progress, done, total))
+
+        records = {ArticleKey(article.language, article.title): article.to_kb_record()
+                   for article in articles}
+        with self.engine.kb_store.transaction():
+            for key, data in records.items():
+                self.engine.kb_store.upsert_article(key.title, data)
+                self.engine.passage_index.add_article(key, data['content'])
+        self.engine.search_index.add_documents(
+            (key, data['content'], data['timestamp']) for key, data in records.items())
+
+        # В памяти остаются только метаданные, текст лежит в хранилище сжатым
+        return {key: self.engine.kb_metadata(data) for key, data in records.items()}, errors
+
+    def update_batch_progress(self, done, total):
+        """Обновить индикатор прогресса"""
+        self.batch_progress.config(value=done, maximum=max(total, 1))
+        self.batch_label.config(text=f"Загружено {done} из {total}")
+
+    def on_batch_done(self, result):
+        """Пакет сохранён - одно обновление отображения"""
+        records, errors = result
+        self.batch_running = False
+
+        for key, data in records.items():
+            self.engine.set_kb_article(key, data)
+        self.update_knowledge_base_display()
+
+        self.batch_label.config(text=f"Готово: {len(records)} статей, ошибок: {len(errors)}")
+        message = f"✅ Пакетное добавление завершено: {len(records)} статей"
+        if errors:
+            message += "\n⚠️ Не удалось загрузить: " + ", ".join(t for t, _ in errors[:10])
+        self.add_to_chat(message, is_user=False)
+
+    def on_batch_error(self, error):
+        """Обработать ошибку пакетного добавления"""
+        self.batch_running = False
+        self.batch_label.config(text="")
+        self.add_to_chat(f"❌ Ошибка пакетного добавления: {str(error)}", is_user=False)
+
+    def open_dump_ingest(self):
+        """Загрузить статьи из локального XML-дампа Википедии (без сети)"""
+        if self.batch_running:
+            self.add_to_chat("⚠️ Пакетное добавление уже выполняется", is_user=False)
+            return
+        filename = filedialog.askopenfilename(
+            title="Дамп Википедии",
+            filetypes=[("Дамп Википедии", "*.xml *.xml.bz2"), ("Все файлы", "*.*")])
+        if not filename:
+            return
 
-                response = f"🔍 **Нашел в Википедии:**\n"
-                response += f"**Статья:** {page.title}\n\n"
-                response += f"{page.summary}\n\n"
-                response += f"🔗 **Ссылка:** {page.url}"
+        self.batch_running = True
+        self.batch_label.config(text="Чтение дампа...")
+        self.add_to_chat(f"🗄️ Загрузка дампа {os.path.basename(filename)}...", is_user=False)
+        self.fetcher.submit(None, self.run_dump_ingest, filename, self.language_var.get(),
+                            on_success=self.on_dump_done,
+                            on_error=self.on_batch_error)
+
+    def run_dump_ingest(self, filename, language='ru'):
+        """Загрузить дамп и проиндексировать статьи (в рабочем потоке)"""
+        self.engine.ready.wait()
+        keys = []
+
+        def on_batch(articles):
+            batch = [(ArticleKey(language, title), data) for title, data in articles]
+            self.engine.search_index.add_documents(
+                (key, data['content'], data['timestamp']) for key, data in batch)
+            for key, _ in batch:
+                self.engine.passage_index.forget(key)
+                keys.append(key)
+
+        ingest_dump(self.engine.kb_store, filename, language=language, on_batch=on_batch,
+                    on_progress=lambda done: self.window.after(
+                        0, lambda: self.batch_label.config(text=f"Из дампа загружено {done}")))
+        self.engine.search_index.compact()
+
+        # Метаданные с перенаправлениями, которые дописываются после статей
+        metadata = self.engine.kb_store.load_metadata()
+        records = {key: metadata[key] for key in keys if key in metadata}
+        for key, data in records.items():
+            self.engine.title_index.add(key, [key.title] + data['redirects'])
+        return records
+
+    def on_dump_done(self, records):
+        """Дамп загружен - обновить базу в памяти (заголовки уже проиндексированы)"""
+        self.batch_running = False
+        for key, data in records.items():
+            self.engine.set_kb_article(key, data, index_title=False)
+        self.update_knowledge_base_display()
+
+        self.batch_label.config(text=f"Готово: {len(records)} статей из дампа")
+        self.add_to_chat(f"✅ Из дампа загружено {len(records)} статей", is_user=False)
 
-                return response
+    def process_query(self):
+        """Обработать запрос пользователя"""
+        query = self.input_var.get().strip()
+        if not query:
+            return
 
-            except wikipedia.exceptions.DisambiguationError as e:
-                options = e.options[:5]
-                response = f"🔍 **Уточните запрос:**\n"
-                response += "Найдено несколько вариантов:\n\n"
-                for i, option in enumerate(options, 1):
-                    response += f"{i}. {option}\n"
-                return response
+        # Добавляем запрос в чат
+        self.add_to_chat(query, is_user=True)
+        self.input_var.set("")
 
-        except Exception as e:
-            return f"❌ Не удалось найти информацию."
+        # Обрабатываем в пуле потоков; ответ на вытесненный вопрос не показывается
+        language = self.language_var.get()
+        self.query_scheduler.submit(self.engine.response_cache_key(query, language),
+                                    query, language,
+                                    on_done=lambda response: self.add_to_chat(response,
+                                                                              is_user=False))
 
+    @timed("render.kb")
     def update_knowledge_base_display(self):
         """Обновить отображение базы знаний"""
-        # Сохраняем базу
-        self.save_knowledge_base()
-
         # Обновляем статистику
-        total_size = sum(len(str(v)) for v in self.knowledge_base.values()) / 1024
+        total_size = self.engine.kb_bytes / 1024
+        cache_stats = self.engine.page_cache.stats()
         self.stats_label.config(
-            text=f"База знаний: {len(self.knowledge_base)} статей\n"
-                 f"Загружено: {total_size:.1f} КБ"
+            text=f"База знаний: {len(self.engine.knowledge_base)} статей\n"
+                 f"Загружено: {total_size:.1f} КБ\n"
+                 f"Кэш: {cache_stats['hits']} попаданий / {cache_stats['misses']} промахов"
         )
 
+        self.render_kb_page()
+
+    def change_kb_page(self, step):
+        """Перейти на соседнюю страницу базы знаний"""
+        self.kb_page += step
+        self.render_kb_page()
+
+    def render_kb_page(self):
+        """Показать только текущую страницу статей базы знаний"""
+        total = len(self.engine.knowledge_base)
+        pages = max((total + self.KB_PAGE_SIZE - 1) // self.KB_PAGE_SIZE, 1)
+        self.kb_page = min(max(self.kb_page, 0), pages - 1)
+        start = self.kb_page * self.KB_PAGE_SIZE
+
         # Обновляем текст базы знаний
         self.kb_text.config(state="normal")
         self.kb_text.delete(1.0, tk.END)
 
-        if self.knowledge_base:
+        if self.engine.knowledge_base:
             kb_info = f"{'═' * 70}\n"
-            kb_info += f"📚 БАЗА ЗНАНИЙ ({len(self.knowledge_base)} статей)\n"
+            kb_info += f"📚 БАЗА ЗНАНИЙ ({total} статей)\n"
             kb_info += f"{'═' * 70}\n\n"
 
-            for i, (title, data) in enumerate(self.knowledge_base.items(), 1):
-                kb_info += f"{i}. **{title}**\n"
+            rows = islice(self.engine.knowledge_base.items(), start, start + self.KB_PAGE_SIZE)
+            for i, (key, data) in enumerate(rows, start + 1):
+                kb_info += f"{i}. **{key.title}** [{key.language}]\n"
                 kb_info += f"   📝 {data['summary'][:100]}...\n"
                 kb_info += f"   📅 {data['timestamp'][:10]}\n"
                 kb_info += f"{'─' * 60}\n"
@@ -677,86 +1036,286 @@ class ModernWikipediaAI:
 
         self.kb_text.insert(1.0, kb_info)
         self.kb_text.config(state="disabled")
+        self.kb_page_label.config(text=f"Страница {self.kb_page + 1} из {pages}")
+
+    def on_tab_changed(self, event):
+        """Вкладка диагностики обновляется при открытии и затем раз в 2 секунды"""
+        if self.notebook.index("current") == 3:
+            self.render_diagnostics()
+
+    def toggle_metrics(self):
+        """Включить или выключить замеры"""
+        metrics.enabled = self.metrics_var.get()
+        self.render_diagnostics()
+
+    def reset_metrics(self):
+        """Сбросить накопленные замеры"""
+        metrics.reset()
+        self.render_diagnostics()
+
+    def render_diagnostics(self):
+        """Кэши, очередь вопросов и таблица замеров (вызовы, среднее, квантили, максимум)"""
+        snapshot = metrics.snapshot()
+        caches = self.engine.cache_stats()
+        text = (f"Кэш ответов: {caches['responses']['size']} ответов, "
+                f"{caches['responses']['hits']} попаданий / "
+                f"{caches['responses']['misses']} промахов\n"
+                f"Кэш страниц: {caches['pages']['entries']} записей, "
+                f"{caches['pages']['hits']} попаданий / {caches['pages']['misses']} промахов\n")
+        queue = self.query_scheduler.stats()
+        text += (f"Вопросы чата: выполняется {queue['inflight']}, "
+                 f"объединено {queue['coalesced']}, отброшено устаревших {queue['dropped']}\n\n")
+        if not metrics.enabled:
+            text += "⏸️ Замеры выключены - отметьте «Замерять» (или запустите с --metrics)\n\n"
+        if snapshot:
+            text += (f"{'замер':<18} {'вызовов':>8} {'всего, с':>9} {'среднее':>9} "
+                     f"{'p50':>9} {'p95':>9} {'p99':>9} {'макс.':>9}   (мс)\n")
+            text += f"{'─' * 88}\n"
+            for name, row in snapshot.items():
+                text += (f"{name:<18} {row['count']:>8} {row['total_s']:>9.2f} "
+                         f"{row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                         f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}\n")
+            text += ("\nwiki.* - сеть и разбор ответа, kb.* - база знаний, index.* - поиск, "
+                     "render.* - отрисовка, answer - ответ целиком.\n"
+                     "Квантили оценены по корзинам гистограммы.\n")
+        elif metrics.enabled:
+            text += "Замеров пока нет - поработайте с приложением."
+
+        self.diag_text.config(state="normal")
+        self.diag_text.delete(1.0, tk.END)
+        self.diag_text.insert(1.0, text)
+        self.diag_text.config(state="disabled")
+
+        # Пока вкладка открыта и замеры включены - обновляем её
+        if metrics.enabled and self.notebook.index("current") == 3:
+            if self.diag_job is not None:
+                self.window.after_cancel(self.diag_job)
+            self.diag_job = self.window.after(2000, self.render_diagnostics)
+
+    def export_metrics(self, fmt):
+        """Сохранить замеры в JSON или в текстовом формате Prometheus"""
+        extension = ".json" if fmt == "json" else ".prom"
+        filename = filedialog.asksaveasfilename(
+            title="Экспорт замеров",
+            initialfile=f"wikiai_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+            defaultextension=extension)
+        if not filename:
+            return
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(metrics.to_json() if fmt == "json" else metrics.to_prometheus())
+            self.add_to_chat(f"✅ Замеры сохранены в {filename}", is_user=False)
+        except Exception as e:
+            self.add_to_chat(f"❌ Ошибка сохранения замеров: {str(e)}", is_user=False)
 
     def clear_knowledge_base(self):
         """Очистить базу знаний"""
         if messagebox.askyesno("Очистка базы",
                                "Вы уверены, что хотите очистить базу знаний?"):
-            self.knowledge_base = {}
+            if not self.engine.ready.is_set():
+                self.add_to_chat("⏳ Подождите, идёт загрузка...", is_user=False)
+                return
+            self.engine.clear_knowledge_base()
             self.update_knowledge_base_display()
             self.add_to_chat("✅ База знаний очищена", is_user=False)
 
     def export_knowledge_base(self):
-        """Экспортировать базу знаний"""
-        try:
-            filename = f"wikipedia_kb_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.knowledge_base, f, ensure_ascii=False, indent=2)
-
-            self.add_to_chat(f"✅ База знаний экспортирована в {filename}", is_user=False)
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка экспорта: {str(e)}", is_user=False)
-
-    def load_knowledge_base(self):
-        """Загрузить базу знаний"""
-        try:
-            if os.path.exists("knowledge_base.json"):
-                with open("knowledge_base.json", 'r', encoding='utf-8') as f:
-                    self.knowledge_base = json.load(f)
-        except Exception as e:
-            print(f"Ошибка загрузки базы знаний: {e}")
+        """Экспортировать базу знаний в JSON Lines (gzip для *.gz)"""
+        filename = filedialog.asksaveasfilename(
+            title="Экспорт базы знаний",
+            initialfile=f"wikipedia_kb_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz",
+            defaultextension=".jsonl.gz",
+            filetypes=[("JSON Lines (gzip)", "*.jsonl.gz"), ("JSON Lines", "*.jsonl")])
+        if not filename:
+            return
 
-    def save_knowledge_base(self):
-        """Сохранить базу знаний"""
-        try:
-            with open("knowledge_base.json", 'w', encoding='utf-8') as f:
-                json.dump(self.knowledge_base, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Ошибка сохранения базы знаний: {e}")
+        self.add_to_chat("💾 Экспорт базы знаний...", is_user=False)
+        # Статьи выгружаются по одной в фоне, окно не замирает
+        self.fetcher.submit(None, export_jsonl, self.engine.kb_store, filename,
+                            on_success=lambda count: self.add_to_chat(
+                                f"✅ Экспортировано {count} статей в {filename}", is_user=False),
+                            on_error=lambda e: self.add_to_chat(
+                                f"❌ Ошибка экспорта: {str(e)}", is_user=False))
+
+    def import_knowledge_base(self):
+        """Импортировать статьи из JSON Lines с объединением дубликатов"""
+        if not self.engine.ready.is_set():
+            self.add_to_chat("⏳ Подождите, идёт загрузка...", is_user=False)
+            return
+        filename = filedialog.askopenfilename(
+            title="Импорт базы знаний",
+            filetypes=[("JSON Lines", "*.jsonl *.jsonl.gz"), ("Все файлы", "*.*")])
+        if not filename:
+            return
 
-    def ensure_nltk_data(self):
-        """Проверить и загрузить данные NLTK при необходимости"""
-        try:
-            nltk.data.find('tokenizers/punkt_tab')
-            nltk.data.find('corpora/stopwords')
-            return True
-        except LookupError:
-            self.add_to_chat("📥 Загружаю необходимые данные NLTK...", is_user=False)
-            nltk.download('punkt_tab', quiet=True)
-            nltk.download('stopwords', quiet=True)
-            self.add_to_chat("✅ Данные NLTK загружены", is_user=False)
-            return True
-        except Exception as e:
-            self.add_to_chat(f"❌ Ошибка загрузки данных NLTK: {e}", is_user=False)
-            return False
+        self.add_to_chat(f"📂 Импорт из {os.path.basename(filename)}...", is_user=False)
+        self.fetcher.submit(None, self.run_import, filename,
+                            on_success=self.on_import_done,
+                            on_error=lambda e: self.add_to_chat(
+                                f"❌ Ошибка импорта: {str(e)}", is_user=False))
+
+    def run_import(self, filename):
+        """Слить файл с базой и проиндексировать новые статьи (в рабочем потоке)"""
+        imported, replaced = [], []
+
+        def on_batch(records):
+            # Порция уже записана: стемминг идёт без блокировки хранилища
+            documents = []
+            for title, data, old_title in records:
+                key = ArticleKey(data['language'], title)
+                if old_title is not None and old_title != title:
+                    old_key = ArticleKey(data['language'], old_title)
+                    self.engine.search_index.remove_document(old_key)
+                    self.engine.passage_index.forget(old_key)
+                    replaced.append(old_key)
+                documents.append((key, data['content'], data['timestamp']))
+                self.engine.passage_index.forget(key)
+                imported.append((key, self.engine.kb_metadata(data)))
+            self.engine.search_index.add_documents(documents)
+
+        written, skipped = import_jsonl(self.engine.kb_store, filename, on_batch=on_batch)
+        self.engine.search_index.compact()
+        return imported, replaced, skipped
+
+    def on_import_done(self, result):
+        """Импорт завершён - обновить базу в памяти и отображение"""
+        imported, replaced, skipped = result
+        for key in replaced:
+            self.engine.remove_kb_article(key)
+        for key, data in imported:
+            self.engine.set_kb_article(key, data)
+        self.update_knowledge_base_display()
+        self.add_to_chat(f"✅ Импортировано {len(imported)} статей, "
+                         f"пропущено дубликатов: {skipped}", is_user=False)
+
+    def on_close(self):
+        """Сохранить состояние и закрыть окно"""
+        self.fetcher.shutdown()
+        self.query_scheduler.shutdown()
+        self.engine.close()
+        self.conversation_history.close()
+        self.window.destroy()
 
     def run(self):
         """Запустить приложение"""
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         self.window.mainloop()
 
 
+def run_batch(args):
+    """Ответить на вопросы из файла без окна: один вопрос на строку, ответы - JSON Lines"""
+    def log(message):
+        print(message, file=sys.stderr)
+
+    with open(args.batch, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    engine = WikiEngine(args.data_dir, notify=log, use_wikipedia=not args.offline)
+    engine.start()
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        for record in answer_batch(engine, queries, args.language, args.workers):
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        engine.close()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    log(f"✅ Ответов: {len(queries)} за {elapsed:.1f} с "
+        f"({len(queries) / elapsed * 60:.0f} в минуту)")
+
+
+def run_server(args):
+    """HTTP JSON API для нескольких клиентов без окна"""
+    import asyncio
+    from server import ApiServer
+
+    engine = WikiEngine(args.data_dir, use_wikipedia=not args.offline)
+    engine.start()
+    server = ApiServer(engine, host=args.host, port=args.port, workers=args.workers)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n⏹️ Сервер остановлен")
+    finally:
+        server.close()
+        engine.close()
+
+
 def main():
     """Главная функция"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Modern Wikipedia AI Assistant")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="показать время до первого кадра и до готовности")
+    parser.add_argument("--metrics", action="store_true",
+                        help="замерять горячие пути (вкладка «Диагностика», /metrics)")
+    parser.add_argument("--metrics-out", metavar="FILE",
+                        help="при выходе сохранить замеры: *.prom - формат Prometheus, "
+                             "иначе JSON")
+    batch = parser.add_argument_group("пакетный режим и сервер (без окна)")
+    batch.add_argument("--batch", metavar="FILE",
+                       help="ответить на вопросы из файла (один вопрос на строку)")
+    batch.add_argument("--output", default="-",
+                       help="файл ответов JSON Lines (по умолчанию - стандартный вывод)")
+    batch.add_argument("--workers", type=int, default=8, help="параллельных обработчиков")
+    batch.add_argument("--language", default="ru", choices=LANGUAGES)
+    batch.add_argument("--offline", action="store_true",
+                       help="отвечать только по базе знаний, без запросов к Википедии")
+    batch.add_argument("--data-dir", default=DATA_DIR, help="папка с базой знаний")
+    serve = parser.add_argument_group("HTTP API (без окна)")
+    serve.add_argument("--serve", action="store_true",
+                       help="запустить сервер с адресами /ask, /search, /kb, /metrics")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    if args.metrics or args.metrics_out:
+        metrics.enabled = True
+    try:
+        run_mode(args)
+    finally:
+        if args.metrics_out:
+            with open(args.metrics_out, "w", encoding="utf-8") as f:
+                f.write(metrics.to_prometheus() if args.metrics_out.endswith(".prom")
+                        else metrics.to_json())
+
+
+def run_mode(args):
+    """Пакетный режим, сервер или окно приложения"""
+    import importlib.util
+
+    if args.batch:
+        run_batch(args)
+        return
+    if args.serve:
+        run_server(args)
+        return
+
     print("🚀 Запуск Modern Wikipedia AI Assistant...")
     print("🌐 Язык: Русский")
 
-    # Проверка библиотек
-    try:
-        import wikipedia
-        import nltk
-        print("✅ Все библиотеки установлены")
-    except ImportError as e:
-        print(f"❌ Отсутствует библиотека: {e}")
+    # Проверка библиотек (без импорта - он выполняется в фоне после запуска окна)
+    missing = [name for name in ("requests", "nltk", "numpy", "scipy")
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"❌ Отсутствует библиотека: {', '.join(missing)}")
         print("\nУстановите недостающие библиотеки:")
-        print("pip install wikipedia-api nltk scikit-learn beautifulsoup4 requests numpy")
+        print("pip install nltk scipy requests numpy")
         return
+    print("✅ Все библиотеки установлены")
 
     # Запуск приложения
-    app = ModernWikipediaAI()
+    app = ModernWikipediaAI(profiler=StartupProfiler(enabled=args.profile_startup))
     app.run()
 
 
 if __name__ == "__main__":
+    # Пул процессов загрузки дампа в собранном приложении (PyInstaller)
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,273 @@
+import re
+import time
+import threading
+
+from article_session import Article
+from instrumentation import span
+
+
+USER_AGENT = "ModernWikipediaAI/1.0 (https://github.com/sergeev/wikiai)"
+
+# Ограничения MediaWiki API на число заголовков в одном запросе
+MAX_TITLES = 50
+MAX_INTRO_EXTRACTS = 20
+
+# Языковые разделы Википедии, доступные приложению
+LANGUAGES = ("ru", "en", "uk", "be", "de", "fr")
+
+SECTION_RE = re.compile(r"^==.*==\s*$", re.MULTILINE)
+
+
+class WikiError(Exception):
+    """Ошибка обращения к Википедии"""
+
+
+class PageNotFoundError(WikiError):
+    """Страница не существует"""
+
+    def __init__(self, title):
+        super().__init__(f"Страница '{title}' не найдена")
+        self.title = title
+
+
+class UnsupportedLanguageError(WikiError):
+    """Языковой раздел не входит в LANGUAGES"""
+
+    def __init__(self, language):
+        super().__init__(f"Язык '{language}' не поддерживается")
+        self.language = language
+
+
+class DisambiguationError(WikiError):
+    """Страница-неоднозначность; options - возможные варианты"""
+
+    def __init__(self, title, options):
+        super().__init__(f"'{title}' может означать: {', '.join(options[:5])}")
+        self.title = title
+        self.options = options
+
+
+def _match_titles(titles, result, by_title, found):
+    """Сопоставить запрошенные заголовки страницам ответа с учётом нормализации
+    и перенаправлений; найденное кладётся в found под обоими заголовками"""
+    aliases = {}
+    for item in result.get('normalized', []) + result.get('redirects', []):
+        aliases[item['from']] = item['to']
+
+    for title in titles:
+        resolved = title
+        while resolved in aliases:
+            resolved = aliases[resolved]
+        if resolved in by_title:
+            found[title] = found[resolved] = by_title[resolved]
+
+
+def intro(content):
+    """Вводная часть статьи (до первого раздела)"""
+    match = SECTION_RE.search(content)
+    return (content[:match.start()] if match else content).strip()
+
+
+class MediaWikiClient:
+    """Клиент MediaWiki API с пулом соединений (keep-alive)
+
+    Метаданные и краткие описания загружаются пачками в одном HTTP-запросе;
+    полный текст статьи API отдаёт только по одной странице за запрос.
+    Запросы передают maxlag: при отставании реплик API просит подождать,
+    и запрос повторяется через Retry-After секунд (не более lag_retries раз).
+    """
+
+    def __init__(self, language='ru', base_url=None, session=None,
+                 pool_size=16, timeout=30, maxlag=5, lag_retries=3):
+        self.language = language
+        self.base_url = base_url or f"https://{language}.wikipedia.org/w/api.php"
+        self.timeout = timeout
+        self.maxlag = maxlag
+        self.lag_retries = lag_retries
+
+        if session is None:
+            # requests импортируется здесь, чтобы не замедлять запуск окна
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            session = requests.Session()
+            retry = Retry(total=3, backoff_factor=0.5,
+                          status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                                  max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers['User-Agent'] = USER_AGENT
+        self.session = session
+
+    def query(self, **params):
+        """Выполнить запрос action=query и вернуть раздел 'query'"""
+        params.update(action='query', format='json', formatversion=2)
+        if self.maxlag is not None:
+            params['maxlag'] = self.maxlag
+        for attempt in range(self.lag_retries + 1):
+            with span("wiki.request"):
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            with span("wiki.parse"):
+                data = response.json()
+            if data.get('error', {}).get('code') != 'maxlag' or attempt == self.lag_retries:
+                break
+            time.sleep(min(float(response.headers.get('Retry-After', 5)), 30))
+        if 'error' in data:
+            raise WikiError(data['error'].get('info', str(data['error'])))
+        return data.get('query', {}), data.get('continue')
+
+    def search(self, query, limit=10):
+        """Заголовки статей по запросу"""
+        result, _ = self.query(list='search', srsearch=query, srlimit=limit,
+                               srprop='', srinfo='suggestion')
+        titles = [item['title'] for item in result.get('search', [])]
+        suggestion = result.get('searchinfo', {}).get('suggestion')
+        if not titles and suggestion:
+            return self.search(suggestion, limit)
+        return titles
+
+    def get_article(self, title, auto_suggest=True):
+        """Статья целиком одним запросом: текст, url и номер ревизии
+
+        Если точного заголовка нет и auto_suggest=True, берётся первый
+        результат поиска.
+        """
+        try:
+            return self._get_article(title)
+        except PageNotFoundError:
+            if not auto_suggest:
+                raise
+            results = self.search(title, limit=1)
+            if not results:
+                raise
+            return self._get_article(results[0])
+
+    def _get_article(self, title):
+        result, _ = self.query(prop='extracts|info|pageprops', titles=title,
+                               explaintext=1, exsectionformat='wiki',
+                               inprop='url', ppprop='disambiguation', redirects=1)
+        pages = result.get('pages', [])
+        if not pages or pages[0].get('missing') or pages[0].get('invalid'):
+            raise PageNotFoundError(title)
+
+        page = pages[0]
+        if 'disambiguation' in page.get('pageprops', {}):
+            raise DisambiguationError(page['title'], self.links(page['title']))
+
+        content = page.get('extract', '')
+        redirects = [item['from'] for item in result.get('redirects', [])]
+        return Article(page['title'], content, intro(content), page.get('fullurl', ''),
+                       page.get('lastrevid'), self.language, redirects)
+
+    def links(self, title, limit=50):
+        """Ссылки со страницы (варианты для страниц-неоднозначностей)"""
+        result, _ = self.query(prop='links', titles=title, plnamespace=0,
+                               pllimit=limit)
+        pages = result.get('pages', [])
+        return [link['title'] for link in pages[0].get('links', [])] if pages else []
+
+    def get_summaries(self, titles):
+        """Краткие описания многих статей пачками: заголовок -> Article без полного текста
+
+        Ключами служат и запрошенные заголовки, и заголовки после перенаправлений.
+        """
+        articles = {}
+        titles = list(dict.fromkeys(titles))
+        for start in range(0, len(titles), MAX_INTRO_EXTRACTS):
+            chunk = titles[start:start + MAX_INTRO_EXTRACTS]
+            result, _ = self.query(prop='extracts|info', titles="|".join(chunk),
+                                   explaintext=1, exintro=1, exlimit=MAX_INTRO_EXTRACTS,
+                                   inprop='url', redirects=1)
+
+            by_title = {}
+            for page in result.get('pages', []):
+                if page.get('missing') or page.get('invalid'):
+                    continue
+                summary = page.get('extract', '').strip()
+                by_title[page['title']] = Article(page['title'], '', summary,
+                                                  page.get('fullurl', ''),
+                                                  page.get('lastrevid'), self.language)
+            _match_titles(chunk, result, by_title, articles)
+        return articles
+
+    def page_info(self, titles):
+        """Проверка до 50 заголовков за запрос без загрузки текста
+
+        Возвращает заголовок -> {title, url, revision_id, disambiguation}.
+        Ключами служат и запрошенные заголовки, и заголовки после перенаправлений;
+        несуществующих страниц в результате нет.
+        """
+        info = {}
+        titles = list(dict.fromkeys(titles))
+        for start in range(0, len(titles), MAX_TITLES):
+            chunk = titles[start:start + MAX_TITLES]
+            result, _ = self.query(prop='info|pageprops', titles="|".join(chunk),
+                                   inprop='url', ppprop='disambiguation', redirects=1)
+            by_title = {}
+            for page in result.get('pages', []):
+                if not page.get('missing') and not page.get('invalid'):
+                    by_title[page['title']] = {
+                        'title': page['title'],
+                        'url': page.get('fullurl', ''),
+                        'revision_id': page.get('lastrevid'),
+                        'disambiguation': 'disambiguation' in page.get('pageprops', {}),
+                    }
+            _match_titles(chunk, result, by_title, info)
+        return info
+
+    def category_members(self, category, limit=500):
+        """Заголовки статей категории (без подкатегорий)"""
+        prefix = "Категория:" if self.language == 'ru' else "Category:"
+        if ":" not in category:
+            category = prefix + category
+
+        titles = []
+        params = {'list': 'categorymembers', 'cmtitle': category,
+                  'cmnamespace': 0, 'cmlimit': min(limit, 500)}
+        while len(titles) < limit:
+            result, cont = self.query(**params)
+            titles.extend(member['title'] for member in result.get('categorymembers', []))
+            if not cont:
+                break
+            params.update(cont)
+        return titles[:limit]
+
+    def close(self):
+        """Закрыть соединения пула"""
+        self.session.close()
+
+
+class MediaWikiClients:
+    """Отдельный клиент (и пул соединений) для каждого языкового раздела
+
+    Клиенты создаются при первом обращении к языку и не разделяют состояния,
+    поэтому запросы на разных языках не мешают друг другу. Язык входит
+    в адрес API, поэтому допускаются только разделы из languages.
+    """
+
+    def __init__(self, languages=LANGUAGES, **client_options):
+        self.languages = frozenset(languages)
+        self.client_options = client_options
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, language='ru'):
+        """Клиент раздела language"""
+        if language not in self.languages:
+            raise UnsupportedLanguageError(language)
+        with self._lock:
+            client = self._clients.get(language)
+            if client is None:
+                client = self._clients[language] = MediaWikiClient(language=language,
+                                                                   **self.client_options)
+            return client
+
+    def close(self):
+        """Закрыть соединения всех клиентов"""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
@@ -0,0 +1,129 @@
+import os
+import re
+import pickle
+import threading
+from collections import OrderedDict
+
+
+NORMALIZER_VERSION = 1
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class TextNormalizer:
+    """Нормализация текста: токенизация, стоп-слова и стемминг с памятью
+
+    Snowball на чистом Python - самая медленная часть индексации, а словарь
+    статей повторяется постоянно. Поэтому основы слов запоминаются в
+    ограниченном LRU-словаре токен -> основа, который сохраняется рядом
+    с базой знаний и переживает перезапуск.
+    """
+
+    def __init__(self, stemmer, stop_words, path=None, max_size=200_000):
+        self.stemmer = stemmer
+        self.stop_words = stop_words
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._memo = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memo)
+
+    def stem(self, token):
+        """Основа одного слова"""
+        return self.stem_batch([[token]])[0][0]
+
+    def stem_batch(self, token_lists):
+        """Основы для нескольких списков токенов (в нижнем регистре)
+
+        Короткие токены и стоп-слова отбрасываются. Неизвестные слова всей
+        пачки стеммируются по одному разу, словарь блокируется дважды
+        на пачку, а не на каждое слово.
+        """
+        stop_words = self.stop_words
+        token_lists = [[token for token in tokens
+                        if len(token) >= 2 and token not in stop_words]
+                       for tokens in token_lists]
+
+        with self._lock:
+            memo = self._memo
+            known = {}
+            missing = set()
+            for tokens in token_lists:
+                for token in tokens:
+                    if token in known or token in missing:
+                        continue
+                    stem = memo.get(token)
+                    if stem is None:
+                        missing.add(token)
+                    else:
+                        known[token] = stem
+                        memo.move_to_end(token)
+            self.hits += len(known)
+            self.misses += len(missing)
+
+        if missing:
+            # Стемминг вне блокировки: другие потоки читают словарь параллельно
+            stemmed = {token: self.stemmer.stem(token) for token in missing}
+            known.update(stemmed)
+            with self._lock:
+                self._memo.update(stemmed)
+                while len(self._memo) > self.max_size:
+                    self._memo.popitem(last=False)
+                self._dirty = True
+
+        return [[known[token] for token in tokens] for tokens in token_lists]
+
+    def analyze(self, text):
+        """Токенизация, удаление стоп-слов и стемминг"""
+        return self.stem_batch([TOKEN_RE.findall(text.lower())])[0]
+
+    def analyze_batch(self, texts):
+        """analyze для многих текстов (например, всех статей пакета) за один проход"""
+        return self.stem_batch([TOKEN_RE.findall(text.lower()) for text in texts])
+
+    def stats(self):
+        """Размер словаря и попадания/промахи"""
+        with self._lock:
+            return {'size': len(self._memo), 'hits': self.hits, 'misses': self.misses}
+
+    def save(self, path=None):
+        """Сохранить словарь основ (если он менялся)"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            items = list(self._memo.items())
+            self._dirty = False
+
+        # Запись во временный файл и замена, чтобы не оставить битый файл
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': NORMALIZER_VERSION, 'items': items}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Загрузить словарь основ; False, если файла нет или он устарел"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != NORMALIZER_VERSION:
+            return False
+
+        with self._lock:
+            # Сохранённые записи старше текущих: кладём их в начало очереди LRU
+            memo = OrderedDict(state['items'][-self.max_size:])
+            memo.update(self._memo)
+            while len(memo) > self.max_size:
+                memo.popitem(last=False)
+            self._memo = memo
+        return True
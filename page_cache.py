@@ -0,0 +1,151 @@
+import json
+import time
+import sqlite3
+import threading
+
+
+class PageCache:
+    """Локальный кэш ответов Википедии на диске (TTL + вытеснение LRU)
+
+    Записи хранятся по ключу (язык, вид, нормализованный запрос), где вид -
+    'search' для результатов поиска или 'page' для содержимого статьи.
+    """
+
+    def __init__(self, db_path, ttl=7 * 24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    language TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (language, kind, key)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed "
+                              "ON cache (accessed)")
+        self.total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def normalize(key):
+        """Нормализовать запрос или заголовок: регистр и пробелы"""
+        return " ".join(key.replace("_", " ").lower().split())
+
+    def _lookup(self, language, kind, key, allow_stale=False):
+        """Найти запись; None - если её нет или она устарела"""
+        key = self.normalize(key)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, created FROM cache "
+                "WHERE language = ? AND kind = ? AND key = ?",
+                (language, kind, key)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl and not allow_stale:
+                return None
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE cache SET accessed = ? "
+                    "WHERE language = ? AND kind = ? AND key = ?",
+                    (now, language, kind, key))
+        return json.loads(value)
+
+    def get(self, language, kind, key):
+        """Значение из кэша или None"""
+        value = self._lookup(language, kind, key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, language, kind, key, value):
+        """Сохранить значение и при необходимости вытеснить давно не используемые"""
+        key = self.normalize(key)
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+
+        with self._lock:
+            with self.conn:
+                old = self.conn.execute(
+                    "SELECT size FROM cache WHERE language = ? AND kind = ? AND key = ?",
+                    (language, kind, key)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache "
+                    "(language, kind, key, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (language, kind, key, payload, size, now, now))
+                self.total_bytes += size - (old[0] if old else 0)
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+
+    def _evict(self):
+        """Удалять самые старые по доступу записи, пока кэш не станет меньше лимита"""
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute(
+            "SELECT rowid, size FROM cache ORDER BY accessed").fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((rowid,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM cache WHERE rowid = ?", doomed)
+
+    def get_or_fetch(self, language, kind, key, fetch):
+        """Значение из кэша или результат fetch(); при ошибке сети - устаревшая запись"""
+        value = self.get(language, kind, key)
+        if value is not None:
+            return value
+
+        try:
+            value = fetch()
+        except Exception:
+            stale = self._lookup(language, kind, key, allow_stale=True)
+            if stale is None:
+                raise
+            return stale
+
+        self.put(language, kind, key, value)
+        return value
+
+    def stats(self):
+        """Счётчики попаданий/промахов и размер кэша"""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': entries,
+                'bytes': self.total_bytes,
+            }
+
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM cache")
+            self.total_bytes = 0
+
+    def close(self):
+        """Закрыть соединение"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,166 @@
+import re
+import zlib
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+from instrumentation import timed
+
+
+PARAGRAPH_RE = re.compile(r"\n+")
+SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+(?=[A-ZА-ЯЁ0-9«\"(])")
+HEADING_RE = re.compile(r"^=+\s*.*?\s*=+$", re.MULTILINE)
+
+
+class PassageIndex:
+    """Извлечение фрагментов-ответов из статей базы знаний
+
+    При добавлении статья режется на абзацы и группы предложений, для
+    каждого фрагмента считается хешированный TF-вектор. Матрица векторов
+    сохраняется в хранилище, поэтому при ответе остаётся одно умножение
+    разреженной матрицы на вектор запроса.
+    """
+
+    def __init__(self, store, tokenize, normalizer,
+                 n_features=2 ** 18, max_chars=500, min_chars=40, cache_size=64):
+        self.store = store
+        self.tokenize = tokenize
+        self.normalizer = normalizer
+        self.n_features = n_features
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, text):
+        """Основы слов фрагмента"""
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        """Основы слов нескольких фрагментов одной пачкой"""
+        return self.normalizer.stem_batch(
+            [[token for token in self.tokenize(text.lower()) if token.isalnum()]
+             for text in texts])
+
+    def split(self, content):
+        """Разрезать статью на абзацы, длинные абзацы - на группы предложений"""
+        content = HEADING_RE.sub("", content)
+        chunks = []
+        for paragraph in PARAGRAPH_RE.split(content):
+            paragraph = " ".join(paragraph.split())
+            if len(paragraph) < self.min_chars:
+                continue
+            if len(paragraph) <= self.max_chars:
+                chunks.append(paragraph)
+                continue
+
+            current = ""
+            for sentence in SENTENCE_RE.split(paragraph):
+                if current and len(current) + len(sentence) > self.max_chars:
+                    chunks.append(current)
+                    current = sentence
+                else:
+                    current = f"{current} {sentence}" if current else sentence
+            if len(current) >= self.min_chars:
+                chunks.append(current)
+        return chunks
+
+    def _feature(self, stem):
+        """Номер признака (стабильный между запусками хеш основы)"""
+        return zlib.crc32(stem.encode('utf-8')) % self.n_features
+
+    def vectorize(self, chunks):
+        """Матрица фрагментов: сублинейный TF, нормировка L2"""
+        rows, cols, data = [], [], []
+        for row, stems in enumerate(self.analyze_batch(chunks)):
+            counts = {}
+            for stem in stems:
+                feature = self._feature(stem)
+                counts[feature] = counts.get(feature, 0) + 1
+            if not counts:
+                continue
+            values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))
+            values /= np.linalg.norm(values)
+            rows.extend([row] * len(counts))
+            cols.extend(counts.keys())
+            data.extend(values.tolist())
+        return sparse.csr_matrix((data, (rows, cols)),
+                                 shape=(len(chunks), self.n_features),
+                                 dtype=np.float32)
+
+    def add_article(self, key, content):
+        """Подготовить и сохранить фрагменты статьи key (вызывается при добавлении)"""
+        chunks = self.split(content)
+        matrix = self.vectorize(chunks)
+        self.store.put_passages(key.title, pickle.dumps((chunks, matrix),
+                                                        protocol=pickle.HIGHEST_PROTOCOL),
+                                key.language)
+        self._remember(key, (chunks, matrix))
+        return len(chunks)
+
+    def forget(self, key=None):
+        """Сбросить кэш фрагментов статьи (или всех статей)"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, key):
+        """Фрагменты и матрица статьи: из памяти, из хранилища или заново"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
+
+        payload = self.store.get_passages(key.title, key.language)
+        if payload is not None:
+            entry = pickle.loads(payload)
+            self._remember(key, entry)
+            return entry
+
+        # Статья добавлена до появления фрагментов - готовим один раз
+        content = self.store.get_content(key.title, key.language)
+        if content is None:
+            return [], None
+        self.add_article(key, content)
+        return self.get(key)
+
+    @timed("index.passages")
+    def best_passages(self, query, keys, top_n=3, term_weights=None):
+        """Лучшие фрагменты статей keys для запроса: [(ключ статьи, текст, оценка)]"""
+        stems = self.analyze(query)
+        if not stems or not keys:
+            return []
+
+        weights = term_weights(stems) if term_weights else {}
+        query_vector = np.zeros(self.n_features, dtype=np.float32)
+        for stem in stems:
+            query_vector[self._feature(stem)] += weights.get(stem, 1.0)
+
+        owners, texts, matrices = [], [], []
+        for key in keys:
+            chunks, matrix = self.get(key)
+            if not chunks:
+                continue
+            owners.extend([key] * len(chunks))
+            texts.extend(chunks)
+            matrices.append(matrix)
+        if not matrices:
+            return []
+
+        scores = sparse.vstack(matrices, format='csr') @ query_vector
+        order = np.argsort(-scores)[:top_n]
+        return [(owners[i], texts[i], float(scores[i])) for i in order if scores[i] > 0]
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_ingest import RateLimiter
+
+
+class Prefetcher:
+    """Упреждающая загрузка статей из результатов поиска
+
+    Краткие описания всех результатов приходят одним запросом и хранятся
+    в ограниченном LRU-кэше; полный текст первых full результатов
+    загружается через fetch_article (он сам кладёт статьи в кэш сеанса
+    и страниц). Не более max_workers загрузок одновременно и rate запросов
+    в секунду; новый поиск отменяет ещё не начатые загрузки предыдущего.
+    """
+
+    def __init__(self, fetch_summaries, fetch_article, full=3, max_workers=2, rate=4.0,
+                 max_summaries=200):
+        self.fetch_summaries = fetch_summaries    # (заголовки, язык) -> {заголовок: Article}
+        self.fetch_article = fetch_article        # (заголовок, язык) -> Article
+        self.full = full
+        self.max_summaries = max_summaries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="prefetch")
+        self.limiter = RateLimiter(rate)
+        self._summaries = OrderedDict()   # (язык, нормализованный заголовок) -> Article
+        self._generation = 0
+        self._futures = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(title, language):
+        return language, " ".join(title.replace("_", " ").lower().split())
+
+    def prefetch(self, titles, language='ru'):
+        """Начать загрузку результатов поиска titles (вызывается сразу после поиска)"""
+        titles = list(dict.fromkeys(titles))
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            for future in self._futures:
+                future.cancel()
+            self._futures = []
+            if not titles:
+                return
+            jobs = [(self._load_summaries, titles)]
+            jobs += [(self._load_article, title) for title in titles[:self.full]]
+            for job, arg in jobs:
+                self._futures.append(self.executor.submit(job, generation, arg, language))
+
+    def _current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _load_summaries(self, generation, titles, language):
+        if not self._current(generation):
+            return
+        self.limiter.acquire(f"{language}.wikipedia.org")
+        try:
+            summaries = self.fetch_summaries(titles, language)
+        except Exception as e:
+            print(f"Ошибка упреждающей загрузки описаний: {e}")
+            return
+        with self._lock:
+            for title, article in summaries.items():
+                key = self._key(title, language)
+                self._summaries[key] = article
+                self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+
+    def _load_article(self, generation, title, language):
+        if not self._current(generation):
+            return
+        self.limiter.acquire(f"{language}.wikipedia.org")
+        try:
+            self.fetch_article(title, language)
+        except Exception:
+            # Неоднозначные и отсутствующие страницы покажет обычное открытие
+            pass
+
+    def summary(self, title, language='ru'):
+        """Краткое описание из кэша (Article без полного текста) или None"""
+        key = self._key(title, language)
+        with self._lock:
+            article = self._summaries.get(key)
+            if article is None:
+                self.misses += 1
+                return None
+            self._summaries.move_to_end(key)
+            self.hits += 1
+            return article
+
+    def shutdown(self):
+        """Отменить ожидающие загрузки и остановить пул"""
+        with self._lock:
+            self._generation += 1
+            for future in self._futures:
+                future.cancel()
+            self._futures = []
+        self.executor.shutdown(wait=False)
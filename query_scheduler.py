@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryScheduler:
+    """Вопросы чата на фиксированном пуле потоков
+
+    Одинаковые вопросы, которые ещё обрабатываются, получают один общий
+    ответ. Новый вопрос вытесняет более старые: ещё не начатые отменяются,
+    а ответы уже начатых отбрасываются.
+    """
+
+    def __init__(self, handler, max_workers=2):
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="query")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._latest = None     # номер последнего заданного вопроса
+        self._inflight = {}     # ключ вопроса -> [номер, Future, колбэки]
+        self.coalesced = 0
+        self.dropped = 0
+
+    def submit(self, key, *args, on_done):
+        """Задать вопрос; on_done(ответ) вызывается в рабочем потоке, если вопрос не вытеснен"""
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                # Такой же вопрос уже обрабатывается - ждём его ответа
+                entry[2].append(on_done)
+                self.coalesced += 1
+            else:
+                self._generation += 1
+                entry = [self._generation, None, [on_done]]
+                self._inflight[key] = entry
+                entry[1] = self.executor.submit(self._run, key, entry, args)
+            self._latest = entry[0]
+
+            # Не начатые старые вопросы отменяются (колбэков у Future нет -
+            # cancel() можно звать под блокировкой), начатые доработают впустую
+            for other_key, other in list(self._inflight.items()):
+                if other is not entry and other[1].cancel():
+                    del self._inflight[other_key]
+                    self.dropped += len(other[2])
+        return entry[0]
+
+    def is_current(self, generation):
+        """Не задан ли после этого вопроса другой"""
+        with self._lock:
+            return self._latest == generation
+
+    def _run(self, key, entry, args):
+        """Ответить на вопрос в рабочем потоке"""
+        generation = entry[0]
+        try:
+            response = self.handler(*args) if self.is_current(generation) else None
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+                current = self._latest == generation
+                if not current:
+                    self.dropped += len(entry[2])
+        if current:
+            for on_done in entry[2]:
+                on_done(response)
+
+    def stats(self):
+        """Выполняемые, объединённые и отброшенные вопросы"""
+        with self._lock:
+            return {'inflight': len(self._inflight), 'coalesced': self.coalesced,
+                    'dropped': self.dropped}
+
+    def shutdown(self):
+        """Остановить пул, отменив ожидающие вопросы"""
+        with self._lock:
+            futures = [entry[1] for entry in self._inflight.values()]
+            self._inflight.clear()
+            self._latest = None
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
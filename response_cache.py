@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Готовые ответы чата по нормализованному запросу (LRU)
+
+    Любое изменение базы знаний увеличивает версию и сбрасывает кэш.
+    Ответ, посчитанный по старой версии базы, в кэш не попадает.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Ответ из кэша или None"""
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response, version):
+        """Запомнить ответ, если база не менялась с версии version"""
+        with self._lock:
+            if version != self.version:
+                return False
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self):
+        """База знаний изменилась: новая версия, старые ответы недействительны"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Размер и попадания/промахи"""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,401 @@
+import os
+import pickle
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from array_utils import grow_array
+from instrumentation import timed
+
+
+INDEX_VERSION = 3
+
+
+class SearchIndex:
+    """Инкрементальный инвертированный индекс BM25 по содержимому статей
+
+    Постинги хранятся в двух сегментах: основном (разреженная матрица
+    термы x документы с частотами) и дельте (словари для недавно
+    добавленных статей). Удалённые статьи помечаются и исключаются при
+    поиске, а фоновое уплотнение переносит дельту в основной сегмент,
+    выбрасывает удалённые документы и нумерует живые заново подряд.
+    """
+
+    def __init__(self, normalizer, k1=1.5, b=0.75,
+                 path=None, compact_threshold=256):
+        self.normalizer = normalizer
+        self.k1 = k1
+        self.b = b
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._epoch = 0
+        self._reset()
+
+    def _reset(self):
+        """Пустой индекс"""
+        self._epoch += 1
+        self.vocabulary = {}
+        self.df = np.zeros(0, dtype=np.int32)
+
+        self.doc_ids = {}            # ключ статьи (язык, заголовок) -> номер документа
+        self.doc_info = {}           # номер -> (ключ статьи, отметка времени)
+        self.doc_terms = {}          # номер -> массив номеров термов
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.next_doc_id = 0
+        self.total_length = 0.0
+
+        # Основной сегмент: строка на терм, столбец на документ, значение - tf
+        self.main = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.frozen = {}             # дельта, которая сейчас уплотняется
+        self.delta = {}              # терм -> {документ: tf}
+        self.tombstones = 0
+
+    def analyze(self, text):
+        """Токенизация, удаление стоп-слов и стемминг"""
+        return self.normalizer.analyze(text)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __contains__(self, key):
+        return key in self.doc_ids
+
+    @timed("index.add")
+    def add_document(self, key, text, timestamp=''):
+        """Добавить (или заменить) статью по ключу ArticleKey; стоимость пропорциональна статье"""
+        counts = Counter(self.analyze(f"{key.title}\n{text}"))
+        with self._lock:
+            self._add(key, counts, timestamp)
+        self.maybe_compact()
+
+    @timed("index.add_batch")
+    def add_documents(self, documents):
+        """Добавить пачку статей [(ключ, текст, timestamp)] - при пакетной загрузке
+
+        Тексты всей пачки нормализуются одним проходом (каждое новое слово
+        стеммируется один раз), индекс блокируется один раз на пачку.
+        """
+        documents = list(documents)
+        stems = self.normalizer.analyze_batch([f"{key.title}\n{text}"
+                                               for key, text, _ in documents])
+        with self._lock:
+            for (key, _, timestamp), doc_stems in zip(documents, stems):
+                self._add(key, Counter(doc_stems), timestamp)
+        self.maybe_compact()
+
+    def _add(self, key, counts, timestamp):
+        """Записать документ в дельту (под блокировкой)"""
+        self._remove(key)
+
+        doc_id = self.next_doc_id
+        self.next_doc_id += 1
+        self.doc_lengths = grow_array(self.doc_lengths, doc_id + 1)
+        self.alive = grow_array(self.alive, doc_id + 1, False)
+
+        term_ids = np.empty(len(counts), dtype=np.int32)
+        for i, (stem, tf) in enumerate(counts.items()):
+            term_id = self.vocabulary.get(stem)
+            if term_id is None:
+                term_id = self.vocabulary[stem] = len(self.vocabulary)
+            term_ids[i] = term_id
+            self.delta.setdefault(term_id, {})[doc_id] = tf
+
+        self.df = grow_array(self.df, len(self.vocabulary))
+        self.df[term_ids] += 1
+
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self.alive[doc_id] = True
+        self.total_length += length
+        self.doc_ids[key] = doc_id
+        self.doc_info[doc_id] = (key, timestamp)
+        self.doc_terms[doc_id] = term_ids
+
+    def remove_document(self, key):
+        """Удалить одну статью из индекса"""
+        with self._lock:
+            removed = self._remove(key)
+        if removed:
+            self.maybe_compact()
+        return removed
+
+    def _remove(self, key):
+        """Пометить документ удалённым и уменьшить частоты его термов"""
+        doc_id = self.doc_ids.pop(key, None)
+        if doc_id is None:
+            return False
+
+        self.df[self.doc_terms.pop(doc_id)] -= 1
+        self.total_length -= self.doc_lengths[doc_id]
+        self.alive[doc_id] = False
+        del self.doc_info[doc_id]
+        self.tombstones += 1
+        return True
+
+    def clear(self):
+        """Очистить индекс"""
+        with self._lock:
+            self._reset()
+
+    def sync(self, knowledge_base, get_content):
+        """Досинхронизировать индекс с базой: переиндексировать только изменённые статьи
+
+        knowledge_base - метаданные статей; текст читается через get_content(key)
+        только для статей, которые нужно переиндексировать.
+        """
+        with self._lock:
+            indexed = {key: self.doc_info[doc_id][1]
+                       for key, doc_id in self.doc_ids.items()}
+
+        for key in indexed.keys() - knowledge_base.keys():
+            self.remove_document(key)
+
+        changed = 0
+        for key, data in knowledge_base.items():
+            timestamp = data.get('timestamp', '')
+            if indexed.get(key) != timestamp:
+                self.add_document(key, get_content(key) or '', timestamp)
+                changed += 1
+        return changed
+
+    @timed("index.search")
+    def search(self, query, top_k=5):
+        """Вернуть top_k пар (ключ статьи, оценка) по убыванию релевантности"""
+        stems = self.analyze(query)
+
+        with self._lock:
+            term_ids = {self.vocabulary[stem] for stem in stems
+                        if stem in self.vocabulary}
+            n_docs = len(self.doc_ids)
+            if not term_ids or not n_docs:
+                return []
+
+            avgdl = max(self.total_length / n_docs, 1.0)
+            doc_parts, tf_parts, idf_parts = [], [], []
+            for term_id in term_ids:
+                df = self.df[term_id]
+                if df <= 0:
+                    continue
+                docs, tfs = self._postings(term_id)
+                doc_parts.append(docs)
+                tf_parts.append(tfs)
+                idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+                idf_parts.append(np.full(len(docs), idf, dtype=np.float32))
+
+            if not doc_parts:
+                return []
+
+            docs = np.concatenate(doc_parts)
+            tfs = np.concatenate(tf_parts)
+            idfs = np.concatenate(idf_parts)
+
+            # Классическая формула BM25 по постингам терминов запроса
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / avgdl)
+            weights = idfs * tfs * (self.k1 + 1) / (tfs + norm)
+            scores = np.bincount(docs, weights=weights, minlength=self.next_doc_id)
+            scores[~self.alive[:len(scores)]] = 0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                top = np.argpartition(scores[candidates], -top_k)[-top_k:]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates])]
+
+            return [(self.doc_info[i][0], float(scores[i])) for i in candidates]
+
+    def term_idf(self, stems):
+        """Значения idf для основ (неизвестные основы получают максимальный вес)"""
+        with self._lock:
+            n_docs = len(self.doc_ids)
+            weights = {}
+            for stem in stems:
+                term_id = self.vocabulary.get(stem)
+                df = self.df[term_id] if term_id is not None else 0
+                weights[stem] = float(np.log1p((n_docs - df + 0.5) / (df + 0.5)))
+            return weights
+
+    def coverage(self, query, keys):
+        """Доля запроса (с весами idf), которая встречается в каждой из статей keys
+
+        Основы, которых нет в индексе, получают максимальный вес: статья без
+        редкого слова запроса покрывает его хуже, чем статья без частого.
+        """
+        stems = set(self.analyze(query))
+        with self._lock:
+            weights = self.term_idf(stems)
+            total = sum(weights.values())
+            term_ids = np.array([self.vocabulary.get(stem, -1) for stem in weights],
+                                dtype=np.int32)
+            term_weights = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+            result = {}
+            for key in keys:
+                doc_id = self.doc_ids.get(key)
+                if doc_id is None or not total:
+                    result[key] = 0.0
+                    continue
+                found = (term_ids[:, None] == self.doc_terms[doc_id]).any(axis=1)
+                result[key] = float(term_weights[found].sum() / total)
+            return result
+
+    def _postings(self, term_id):
+        """Постинги терма из всех сегментов: (номера документов, tf)"""
+        docs, tfs = [], []
+        if term_id < self.main.shape[0]:
+            start, end = self.main.indptr[term_id], self.main.indptr[term_id + 1]
+            docs.append(self.main.indices[start:end])
+            tfs.append(self.main.data[start:end])
+        for segment in (self.frozen, self.delta):
+            postings = segment.get(term_id)
+            if postings:
+                docs.append(np.fromiter(postings.keys(), dtype=np.int32, count=len(postings)))
+                tfs.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+        if not docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def maybe_compact(self):
+        """Запустить фоновое уплотнение, если накопилось достаточно изменений"""
+        with self._lock:
+            delta_docs = self.next_doc_id - self.main.shape[1]
+            if self._compacting or (delta_docs < self.compact_threshold and
+                                    self.tombstones < self.compact_threshold):
+                return
+            self._compacting = True
+        threading.Thread(target=self._background_compact, daemon=True).start()
+
+    def _background_compact(self):
+        """Уплотнение в фоновом потоке"""
+        try:
+            self.compact()
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        """Перенести дельту в основной сегмент и выбросить удалённые документы"""
+        with self._compact_lock:
+            self._compact()
+
+        if self.path:
+            try:
+                self.save(self.path)
+            except Exception as e:
+                print(f"Ошибка сохранения поискового индекса: {e}")
+
+    def _compact(self):
+        """Слияние сегментов (вызывается под _compact_lock)"""
+        with self._lock:
+            self.frozen, self.delta = self.delta, {}
+            main, frozen = self.main, self.frozen
+            alive = self.alive[:self.next_doc_id].copy()
+            n_terms, n_docs = len(self.vocabulary), self.next_doc_id
+            tombstones = self.tombstones
+            epoch = self._epoch
+
+        try:
+            # Тяжёлая часть выполняется без блокировки: поиск продолжает работать
+            coo = main.tocoo()
+            rows, cols, data = [coo.row], [coo.col], [coo.data]
+            for term_id, postings in frozen.items():
+                rows.append(np.full(len(postings), term_id, dtype=np.int32))
+                cols.append(np.fromiter(postings.keys(), dtype=np.int32, count=len(postings)))
+                data.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+            rows, cols, data = (np.concatenate(rows), np.concatenate(cols),
+                                np.concatenate(data))
+            # Живые документы получают номера подряд: массивы по документам
+            # не растут от повторных замен одних и тех же статей
+            remap = np.cumsum(alive, dtype=np.int32) - 1
+            n_alive = int(alive.sum())
+            keep = alive[cols]
+            merged = sparse.csr_matrix((data[keep], (rows[keep], remap[cols[keep]])),
+                                       shape=(n_terms, n_alive), dtype=np.float32)
+
+            with self._lock:
+                if epoch != self._epoch:
+                    # Индекс очистили или перезагрузили во время уплотнения
+                    return
+                if n_alive < n_docs:
+                    # Документы, добавленные во время уплотнения, идут следом
+                    added = np.arange(n_alive, n_alive + self.next_doc_id - n_docs,
+                                      dtype=np.int32)
+                    self._renumber(np.concatenate([np.where(alive, remap, -1), added]))
+                self.main = merged
+                self.frozen = {}
+                # Удаления, сделанные во время уплотнения, остаются помеченными
+                self.tombstones -= tombstones
+        except Exception:
+            with self._lock:
+                for term_id, postings in self.frozen.items():
+                    self.delta.setdefault(term_id, {}).update(postings)
+                self.frozen = {}
+            raise
+
+    def _renumber(self, remap):
+        """Перенумеровать документы: старый номер -> remap[номер] (под блокировкой)"""
+        old_ids = np.flatnonzero(remap >= 0)
+        self.doc_lengths = self.doc_lengths[old_ids]
+        self.alive = self.alive[old_ids]
+        self.next_doc_id = len(old_ids)
+        self.doc_ids = {key: int(remap[doc_id]) for key, doc_id in self.doc_ids.items()}
+        self.doc_info = {int(remap[doc_id]): info for doc_id, info in self.doc_info.items()}
+        self.doc_terms = {int(remap[doc_id]): terms for doc_id, terms in self.doc_terms.items()}
+        self.delta = {term_id: {int(remap[doc_id]): tf for doc_id, tf in postings.items()}
+                      for term_id, postings in self.delta.items()}
+
+    def save(self, path):
+        """Сохранить индекс на диск"""
+        with self._lock:
+            state = {
+                'version': INDEX_VERSION,
+                'vocabulary': self.vocabulary,
+                'df': self.df,
+                'doc_ids': self.doc_ids,
+                'doc_info': self.doc_info,
+                'doc_terms': self.doc_terms,
+                'doc_lengths': self.doc_lengths,
+                'alive': self.alive,
+                'next_doc_id': self.next_doc_id,
+                'total_length': self.total_length,
+                'main': self.main,
+                'delta': self._merged_delta(),
+                'tombstones': self.tombstones,
+            }
+            # Сериализуем под блокировкой, чтобы снимок был согласованным
+            payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _merged_delta(self):
+        """Объединить замороженную и текущую дельты"""
+        merged = {term_id: dict(postings) for term_id, postings in self.frozen.items()}
+        for term_id, postings in self.delta.items():
+            merged.setdefault(term_id, {}).update(postings)
+        return merged
+
+    def load(self, path):
+        """Загрузить индекс с диска; False, если файла нет или формат устарел"""
+        if not os.path.exists(path):
+            return False
+
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+
+        if state.get('version') != INDEX_VERSION:
+            return False
+
+        with self._lock:
+            self._reset()
+            for key in ('vocabulary', 'df', 'doc_ids', 'doc_info', 'doc_terms',
+                        'doc_lengths', 'alive', 'next_doc_id', 'total_length',
+                        'main', 'delta', 'tombstones'):
+                setattr(self, key, state[key])
+        return True
@@ -0,0 +1,283 @@
+import json
+import time
+import asyncio
+import threading
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from mediawiki_client import LANGUAGES, PageNotFoundError, DisambiguationError
+from instrumentation import metrics
+
+
+class HttpError(Exception):
+    """Ответ с кодом ошибки HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Типы параметров в теле запроса JSON (в строке запроса все значения - строки)
+PARAM_TYPES = {'q': str, 'title': str, 'language': str,
+               'limit': int, 'offset': int}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class LatencyMetrics:
+    """Время ответа по адресам: число запросов, ошибки и перцентили последних замеров"""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._samples = {}      # адрес -> deque последних времён, мс
+        self._counts = {}       # адрес -> [запросов, ошибок]
+        self._lock = threading.Lock()
+
+    def record(self, path, elapsed_ms, error=False):
+        """Учесть запрос к адресу path"""
+        with self._lock:
+            samples = self._samples.get(path)
+            if samples is None:
+                samples = self._samples[path] = deque(maxlen=self.window)
+                self._counts[path] = [0, 0]
+            samples.append(elapsed_ms)
+            self._counts[path][0] += 1
+            self._counts[path][1] += error
+
+    def snapshot(self):
+        """{адрес: {count, errors, mean_ms, p50_ms, p95_ms, p99_ms}}"""
+        with self._lock:
+            data = {path: (sorted(samples), self._counts[path])
+                    for path, samples in self._samples.items()}
+        result = {}
+        for path, (samples, (count, errors)) in data.items():
+            def percentile(q):
+                return round(samples[min(int(q * len(samples)), len(samples) - 1)], 2)
+            result[path] = {'count': count, 'errors': errors,
+                            'mean_ms': round(sum(samples) / len(samples), 2),
+                            'p50_ms': percentile(0.50), 'p95_ms': percentile(0.95),
+                            'p99_ms': percentile(0.99)}
+        return result
+
+
+class ApiServer:
+    """HTTP JSON API поверх WikiEngine для нескольких клиентов одновременно
+
+    Чтение (вопросы, поиск, просмотр базы) выполняется параллельно в пуле
+    потоков, изменения базы - по одному в единственном потоке записи.
+
+        GET  /ask?q=...&language=ru       ответ ассистента
+        GET  /search?q=...&limit=5        статьи базы знаний (wikipedia=1 - поиск в Википедии)
+        GET  /kb?offset=0&limit=50        статьи базы знаний постранично
+        POST /kb {"title": ..., "language": ...}   добавить статью из Википедии
+        GET  /metrics                     время ответа по адресам, замеры горячих путей
+                                          и попадания в кэши
+    """
+
+    MAX_BODY = 1024 * 1024
+
+    def __init__(self, engine, host="127.0.0.1", port=8765, workers=8):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-writer")
+        self.metrics = LatencyMetrics()
+        self.routes = {
+            ("GET", "/ask"): (self.readers, self.ask),
+            ("POST", "/ask"): (self.readers, self.ask),
+            ("GET", "/search"): (self.readers, self.search),
+            ("GET", "/kb"): (self.readers, self.list_articles),
+            ("POST", "/kb"): (self.writer, self.add_article),
+            ("GET", "/metrics"): (None, lambda params: {'requests': self.metrics.snapshot(),
+                                                        'spans': metrics.snapshot(),
+                                                        'caches': self.engine.cache_stats()}),
+        }
+
+    # Обработчики (выполняются в пулах потоков)
+
+    @staticmethod
+    def _param(params, name, default=None):
+        value = params.get(name, default)
+        if value is None or value == "":
+            raise HttpError(400, f"не указан параметр {name}")
+        return value
+
+    @staticmethod
+    def _language(params):
+        # Язык входит в адрес API Википедии - только известные разделы
+        language = params.get("language", "ru")
+        if language not in LANGUAGES:
+            raise HttpError(400, f"неизвестный язык {language!r}, допустимы: "
+                                 f"{', '.join(LANGUAGES)}")
+        return language
+
+    @staticmethod
+    def _int(params, name, default, upper):
+        try:
+            return max(0, min(int(params.get(name, default)), upper))
+        except (TypeError, ValueError):
+            raise HttpError(400, f"параметр {name} должен быть числом")
+
+    def ask(self, params):
+        query = self._param(params, "q")
+        language = self._language(params)
+        return {'query': query, 'language': language,
+                'response': self.engine.generate_response(query, language)}
+
+    def search(self, params):
+        query = self._param(params, "q")
+        limit = self._int(params, "limit", 5, 50)
+        if params.get("wikipedia") in ("1", "true", True):
+            language = self._language(params)
+            return {'query': query, 'language': language,
+                    'titles': self.engine.fetch_search_results(query, language)[:limit]}
+
+        self.engine.ready.wait()
+        return {'query': query, 'results': [
+            {'title': key.title, 'language': key.language, 'score': round(score, 4),
+             'summary': data.get('summary', ''), 'url': data.get('url', '')}
+            for key, score, data in self.engine.search_articles(query, limit)]}
+
+    def list_articles(self, params):
+        offset = self._int(params, "offset", 0, 10 ** 9)
+        limit = self._int(params, "limit", 50, 500)
+        with self.engine.kb_lock:
+            total = len(self.engine.knowledge_base)
+            # Копируется только запрошенная страница, а не вся база
+            rows = list(islice(self.engine.knowledge_base.items(), offset, offset + limit))
+        return {'total': total, 'offset': offset, 'articles': [
+            {'title': key.title, 'language': key.language, 'summary': data.get('summary', ''),
+             'url': data.get('url', ''), 'timestamp': data.get('timestamp', '')}
+            for key, data in rows]}
+
+    def add_article(self, params):
+        title = self._param(params, "title")
+        language = self._language(params)
+        try:
+            key, data = self.engine.fetch_and_index_article(title, language)
+        except PageNotFoundError:
+            raise HttpError(404, f"страница '{title}' не найдена")
+        except DisambiguationError as e:
+            raise HttpError(400, f"неоднозначный заголовок, варианты: {', '.join(e.options[:10])}")
+        self.engine.set_kb_article(key, data)
+        return {'title': key.title, 'language': key.language, 'added': True}
+
+    # HTTP
+
+    async def handle_connection(self, reader, writer):
+        """Запросы одного соединения (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "неверная строка запроса"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "неверный Content-Length"}, False)
+                    break
+                if length > self.MAX_BODY:
+                    await self._respond(writer, 413, {'error': "слишком большой запрос"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _json_params(body):
+        """Параметры из тела JSON с проверкой типов"""
+        try:
+            params = json.loads(body)
+        except ValueError:
+            params = None
+        if not isinstance(params, dict):
+            raise HttpError(400, "тело запроса должно быть объектом JSON")
+        for name, kind in PARAM_TYPES.items():
+            value = params.get(name)
+            if value is not None and (not isinstance(value, kind) or isinstance(value, bool)):
+                raise HttpError(400, f"параметр {name} должен быть "
+                                     f"{'строкой' if kind is str else 'целым числом'}")
+        return params
+
+    async def dispatch(self, method, target, body):
+        """Выполнить запрос: (код, данные ответа)"""
+        url = urlsplit(target)
+        start = time.perf_counter()
+        error = True
+        # Неизвестные адреса учитываются вместе, чтобы метрики не росли без границ
+        path = url.path if any(url.path == p for _, p in self.routes) else "other"
+        try:
+            route = self.routes.get((method, url.path))
+            if route is None:
+                paths = {path for _, path in self.routes}
+                raise HttpError(405 if url.path in paths else 404, f"нет обработчика {url.path}")
+
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            if body:
+                params.update(self._json_params(body))
+
+            executor, handler = route
+            if executor is None:
+                payload = handler(params)
+            else:
+                payload = await asyncio.get_running_loop().run_in_executor(executor, handler,
+                                                                           params)
+            error = False
+            return 200, payload
+        except HttpError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            print(f"Ошибка обработки {method} {url.path}: {e}")
+            return 500, {'error': str(e)}
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.metrics.record(path, elapsed_ms, error)
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self):
+        """Принимать соединения до остановки"""
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"🌐 API: http://{self.host}:{self.port} (/ask, /search, /kb, /metrics)")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Остановить пулы; начатая запись в базу завершается"""
+        self.readers.shutdown(wait=False, cancel_futures=True)
+        self.writer.shutdown(wait=True)
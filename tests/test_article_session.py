@@ -0,0 +1,88 @@
+"""Статьи сеанса: одна загрузка на просмотр, добавление в базу и ответ"""
+
+import threading
+
+import pytest
+
+from article_session import Article, ArticleSession
+
+
+def make_fetch(calls, gate=None):
+    def fetch(topic, language='ru', **options):
+        calls.append((topic, language, options))
+        if gate is not None:
+            assert gate.wait(10)
+        title = "Физика" if topic.lower().startswith("физ") else topic
+        return Article(title, f"текст {language}", "кратко", "", 1, language)
+    return fetch
+
+
+def test_open_then_add_reuses_article():
+    calls = []
+    session = ArticleSession(make_fetch(calls))
+    article = session.open("Физика", 'ru', auto_suggest=False)
+    assert session.current is article
+    assert session.get("физика", 'ru', auto_suggest=False) is article
+    assert session.peek("  ФИЗИКА ") is article
+    assert calls == [("Физика", 'ru', {'auto_suggest': False})]
+
+
+def test_query_remembered_as_alias():
+    calls = []
+    session = ArticleSession(make_fetch(calls))
+    article = session.get("физ наука")
+    # Заголовок, к которому привёл запрос, тоже не загружается повторно
+    assert session.get("Физика") is article
+    assert session.peek("физ наука") is article
+    assert len(calls) == 1
+
+
+def test_languages_are_separate():
+    calls = []
+    session = ArticleSession(make_fetch(calls))
+    assert session.get("Физика", 'ru').content == "текст ru"
+    assert session.get("Физика", 'en').content == "текст en"
+    assert session.peek("Физика", 'de') is None
+    assert len(calls) == 2
+
+
+def test_concurrent_requests_share_one_fetch():
+    calls, gate = [], threading.Event()
+    session = ArticleSession(make_fetch(calls, gate))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(session.get("Физика")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 5 and all(article is results[0] for article in results)
+
+
+def test_failed_fetch_is_retried():
+    attempts = []
+
+    def fetch(topic, language='ru'):
+        attempts.append(topic)
+        if len(attempts) == 1:
+            raise ConnectionError("нет сети")
+        return Article(topic, "", "", "")
+
+    session = ArticleSession(fetch)
+    with pytest.raises(ConnectionError):
+        session.get("Химия")
+    assert session.get("Химия").title == "Химия"
+    assert attempts == ["Химия", "Химия"]
+
+
+def test_bounded():
+    calls = []
+    session = ArticleSession(make_fetch(calls), max_articles=3)
+    for topic in ("А", "Б", "В", "Г"):
+        session.get(topic)
+    assert session.peek("А") is None
+    assert session.peek("Г") is not None
+    session.get("А")
+    assert len(calls) == 5
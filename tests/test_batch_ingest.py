@@ -0,0 +1,47 @@
+"""Пакетная загрузка: проверка заголовков пачками и одна загрузка на статью"""
+
+from article_session import Article
+from batch_ingest import BatchIngestor
+from mediawiki_client import PageNotFoundError
+
+
+def test_resolve_in_batches():
+    resolve_calls, fetched = [], []
+
+    def resolve(titles, language):
+        resolve_calls.append(list(titles))
+        resolved = {}
+        for title in titles:
+            if title.startswith("Нет"):
+                resolved[title] = PageNotFoundError(title)
+            else:
+                resolved[title] = (title.replace("Перенаправление", "Статья"), 1)
+        return resolved
+
+    def fetch(title, language, revision_id):
+        fetched.append((title, revision_id))
+        return Article(title, "текст", "текст", "", revision_id, language)
+
+    ingestor = BatchIngestor(fetch, rate=1000.0, resolve=resolve)
+    titles = [f"Статья {i}" for i in range(120)] + ["Перенаправление 3", "Нет такой"]
+    progress = []
+    articles, errors = ingestor.run(titles, on_progress=lambda done, total: progress.append(done))
+
+    assert [len(chunk) for chunk in resolve_calls] == [50, 50, 22]
+    assert len(articles) == 120
+    assert len(fetched) == 120                    # «Перенаправление 3» - та же статья
+    assert all(revision == 1 for _, revision in fetched)
+    assert [title for title, _ in errors] == ["Нет такой"]
+    assert progress[-1] == len(titles)
+
+
+def test_without_resolve():
+    fetched = []
+
+    def fetch(title, language, revision_id):
+        fetched.append((title, revision_id))
+        return Article(title, "", "", "", None, language)
+
+    articles, errors = BatchIngestor(fetch, rate=1000.0).run(["А", "Б", "А", " "])
+    assert sorted(fetched) == [("А", None), ("Б", None)]
+    assert len(articles) == 2 and not errors
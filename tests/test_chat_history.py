@@ -0,0 +1,57 @@
+"""Журнал чата: дозапись, чтение по смещениям, восстановление после сбоя"""
+
+import pytest
+
+from chat_history import ChatHistory
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "chat_history.jsonl")
+
+
+def test_append_and_read(path):
+    history = ChatHistory(path)
+    try:
+        assert history.append("Привет", is_user=True) == 0
+        assert history.append("Здравствуйте!\nЗадавайте вопросы.") == 1
+        for i in range(1000):
+            history.append(f"сообщение {i}")
+        assert len(history) == 1002
+        assert history.read(0, 2) == [("Привет", True),
+                                      ("Здравствуйте!\nЗадавайте вопросы.", False)]
+        assert history.read(1000, 5000) == [("сообщение 998", False), ("сообщение 999", False)]
+        assert history.read(-3, 1) == [("Привет", True)]
+        assert history.read(5, 5) == [] and history.read(2000, 2010) == []
+    finally:
+        history.close()
+
+
+def test_reopen_keeps_offsets(path):
+    history = ChatHistory(path)
+    history.append("первый сеанс", is_user=True)
+    history.close()
+
+    history = ChatHistory(path)
+    try:
+        assert len(history) == 1
+        assert history.append("второй сеанс") == 1
+        assert history.read(0, 2) == [("первый сеанс", True), ("второй сеанс", False)]
+    finally:
+        history.close()
+
+
+def test_truncated_line_is_dropped(path):
+    history = ChatHistory(path)
+    history.append("целое сообщение")
+    history.close()
+    with open(path, 'ab') as f:
+        f.write('{"t": "2024-01-01T00:00:00", "u": false, "m": "оборв'.encode('utf-8'))
+
+    history = ChatHistory(path)
+    try:
+        assert len(history) == 1
+        history.append("после сбоя")
+        assert history.read(0, 2) == [("целое сообщение", False), ("после сбоя", False)]
+    finally:
+        history.close()
@@ -0,0 +1,92 @@
+"""Загрузка статей из небольшого дампа: статья, перенаправление, служебная страница"""
+
+import os
+
+import pytest
+
+from dump_ingest import ingest_dump, iter_pages, _batches
+from kb_store import KnowledgeBaseStore, ArticleKey
+
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures",
+                       "ruwiki-sample.xml.bz2")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = KnowledgeBaseStore(str(tmp_path / "knowledge_base.db"))
+    yield store
+    store.close()
+
+
+def test_iter_pages():
+    pages = list(iter_pages(FIXTURE))
+    assert [page['title'] for page in pages] == ["Физика", "Физика (наука)",
+                                                 "Обсуждение:Физика", "Химия"]
+    assert pages[1]['redirect'] == "Физика"
+    assert pages[2]['ns'] == "1"
+
+
+def test_articles_and_redirects(store):
+    batches = []
+    written = ingest_dump(store, FIXTURE, processes=1, on_batch=batches.append)
+
+    assert written == 2
+    assert sorted(title for batch in batches for title, _ in batch) == ["Физика", "Химия"]
+
+    metadata = store.load_metadata()
+    assert set(metadata) == {ArticleKey('ru', "Физика"), ArticleKey('ru', "Химия")}
+    physics = metadata[ArticleKey('ru', "Физика")]
+    assert physics['redirects'] == ["Физика (наука)"]
+    assert physics['url'] == "https://ru.wikipedia.org/wiki/%D0%A4%D0%B8%D0%B7%D0%B8%D0%BA%D0%B0"
+    assert physics['timestamp'] == "2024-05-01T10:00:00Z"
+
+    content = store.get_content("Физика")
+    assert content.startswith("Физика — естественная наука, изучающая законы природы.")
+    assert "== История ==" in content
+    for markup in ("[[", "{{", "<ref", "Категория", "'''"):
+        assert markup not in content
+    assert physics['summary'] == "Физика — естественная наука, изучающая законы природы."
+
+
+def test_limit(store):
+    assert ingest_dump(store, FIXTURE, limit=1, processes=1) == 1
+    assert list(store.load_metadata()) == [ArticleKey('ru', "Физика")]
+    # Перенаправление встретилось до остановки - оно сохранено
+    assert store.load_metadata()[ArticleKey('ru', "Физика")]['redirects'] == ["Физика (наука)"]
+
+
+def page_xml(title, text="", redirect=None):
+    redirect = f'<redirect title="{redirect}" />' if redirect else ""
+    return (f"<page><title>{title}</title><ns>0</ns>{redirect}<revision>"
+            f"<timestamp>2024-05-01T10:00:00Z</timestamp><text>{text}</text></revision></page>")
+
+
+def test_redirects_saved_per_batch(tmp_path, store):
+    path = str(tmp_path / "dump.xml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<mediawiki>")
+        f.write(page_xml("Хим", redirect="Химия"))              # раньше своей статьи
+        f.write(page_xml("Физика", "Физика — естественная наука о природе."))
+        f.write(page_xml("Физ", redirect="Физика"))
+        f.write(page_xml("Химия", "Химия — наука о веществах и их превращениях."))
+        f.write(page_xml("Химия (наука)", redirect="Химия#История"))
+        f.write(page_xml("Алхимия", redirect="Нет такой статьи"))
+        f.write("</mediawiki>")
+
+    assert ingest_dump(store, path, processes=1, batch_size=1) == 2
+    metadata = store.load_metadata()
+    assert metadata[ArticleKey('ru', "Физика")]['redirects'] == ["Физ"]
+    assert sorted(metadata[ArticleKey('ru', "Химия")]['redirects']) == ["Хим", "Химия (наука)"]
+
+
+def test_batches_do_not_accumulate_redirects():
+    pages = []
+    for i in range(6):
+        pages.append({'title': f"Статья {i}", 'ns': '0', 'redirect': None})
+        pages.append({'title': f"Перенаправление {i}", 'ns': '0', 'redirect': f"Статья {i}"})
+    batches = list(_batches(pages, 2))
+    assert all(len(batch) <= 2 for batch, _ in batches)
+    assert sum(len(batch) for batch, _ in batches) == 6
+    assert all(len(redirects) <= 2 for _, redirects in batches)
+    assert sum(len(redirects) for _, redirects in batches) == 6
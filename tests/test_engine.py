@@ -0,0 +1,154 @@
+"""Ответы движка по базе знаний без сети"""
+
+import sqlite3
+
+import pytest
+
+from article_session import Article
+from engine import WikiEngine
+
+
+MOSCOW = Article(
+    "Москва",
+    "Москва — столица России, крупнейший по численности населения город страны.\n\n"
+    "Москва основана в 1147 году. В 1812 году, во время войны с Наполеоном, "
+    "город сгорел и был отстроен заново. Сегодня это центр мировой культуры и школ.",
+    "Москва — столица России.", "https://ru.wikipedia.org/wiki/Москва")
+
+
+class OfflineEngine(WikiEngine):
+    """Википедия подменена заглушкой, которая считает обращения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wiki_queries = []
+
+    def ensure_nltk_data(self):
+        return False
+
+    def search_in_wikipedia_direct(self, query, language='ru'):
+        self.wiki_queries.append(query)
+        return "🔍 из Википедии"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = OfflineEngine(data_dir=str(tmp_path), notify=lambda message: None)
+    engine.kb_store.upsert_article(MOSCOW.title, MOSCOW.to_kb_record())
+    engine.start()
+    yield engine
+    engine.close()
+
+
+def test_kb_hit(engine):
+    response = engine.generate_response("столица России Москва")
+    assert response.startswith("📚")
+    assert "**Статья:** Москва" in response
+    assert engine.wiki_queries == []
+
+
+@pytest.mark.parametrize("query", ["Кто написал Войну и мир", "когда была основана школа",
+                                   "численность населения Китая"])
+def test_unrelated_query_goes_to_wikipedia(engine, query):
+    assert engine.search_articles(query)            # общие слова с «Москвой» есть
+    assert engine.search_in_knowledge_base(query) is None
+    assert engine.generate_response(query) == "🔍 из Википедии"
+    assert engine.wiki_queries == [query]
+
+
+def test_offline_miss(engine):
+    engine.use_wikipedia = False
+    assert engine.generate_response("численность населения Китая") == (
+        "В базе знаний нет информации по этому вопросу.")
+    assert engine.wiki_queries == []
+
+
+def test_response_cache(engine):
+    searched = []
+    search = engine.search_in_knowledge_base
+    engine.search_in_knowledge_base = lambda query: searched.append(query) or search(query)
+
+    first = engine.generate_response("Столица России Москва")
+    # Тот же вопрос с точностью до словоформ, регистра и пробелов - из кэша
+    assert engine.generate_response("  столицы РОССИИ москвы") == first
+    assert searched == ["Столица России Москва"]
+    # Ответы разных разделов Википедии хранятся отдельно
+    engine.generate_response("Столица России Москва", language='en')
+    assert len(searched) == 2
+    assert engine.response_cache.stats()['hits'] == 1
+
+
+def test_response_cache_invalidated_by_kb_change(engine):
+    engine.generate_response("Столица России Москва")
+    assert len(engine.response_cache) == 1
+    key = next(iter(engine.knowledge_base))
+    engine.set_kb_article(key, dict(engine.knowledge_base[key], summary="Новое"))
+    assert len(engine.response_cache) == 0
+    engine.generate_response("Столица России Москва")
+    engine.remove_kb_article(key)
+    assert len(engine.response_cache) == 0
+
+
+def test_errors_not_cached(engine):
+    engine.search_in_wikipedia_direct = lambda query, language='ru': "❌ Не удалось найти информацию."
+    assert engine.generate_response("численность населения Китая").startswith("❌")
+    assert len(engine.response_cache) == 0
+
+
+
+class Downloads:
+    """Подменяет поиск и загрузку данных NLTK: на диске ничего нет"""
+
+    def __init__(self, ok):
+        self.ok = ok
+        self.packages = []
+
+    def __call__(self, package, quiet=False):
+        self.packages.append(package)
+        return self.ok
+
+
+def no_nltk_data(monkeypatch, download):
+    import nltk
+
+    def find(resource):
+        raise LookupError(resource)
+
+    monkeypatch.setattr(nltk.data, "find", find)
+    monkeypatch.setattr(nltk, "download", download)
+
+
+@pytest.mark.parametrize("ok", [False, True])
+def test_nltk_download_result_checked(tmp_path, monkeypatch, ok):
+    download = Downloads(ok)
+    no_nltk_data(monkeypatch, download)
+    messages = []
+    engine = WikiEngine(data_dir=str(tmp_path), notify=messages.append)
+    try:
+        assert engine.ensure_nltk_data() is ok
+    finally:
+        engine.close()
+    assert download.packages == ["punkt_tab", "stopwords"]
+    assert messages[-1] == ("✅ Данные NLTK загружены" if ok else
+                            "❌ Не удалось загрузить данные NLTK: punkt_tab, stopwords")
+
+
+def test_offline_does_not_download_nltk_data(tmp_path, monkeypatch):
+    download = Downloads(True)
+    no_nltk_data(monkeypatch, download)
+    messages = []
+    engine = WikiEngine(data_dir=str(tmp_path), notify=messages.append, use_wikipedia=False)
+    try:
+        assert engine.ensure_nltk_data() is False
+    finally:
+        engine.close()
+    assert download.packages == []
+    assert messages == ["⚠️ Нет данных NLTK (punkt_tab, stopwords) - работаю без них"]
+
+
+def test_close_releases_stores(tmp_path):
+    engine = WikiEngine(data_dir=str(tmp_path), notify=lambda message: None)
+    engine.close()
+    for conn in (engine.kb_store.conn, engine.page_cache.conn):
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,84 @@
+"""Замеры горячих путей: гистограммы, включение, выгрузка в JSON и Prometheus"""
+
+import json
+
+import pytest
+
+from instrumentation import BUCKETS, Histogram, Metrics
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    for seconds in [0.002] * 90 + [0.2] * 9 + [3.0]:
+        histogram.observe(seconds)
+    assert histogram.count == 100 and histogram.total == pytest.approx(4.98)
+    # Квантиль - верхняя граница корзины, но не больше максимума
+    assert histogram.quantile(0.5) == 0.0025
+    assert histogram.quantile(0.95) == 0.25
+    assert histogram.quantile(1.0) == 3.0
+    histogram.observe(60.0)                  # за последней границей - корзина +Inf
+    assert histogram.counts[len(BUCKETS)] == 1 and histogram.quantile(1.0) == 60.0
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    calls = []
+
+    @metrics.timed("функция")
+    def func(x):
+        calls.append(x)
+        return x * 2
+
+    with metrics.span("блок"):
+        pass
+    assert func(2) == 4 and calls == [2]
+    assert func.__name__ == "func"
+    assert metrics.snapshot() == {}
+
+
+def test_span_and_timed():
+    metrics = Metrics(enabled=True)
+
+    @metrics.timed("функция")
+    def fail():
+        raise ValueError("ошибка")
+
+    with pytest.raises(ValueError):
+        fail()
+    with pytest.raises(KeyError):
+        with metrics.span("блок"):
+            raise KeyError("ключ")
+    with metrics.span("блок"):
+        pass
+
+    snapshot = metrics.snapshot()
+    # Замер учитывается и тогда, когда код завершился исключением
+    assert list(snapshot) == ["блок", "функция"]
+    assert snapshot["блок"]['count'] == 2 and snapshot["функция"]['count'] == 1
+    assert json.loads(metrics.to_json()) == snapshot
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_snapshot_values():
+    metrics = Metrics(enabled=True)
+    metrics.observe("поиск", 0.004)
+    metrics.observe("поиск", 0.006)
+    assert metrics.snapshot() == {"поиск": {
+        'count': 2, 'total_s': 0.01, 'mean_ms': 5.0, 'p50_ms': 5.0, 'p95_ms': 6.0,
+        'p99_ms': 6.0, 'max_ms': 6.0}}
+
+
+def test_to_prometheus():
+    metrics = Metrics(enabled=True)
+    metrics.observe("kb.write", 0.003)
+    metrics.observe("kb.write", 0.02)
+    lines = metrics.to_prometheus().splitlines()
+    assert lines[1] == "# TYPE wikiai_span_seconds histogram"
+    assert 'wikiai_span_seconds_bucket{span="kb.write",le="0.001"} 0' in lines
+    assert 'wikiai_span_seconds_bucket{span="kb.write",le="0.005"} 1' in lines
+    assert 'wikiai_span_seconds_bucket{span="kb.write",le="+Inf"} 2' in lines
+    assert 'wikiai_span_seconds_sum{span="kb.write"} 0.023000' in lines
+    assert lines[-1] == 'wikiai_span_seconds_count{span="kb.write"} 2'
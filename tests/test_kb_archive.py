@@ -0,0 +1,90 @@
+"""Экспорт и импорт базы в JSON Lines: потоковая запись, дубликаты по timestamp"""
+
+import json
+
+import pytest
+
+from kb_archive import export_jsonl, import_jsonl, iter_jsonl
+from kb_store import KnowledgeBaseStore, ArticleKey
+
+
+def article(content, timestamp, url='', language='ru'):
+    return {'content': content, 'summary': content[:20], 'url': url,
+            'language': language, 'timestamp': timestamp, 'redirects': []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = KnowledgeBaseStore(str(tmp_path / "knowledge_base.db"))
+    yield store
+    store.close()
+
+
+def write_lines(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(record if isinstance(record, str) else json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+
+
+@pytest.mark.parametrize("name", ["kb.jsonl", "kb.jsonl.gz"])
+def test_round_trip(tmp_path, store, name):
+    for i in range(1205):
+        store.upsert_article(f"Статья {i}", article(f"текст {i}", "2024-01-01", f"u/{i}"))
+    store.upsert_article("Physics", article("text", "2024-01-02", language='en'))
+    path = str(tmp_path / name)
+    progress = []
+    assert export_jsonl(store, path, on_progress=progress.append) == 1206
+    assert progress == [1000]
+
+    target = KnowledgeBaseStore(str(tmp_path / "target.db"))
+    try:
+        batches = []
+        assert import_jsonl(target, path, on_batch=batches.append, batch_size=500) == (1206, 0)
+        assert [len(batch) for batch in batches] == [500, 500, 206]
+        assert target.load_metadata().keys() == store.load_metadata().keys()
+        assert target.get_content("Physics", 'en') == "text"
+        assert target.get_content("Статья 1204") == "текст 1204"
+    finally:
+        target.close()
+
+
+def test_duplicates_keep_newer(tmp_path, store):
+    store.upsert_article("Физика", article("старый текст", "2024-01-01", "u/физика"))
+    store.upsert_article("Химия", article("новый текст", "2024-06-01", "u/химия"))
+    store.upsert_article("Старое имя", article("до переименования", "2024-01-01", "u/био"))
+    path = str(tmp_path / "kb.jsonl")
+    write_lines(path, [
+        dict(article("новый текст", "2024-06-01", "u/физика"), title="Физика"),
+        dict(article("старый текст", "2024-01-01", "u/химия"), title="Химия"),
+        dict(article("после переименования", "2024-02-01", "u/био"), title="Биология"),
+        "{битая строка",
+        dict(article("other", "2024-01-01", "u/физика", language='en'), title="Физика"),
+    ])
+
+    in_transaction = []
+
+    def on_batch(records):
+        in_transaction.append(store._depth)
+        batches.append(records)
+
+    batches = []
+    assert import_jsonl(store, path, on_batch=on_batch) == (3, 1)
+    assert in_transaction == [0]
+    assert [(title, old_title) for title, _, old_title in batches[0]] == [
+        ("Физика", "Физика"), ("Биология", "Старое имя"), ("Физика", None)]
+
+    assert store.get_content("Физика") == "новый текст"
+    assert store.get_content("Химия") == "новый текст"
+    assert store.get_content("Биология") == "после переименования"
+    assert store.get_content("Старое имя") is None
+    assert store.get_content("Физика", 'en') == "other"
+    assert ArticleKey('en', "Физика") in store.load_metadata()
+
+
+def test_iter_jsonl_defaults(tmp_path):
+    path = str(tmp_path / "kb.jsonl")
+    write_lines(path, [{'title': "Физика"}, "", {'content': "без заголовка"}])
+    assert list(iter_jsonl(path)) == [("Физика", {'content': '', 'summary': '', 'url': '',
+                                                  'language': '', 'timestamp': '',
+                                                  'redirects': []})]
@@ -0,0 +1,95 @@
+"""Хранилище базы знаний: сжатый текст, метаданные без текста, перенос старых баз"""
+
+import sqlite3
+
+import pytest
+
+from kb_store import (KnowledgeBaseStore, ArticleKey, COMPRESSED_MAGIC, SCHEMA_VERSION,
+                      compress_content, decompress_content)
+
+
+CONTENT = ("Москва — столица Российской Федерации, город федерального значения.\n\n"
+           "== История ==\nПервое упоминание о Москве относится к 1147 году.\n\n"
+           "== Население ==\nНаселение города составляет около 13 млн человек.\n") * 3
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = KnowledgeBaseStore(str(tmp_path / "knowledge_base.db"))
+    yield store
+    store.close()
+
+
+def raw_content(store, title):
+    return store.conn.execute("SELECT c.content, c.size FROM contents c "
+                              "JOIN articles a ON a.id = c.article_id WHERE a.title = ?",
+                              (title,)).fetchone()
+
+
+def test_compression_round_trip():
+    blob = compress_content(CONTENT)
+    assert blob.startswith(COMPRESSED_MAGIC)
+    assert len(blob) < len(CONTENT.encode('utf-8')) / 3
+    assert decompress_content(blob) == CONTENT
+    # Записи, сохранённые до сжатия, читаются как есть
+    assert decompress_content("Старый текст".encode('utf-8')) == "Старый текст"
+    assert decompress_content(compress_content("")) == ""
+
+
+def test_content_stored_compressed(store):
+    store.upsert_article("Москва", {'content': CONTENT, 'summary': "Столица",
+                                    'url': "u/Москва", 'timestamp': "1"})
+    blob, size = raw_content(store, "Москва")
+    assert blob.startswith(COMPRESSED_MAGIC) and size == len(CONTENT)
+    assert store.get_content("Москва") == CONTENT
+
+    # Метаданные читаются без текста, вместо него - длина
+    metadata = store.load_metadata()[ArticleKey('ru', "Москва")]
+    assert 'content' not in metadata and metadata['size'] == len(CONTENT)
+    assert metadata['summary'] == "Столица"
+
+    # Обновление без текста меняет только метаданные
+    store.upsert_article("Москва", {'summary': "Новое", 'timestamp': "2"})
+    assert store.get_content("Москва") == CONTENT
+    assert store.load_metadata()[ArticleKey('ru', "Москва")]['summary'] == "Новое"
+
+
+def test_migrates_uncompressed_database(tmp_path):
+    path = str(tmp_path / "knowledge_base.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE articles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE,
+            summary TEXT NOT NULL DEFAULT '',
+            url TEXT NOT NULL DEFAULT '',
+            language TEXT NOT NULL DEFAULT 'ru',
+            timestamp TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE contents (
+            article_id INTEGER PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+            content BLOB NOT NULL
+        );
+        PRAGMA user_version = 1;
+    """)
+    conn.execute("INSERT INTO articles (id, title, summary) VALUES (7, 'Москва', 'Столица')")
+    conn.execute("INSERT INTO contents (article_id, content) VALUES (7, ?)",
+                 (CONTENT.encode('utf-8'),))
+    conn.commit()
+    conn.close()
+
+    store = KnowledgeBaseStore(path)
+    try:
+        assert store.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        blob, size = raw_content(store, "Москва")
+        assert blob.startswith(COMPRESSED_MAGIC) and size == len(CONTENT)
+        assert store.get_content("Москва") == CONTENT
+        metadata = store.load_metadata()
+        assert metadata[ArticleKey('ru', "Москва")]['redirects'] == []
+
+        # После переноса заголовок уникален только в пределах языка
+        store.upsert_article("Москва", {'content': "Moscow", 'language': 'en'})
+        assert store.get_content("Москва", 'en') == "Moscow"
+        assert store.get_content("Москва", 'ru') == CONTENT
+    finally:
+        store.close()
@@ -0,0 +1,141 @@
+"""MediaWikiClient против локального HTTP-сервера-заглушки"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from mediawiki_client import (MediaWikiClient, MediaWikiClients, MAX_TITLES, PageNotFoundError,
+                              UnsupportedLanguageError, WikiError)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = {name: values[-1]
+                  for name, values in parse_qs(urlsplit(self.path).query).items()}
+        self.server.requests.append(params)
+        status, headers, payload = self.server.respond(params)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    """Сервер-заглушка: stub.respond(params) -> (код, заголовки, JSON)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub):
+    host, port = stub.server_address
+    client = MediaWikiClient('ru', base_url=f"http://{host}:{port}/w/api.php")
+    yield client
+    client.close()
+
+
+def test_continuation(stub, client):
+    members = [f"Статья {i}" for i in range(5)]
+
+    def respond(params):
+        start = int(params.get('cmcontinue', 0))
+        page = members[start:start + 2]
+        payload = {'query': {'categorymembers': [{'title': t} for t in page]}}
+        if start + 2 < len(members):
+            payload['continue'] = {'cmcontinue': str(start + 2), 'continue': '-||'}
+        return 200, {}, payload
+
+    stub.respond = respond
+    assert client.category_members("Физика") == members
+    assert len(stub.requests) == 3
+    assert stub.requests[0]['cmtitle'] == "Категория:Физика"
+    assert [r.get('cmcontinue') for r in stub.requests] == [None, '2', '4']
+
+
+def test_maxlag_retry(stub, client):
+    def respond(params):
+        if len(stub.requests) < 3:
+            return 200, {'Retry-After': '0'}, {
+                'error': {'code': 'maxlag', 'info': 'Waiting for replicas: 7 seconds lagged'}}
+        return 200, {}, {'query': {'search': [{'title': "Физика"}]}}
+
+    stub.respond = respond
+    assert client.search("физика") == ["Физика"]
+    assert len(stub.requests) == 3
+    assert all(r['maxlag'] == '5' for r in stub.requests)
+
+
+def test_maxlag_gives_up(stub, client):
+    stub.respond = lambda params: (200, {'Retry-After': '0'}, {
+        'error': {'code': 'maxlag', 'info': 'Waiting for replicas'}})
+    with pytest.raises(WikiError):
+        client.search("физика")
+    assert len(stub.requests) == client.lag_retries + 1
+
+
+def test_batched_page_info(stub, client):
+    def respond(params):
+        titles = params['titles'].split("|")
+        pages, redirects = [], []
+        for title in titles:
+            if title.startswith("Нет"):
+                pages.append({'title': title, 'missing': True})
+            elif title.startswith("Перенаправление"):
+                target = title.replace("Перенаправление", "Статья")
+                redirects.append({'from': title, 'to': target})
+                pages.append({'title': target, 'lastrevid': 7, 'fullurl': f"u/{target}"})
+            elif title.startswith("Значения"):
+                pages.append({'title': title, 'lastrevid': 3,
+                              'pageprops': {'disambiguation': ''}})
+            else:
+                pages.append({'title': title, 'lastrevid': 1, 'fullurl': f"u/{title}"})
+        return 200, {}, {'query': {'pages': pages, 'redirects': redirects}}
+
+    stub.respond = respond
+    titles = ([f"Статья {i}" for i in range(110)] + ["Нет такой", "Перенаправление 5",
+                                                      "Значения"])
+    info = client.page_info(titles)
+
+    assert len(stub.requests) == 3
+    assert all(len(r['titles'].split("|")) <= MAX_TITLES for r in stub.requests)
+    assert stub.requests[0]['prop'] == 'info|pageprops'
+    assert info["Статья 0"] == {'title': "Статья 0", 'url': "u/Статья 0", 'revision_id': 1,
+                                'disambiguation': False}
+    assert "Нет такой" not in info
+    assert info["Перенаправление 5"]['title'] == "Статья 5"
+    assert info["Значения"]['disambiguation'] is True
+
+
+def test_get_article_missing(stub, client):
+    stub.respond = lambda params: (200, {}, {'query': {'pages': [
+        {'title': params['titles'], 'missing': True}]}})
+    with pytest.raises(PageNotFoundError):
+        client.get_article("Нет такой", auto_suggest=False)
+
+
+def test_clients_reject_unknown_language():
+    clients = MediaWikiClients()
+    try:
+        assert clients.get('en').base_url == "https://en.wikipedia.org/w/api.php"
+        for language in ("127.0.0.1:9/x?", "evil.example/x?", "xx"):
+            with pytest.raises(UnsupportedLanguageError):
+                clients.get(language)
+        assert list(clients._clients) == ['en']
+    finally:
+        clients.close()
@@ -0,0 +1,78 @@
+"""Нормализатор текста: стоп-слова, запоминание основ, пакетный стемминг, сохранение"""
+
+import threading
+
+from normalizer import TextNormalizer
+
+
+class CountingStemmer:
+    """Отрезает последнюю букву и считает вызовы"""
+
+    def __init__(self):
+        self.calls = []
+
+    def stem(self, token):
+        self.calls.append(token)
+        return token[:-1]
+
+
+def test_analyze():
+    normalizer = TextNormalizer(CountingStemmer(), {"и", "в", "это"})
+    assert normalizer.analyze("Кошки и собаки, это в доме! А") == ["кошк", "собак", "дом"]
+    assert normalizer.stem("Собаки") == "Собак"
+
+
+def test_each_word_stemmed_once():
+    stemmer = CountingStemmer()
+    normalizer = TextNormalizer(stemmer, set())
+    texts = ["кошки собаки кошки", "собаки мыши", "кошки"]
+    assert normalizer.analyze_batch(texts) == [["кошк", "собак", "кошк"], ["собак", "мыш"],
+                                               ["кошк"]]
+    assert sorted(stemmer.calls) == ["кошки", "мыши", "собаки"]
+    assert normalizer.analyze("мыши кошки") == ["мыш", "кошк"]
+    assert len(stemmer.calls) == 3
+    assert normalizer.stats() == {'size': 3, 'hits': 2, 'misses': 3}
+
+
+def test_lru_bound():
+    stemmer = CountingStemmer()
+    normalizer = TextNormalizer(stemmer, set(), max_size=2)
+    normalizer.analyze("аа бб")
+    normalizer.analyze("аа")         # «аа» становится свежее «бб», вытесняется «бб»
+    normalizer.analyze("вв")
+    assert len(normalizer) == 2
+    normalizer.analyze("аа вв")
+    assert len(stemmer.calls) == 3
+    normalizer.analyze("бб")
+    assert len(stemmer.calls) == 4
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "knowledge_base.stems")
+    normalizer = TextNormalizer(CountingStemmer(), set(), path=path)
+    normalizer.save()                        # пустой словарь не пишется
+    assert not (tmp_path / "knowledge_base.stems").exists()
+    normalizer.analyze("кошки собаки")
+    normalizer.save()
+
+    stemmer = CountingStemmer()
+    loaded = TextNormalizer(stemmer, set(), path=path)
+    assert loaded.load()
+    assert loaded.analyze("собаки кошки") == ["собак", "кошк"]
+    assert stemmer.calls == []
+    assert not TextNormalizer(stemmer, set(), path=str(tmp_path / "нет")).load()
+
+
+def test_threads_share_memo():
+    stemmer = CountingStemmer()
+    normalizer = TextNormalizer(stemmer, set())
+    words = " ".join(f"слово{i}" for i in range(200))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(normalizer.analyze(words)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result == results[0] for result in results)
+    assert len(normalizer) == 200
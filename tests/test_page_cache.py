@@ -0,0 +1,96 @@
+"""Кэш страниц на диске: срок хранения, вытеснение LRU, устаревшие записи при ошибке сети"""
+
+import pytest
+
+import page_cache
+from page_cache import PageCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = PageCache(str(tmp_path / "page_cache.db"), ttl=60, max_bytes=1000)
+    yield cache
+    cache.close()
+
+
+def test_normalized_keys_and_languages(cache):
+    cache.put('ru', "page", "Искусственный_интеллект", {'title': "ИИ"})
+    assert cache.get('ru', "page", "  искусственный   интеллект ") == {'title': "ИИ"}
+    assert cache.get('en', "page", "Искусственный интеллект") is None
+    assert cache.get('ru', "search", "Искусственный интеллект") is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_ttl(cache, clock):
+    cache.put('ru', "search", "физика", ["Физика"])
+    clock.now += 59
+    assert cache.get('ru', "search", "физика") == ["Физика"]
+    clock.now += 2
+    assert cache.get('ru', "search", "физика") is None
+
+    calls = []
+    assert cache.get_or_fetch('ru', "search", "физика",
+                              lambda: calls.append(1) or ["Физика", "Физик"]) == ["Физика", "Физик"]
+    assert calls == [1]
+    assert cache.get('ru', "search", "физика") == ["Физика", "Физик"]
+
+
+def test_stale_entry_on_network_error(cache, clock):
+    cache.put('ru', "page", "Физика", {'title': "Физика"})
+    clock.now += 3600
+
+    def offline():
+        raise ConnectionError("нет сети")
+
+    assert cache.get_or_fetch('ru', "page", "Физика", offline) == {'title': "Физика"}
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch('ru', "page", "Химия", offline)
+
+
+def test_lru_eviction(cache, clock):
+    for i in range(5):
+        clock.now += 1
+        cache.put('ru', "page", f"статья {i}", "x" * 150)
+    # Чтение обновляет время доступа: «статья 0» становится свежей
+    clock.now += 1
+    assert cache.get('ru', "page", "статья 0") is not None
+
+    clock.now += 1
+    cache.put('ru', "page", "статья 5", "x" * 300)
+    stats = cache.stats()
+    assert stats['bytes'] <= 900
+    assert cache.get('ru', "page", "статья 0") is not None
+    assert cache.get('ru', "page", "статья 5") is not None
+    assert cache.get('ru', "page", "статья 1") is None
+
+
+def test_replace_and_reopen(tmp_path, cache):
+    cache.put('ru', "page", "Физика", "x" * 100)
+    cache.put('ru', "page", "Физика", "x" * 40)
+    assert cache.stats()['entries'] == 1
+    size = cache.stats()['bytes']
+    assert size == len('"' + "x" * 40 + '"')
+
+    reopened = PageCache(cache.db_path, ttl=60, max_bytes=1000)
+    try:
+        assert reopened.total_bytes == size
+        assert reopened.get('ru', "page", "физика") == "x" * 40
+        reopened.clear()
+        assert reopened.stats()['entries'] == 0 and reopened.total_bytes == 0
+    finally:
+        reopened.close()
@@ -0,0 +1,96 @@
+"""Фрагменты-ответы: нарезка статьи, выбор лучших фрагментов, хранение"""
+
+import pytest
+
+from kb_store import KnowledgeBaseStore, ArticleKey
+from normalizer import TextNormalizer, TOKEN_RE
+from passages import PassageIndex
+
+
+class IdentityStemmer:
+    def stem(self, token):
+        return token
+
+
+PHYSICS = ArticleKey('ru', "Физика")
+CHEMISTRY = ArticleKey('ru', "Химия")
+
+PHYSICS_TEXT = (
+    "Физика — естественная наука, изучающая общие законы природы и материи.\n\n"
+    "== История ==\n"
+    "Короткий абзац.\n\n"
+    "Первые физические теории появились в Древней Греции у Аристотеля. "
+    "Галилей заложил основы экспериментальной механики. "
+    "Ньютон сформулировал законы движения и всемирного тяготения. "
+    "Максвелл объединил электричество и магнетизм в одну теорию поля. "
+    "Эйнштейн создал теорию относительности и объяснил фотоэффект.\n\n"
+    "Квантовая механика описывает поведение атомов и элементарных частиц."
+)
+CHEMISTRY_TEXT = ("Химия изучает вещества, их состав, строение и превращения.\n\n"
+                  "Атомы соединяются в молекулы при химических реакциях веществ.")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = KnowledgeBaseStore(str(tmp_path / "knowledge_base.db"))
+    for key, text in ((PHYSICS, PHYSICS_TEXT), (CHEMISTRY, CHEMISTRY_TEXT)):
+        store.upsert_article(key.title, {'content': text, 'language': key.language})
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def passages(store):
+    return PassageIndex(store, TOKEN_RE.findall, TextNormalizer(IdentityStemmer(), set()),
+                        max_chars=160)
+
+
+def test_split(passages):
+    chunks = passages.split(PHYSICS_TEXT)
+    assert chunks[0].startswith("Физика — естественная наука")
+    assert not any("История" in chunk or chunk == "Короткий абзац." for chunk in chunks)
+    # Длинный абзац разрезан по границам предложений
+    assert all(len(chunk) <= 160 for chunk in chunks)
+    assert len(chunks) > 3
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert chunks[-1] == "Квантовая механика описывает поведение атомов и элементарных частиц."
+
+
+def test_best_passages(passages):
+    passages.add_article(PHYSICS, PHYSICS_TEXT)
+    passages.add_article(CHEMISTRY, CHEMISTRY_TEXT)
+
+    best = passages.best_passages("законы движения ньютон", [PHYSICS, CHEMISTRY], top_n=1)
+    assert len(best) == 1
+    key, text, score = best[0]
+    assert key == PHYSICS and "Ньютон сформулировал законы движения" in text and score > 0
+
+    best = passages.best_passages("атомы молекулы реакции", [PHYSICS, CHEMISTRY], top_n=2)
+    assert best[0][0] == CHEMISTRY and "молекулы" in best[0][1]
+    assert passages.best_passages("атомы", []) == []
+    assert passages.best_passages("кошка", [PHYSICS]) == []
+
+
+def test_term_weights(passages):
+    passages.add_article(PHYSICS, PHYSICS_TEXT)
+    # Вес редкого слова перевешивает частое
+    best = passages.best_passages("теорию механика", [PHYSICS], top_n=1,
+                                  term_weights=lambda stems: {'механика': 5.0})
+    assert "Квантовая механика" in best[0][1]
+
+
+def test_stored_and_lazy(store, passages):
+    passages.add_article(PHYSICS, PHYSICS_TEXT)
+    assert store.get_passages(PHYSICS.title) is not None
+    passages.forget()
+
+    # Новый экземпляр читает готовые фрагменты из хранилища
+    other = PassageIndex(store, TOKEN_RE.findall, passages.normalizer, max_chars=160)
+    chunks, matrix = other.get(PHYSICS)
+    assert chunks == passages.split(PHYSICS_TEXT) and matrix.shape[0] == len(chunks)
+
+    # Статья без фрагментов (добавлена до их появления) нарезается один раз
+    assert store.get_passages(CHEMISTRY.title) is None
+    chunks, _ = other.get(CHEMISTRY)
+    assert len(chunks) == 2 and store.get_passages(CHEMISTRY.title) is not None
+    assert other.get(ArticleKey('ru', "Нет такой")) == ([], None)
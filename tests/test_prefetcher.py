@@ -0,0 +1,86 @@
+"""Упреждающая загрузка результатов поиска: описания, полный текст, отмена"""
+
+import threading
+
+import pytest
+
+from prefetcher import Prefetcher
+
+
+class Wiki:
+    """Загрузки-заглушки: запоминают вызовы и ждут, пока их отпустят"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def fetch_summaries(self, titles, language):
+        self.calls.append(('summaries', tuple(titles), language))
+        self.started.set()
+        assert self.gate.wait(10)
+        return {title: f"описание: {title}" for title in titles}
+
+    def fetch_article(self, title, language):
+        self.calls.append(('article', title, language))
+        if title == "Нет такой":
+            raise LookupError(title)
+        return f"статья: {title}"
+
+
+@pytest.fixture
+def wiki():
+    return Wiki()
+
+
+@pytest.fixture
+def prefetcher(wiki):
+    prefetcher = Prefetcher(wiki.fetch_summaries, wiki.fetch_article, full=2, max_workers=1,
+                            rate=1000.0, max_summaries=3)
+    yield prefetcher
+    wiki.gate.set()
+    prefetcher.shutdown()
+    prefetcher.executor.shutdown(wait=True)
+
+
+def test_summaries_and_full_text(wiki, prefetcher):
+    prefetcher.prefetch(["Физика", "Химия", "Физика", "Нет такой"], language='en')
+    prefetcher.executor.shutdown(wait=True)
+    # Описания всех результатов одним запросом, полный текст - только первых full
+    assert wiki.calls == [('summaries', ("Физика", "Химия", "Нет такой"), 'en'),
+                          ('article', "Физика", 'en'), ('article', "Химия", 'en')]
+    assert prefetcher.summary("  физика ", language='en') == "описание: Физика"
+    assert prefetcher.summary("Физика") is None
+    assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+
+
+def test_new_search_cancels_pending(wiki, prefetcher):
+    wiki.gate.clear()
+    prefetcher.prefetch(["Физика", "Химия"])
+    assert wiki.started.wait(10)
+    prefetcher.prefetch(["Биология"])
+    wiki.gate.set()
+    prefetcher.executor.shutdown(wait=True)
+    # Загрузка статей первого поиска так и не началась
+    assert wiki.calls == [('summaries', ("Физика", "Химия"), 'ru'),
+                          ('summaries', ("Биология",), 'ru'), ('article', "Биология", 'ru')]
+
+
+def test_summaries_bounded(wiki, prefetcher):
+    prefetcher.full = 0
+    prefetcher.prefetch(["Аа", "Бб", "Вв", "Гг", "Дд"])
+    prefetcher.executor.shutdown(wait=True)
+    # Хранятся только max_summaries последних описаний
+    assert [prefetcher.summary(title) for title in ["Аа", "Бб", "Вв", "Гг", "Дд"]] == [
+        None, None, "описание: Вв", "описание: Гг", "описание: Дд"]
+
+
+def test_shutdown_cancels_pending(wiki, prefetcher):
+    wiki.gate.clear()
+    prefetcher.prefetch(["Физика", "Химия"])
+    assert wiki.started.wait(10)
+    prefetcher.shutdown()
+    wiki.gate.set()
+    prefetcher.executor.shutdown(wait=True)
+    assert wiki.calls == [('summaries', ("Физика", "Химия"), 'ru')]
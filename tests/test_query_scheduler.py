@@ -0,0 +1,93 @@
+"""Пул вопросов чата: объединение одинаковых вопросов и вытеснение старых"""
+
+import threading
+
+import pytest
+
+from query_scheduler import QueryScheduler
+
+
+class Handler:
+    """Отвечает на вопрос, когда его отпустят"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, query):
+        self.calls.append(query)
+        self.started.set()
+        assert self.gate.wait(10)
+        return f"ответ: {query}"
+
+
+@pytest.fixture
+def handler():
+    return Handler()
+
+
+@pytest.fixture
+def scheduler(handler):
+    scheduler = QueryScheduler(handler, max_workers=1)
+    yield scheduler
+    handler.gate.set()
+    scheduler.executor.shutdown(wait=True)
+
+
+class Answers:
+    def __init__(self):
+        self.items = []
+        self.done = threading.Event()
+
+    def callback(self, name):
+        def on_done(response):
+            self.items.append((name, response))
+            self.done.set()
+        return on_done
+
+
+def test_identical_questions_coalesce(handler, scheduler):
+    answers = Answers()
+    first = scheduler.submit("физика", "физика", on_done=answers.callback("а"))
+    assert handler.started.wait(10)
+    second = scheduler.submit("физика", "физика", on_done=answers.callback("б"))
+    assert first == second and scheduler.is_current(first)
+    assert scheduler.stats() == {'inflight': 1, 'coalesced': 1, 'dropped': 0}
+
+    handler.gate.set()
+    scheduler.executor.shutdown(wait=True)
+    assert handler.calls == ["физика"]
+    assert answers.items == [("а", "ответ: физика"), ("б", "ответ: физика")]
+    assert scheduler.stats()['inflight'] == 0
+
+
+def test_new_question_supersedes_old(handler, scheduler):
+    answers = Answers()
+    running = scheduler.submit("а", "а", on_done=answers.callback("а"))
+    assert handler.started.wait(10)
+    scheduler.submit("б", "б", on_done=answers.callback("б"))
+    latest = scheduler.submit("в", "в", on_done=answers.callback("в"))
+
+    # «б» ещё не начат - отменён сразу; «а» уже выполняется
+    assert scheduler.stats()['dropped'] == 1
+    assert not scheduler.is_current(running) and scheduler.is_current(latest)
+
+    handler.gate.set()
+    assert answers.done.wait(10)
+    scheduler.executor.shutdown(wait=True)
+    # Ответ на «а» отброшен, «б» не выполнялся вовсе
+    assert handler.calls == ["а", "в"]
+    assert answers.items == [("в", "ответ: в")]
+    assert scheduler.stats() == {'inflight': 0, 'coalesced': 0, 'dropped': 2}
+
+
+def test_shutdown_cancels_pending(handler, scheduler):
+    answers = Answers()
+    scheduler.submit("а", "а", on_done=answers.callback("а"))
+    assert handler.started.wait(10)
+    scheduler.shutdown()
+    handler.gate.set()
+    scheduler.executor.shutdown(wait=True)
+    assert answers.items == []
+    assert scheduler.stats()['inflight'] == 0
@@ -0,0 +1,30 @@
+"""Кэш ответов чата: LRU и сброс при изменении базы знаний"""
+
+from response_cache import ResponseCache
+
+
+def test_lru():
+    cache = ResponseCache(max_entries=2)
+    version = cache.version
+    assert cache.put("а", "ответ а", version) and cache.put("б", "ответ б", version)
+    assert cache.get("а") == "ответ а"           # «а» свежее «б»
+    cache.put("в", "ответ в", version)
+    assert cache.get("б") is None
+    assert cache.get("а") == "ответ а" and cache.get("в") == "ответ в"
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1}
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    cache.put("а", "ответ", cache.version)
+    cache.invalidate()
+    assert len(cache) == 0 and cache.get("а") is None
+
+
+def test_answer_from_old_version_not_stored():
+    cache = ResponseCache()
+    version = cache.version
+    # База изменилась, пока считался ответ
+    cache.invalidate()
+    assert not cache.put("а", "устаревший ответ", version)
+    assert cache.get("а") is None
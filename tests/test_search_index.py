@@ -0,0 +1,262 @@
+"""Индекс BM25: оценки против прямого подсчёта после удалений и уплотнения"""
+
+import math
+import time
+import random
+import threading
+from collections import Counter
+
+import pytest
+
+from kb_store import ArticleKey
+from normalizer import TextNormalizer
+from search_index import SearchIndex
+
+
+class IdentityStemmer:
+    def stem(self, token):
+        return token
+
+
+WORDS = ["физика", "химия", "энергия", "атом", "поле", "заряд", "волна", "масса",
+         "скорость", "свет", "теория", "опыт", "закон", "частица", "ядро"]
+
+
+def make_index(**options):
+    return SearchIndex(TextNormalizer(IdentityStemmer(), set()), **options)
+
+
+def make_documents(count, seed=1):
+    rng = random.Random(seed)
+    return {ArticleKey('ru', f"Статья {i}"): " ".join(rng.choices(WORDS, k=rng.randint(5, 40)))
+            for i in range(count)}
+
+
+def brute_force(index, documents, query, k1=1.5, b=0.75):
+    """BM25 прямым подсчётом по текстам статей"""
+    analyzed = {key: Counter(index.analyze(f"{key.title}\n{text}"))
+                for key, text in documents.items()}
+    n_docs = len(analyzed)
+    avgdl = max(sum(sum(c.values()) for c in analyzed.values()) / n_docs, 1.0)
+    scores = {}
+    for key, counts in analyzed.items():
+        length = sum(counts.values())
+        score = 0.0
+        for stem in set(index.analyze(query)):
+            tf = counts.get(stem, 0)
+            if not tf:
+                continue
+            df = sum(1 for c in analyzed.values() if stem in c)
+            idf = math.log1p((n_docs - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+        if score > 0:
+            scores[key] = score
+    return scores
+
+
+def assert_matches_brute_force(index, documents, queries=("физика атом", "свет волна заряд",
+                                                          "ядро", "теория опыт закон")):
+    for query in queries:
+        expected = brute_force(index, documents, query)
+        found = dict(index.search(query, top_k=len(documents) + 1))
+        assert found.keys() == expected.keys()
+        for key, score in expected.items():
+            assert found[key] == pytest.approx(score, rel=1e-4)
+
+
+def test_scores_match_brute_force():
+    index = make_index()
+    documents = make_documents(30)
+    for key, text in documents.items():
+        index.add_document(key, text)
+    assert len(index) == 30
+    assert_matches_brute_force(index, documents)
+
+
+def test_remove_replace_and_compact():
+    index = make_index(compact_threshold=10 ** 6)
+    documents = make_documents(40)
+    index.add_documents((key, text, '') for key, text in documents.items())
+
+    rng = random.Random(2)
+    for key in rng.sample(sorted(documents), 10):
+        assert index.remove_document(key)
+        del documents[key]
+    assert not index.remove_document(ArticleKey('ru', "Нет такой"))
+    for key in rng.sample(sorted(documents), 5):
+        documents[key] = "ядро ядро заряд частица " + documents[key][:20]
+        index.add_document(key, documents[key])
+    assert_matches_brute_force(index, documents)
+
+    index.compact()
+    assert index.tombstones == 0
+    assert_matches_brute_force(index, documents)
+
+    # Изменения после уплотнения живут в дельте поверх основного сегмента
+    key = ArticleKey('ru', "Статья новая")
+    documents[key] = "свет свет свет волна"
+    index.add_document(key, documents[key])
+    assert_matches_brute_force(index, documents)
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "knowledge_base.index")
+    index = make_index()
+    documents = make_documents(20)
+    for key, text in documents.items():
+        index.add_document(key, text, timestamp="2024-01-01")
+    index.compact()
+    key = ArticleKey('en', "Extra")
+    documents[key] = "атом атом поле"
+    index.add_document(key, documents[key])
+    index.save(path)
+
+    loaded = make_index()
+    assert loaded.load(path)
+    assert len(loaded) == 21 and key in loaded
+    assert_matches_brute_force(loaded, documents)
+    assert not make_index().load(str(tmp_path / "missing.index"))
+
+
+def test_sync_reindexes_only_changed():
+    index = make_index()
+    documents = make_documents(5)
+    for key, text in documents.items():
+        index.add_document(key, text, timestamp="1")
+
+    keys = sorted(documents)
+    metadata = {key: {'timestamp': "1"} for key in keys[1:]}
+    metadata[keys[1]] = {'timestamp': "2"}
+    documents[keys[1]] = "энергия масса"
+    read = []
+
+    def get_content(key):
+        read.append(key)
+        return documents[key]
+
+    assert index.sync(metadata, get_content) == 1
+    assert read == [keys[1]]
+    assert keys[0] not in index
+    assert dict(index.search("энергия масса"))[keys[1]] > 0
+
+
+def test_coverage():
+    index = make_index()
+    moscow = ArticleKey('ru', "Москва")
+    index.add_document(moscow, "Москва столица России город основана население численность")
+    coverage = index.coverage("численность населения Китая", [moscow])
+    assert 0 < coverage[moscow] < 0.5
+    assert index.coverage("москва столица", [moscow])[moscow] == pytest.approx(1.0)
+    assert index.coverage("москва", [ArticleKey('ru', "Нет такой")]) == {
+        ArticleKey('ru', "Нет такой"): 0.0}
+
+
+class PausedMatrix:
+    """Основной сегмент, уплотнение которого останавливается до сигнала"""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.started = threading.Event()
+        self.resume = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.matrix, name)
+
+    def tocoo(self):
+        self.started.set()
+        assert self.resume.wait(10)
+        return self.matrix.tocoo()
+
+
+def test_replacements_reuse_doc_ids():
+    index = make_index(compact_threshold=64)
+    documents = make_documents(10)
+    for _ in range(100):
+        for key, text in documents.items():
+            index.add_document(key, text)
+    index.compact()
+    assert index.next_doc_id == 10
+    assert len(index.doc_lengths) == 10 and index.main.shape[1] == 10
+    assert sorted(index.doc_ids.values()) == list(range(10))
+    assert_matches_brute_force(index, documents)
+
+
+def test_background_compaction():
+    index = make_index(compact_threshold=16)
+    documents = make_documents(40)
+    for key, text in documents.items():
+        index.add_document(key, text)
+    for _ in range(500):
+        with index._lock:
+            if not index._compacting:
+                break
+        time.sleep(0.01)
+    assert index.main.shape[1] > 0
+    assert_matches_brute_force(index, documents)
+
+
+def test_changes_during_compaction():
+    index = make_index(compact_threshold=10 ** 6)
+    documents = make_documents(30)
+    for key, text in documents.items():
+        index.add_document(key, text)
+    index.compact()
+    for key in sorted(documents)[:5]:
+        index.remove_document(key)
+        del documents[key]
+    index.main = paused = PausedMatrix(index.main)
+
+    thread = threading.Thread(target=index.compact)
+    thread.start()
+    assert paused.started.wait(10)
+    # Уплотнение идёт без блокировки: поиск и изменения продолжаются
+    assert_matches_brute_force(index, documents)
+    keys = sorted(documents)
+    for key in keys[:3]:
+        index.remove_document(key)
+        del documents[key]
+    documents[keys[5]] = "ядро ядро частица"
+    index.add_document(keys[5], documents[keys[5]])
+    for i in range(4):
+        key = ArticleKey('ru', f"Новая {i}")
+        documents[key] = "свет волна " * (i + 1)
+        index.add_document(key, documents[key])
+    paused.resume.set()
+    thread.join()
+
+    assert index.tombstones == 4              # удалённые и заменённая во время уплотнения
+    assert_matches_brute_force(index, documents)
+    index.compact()
+    assert index.tombstones == 0
+    assert index.next_doc_id == len(documents) == len(index)
+    assert_matches_brute_force(index, documents)
+
+
+def test_concurrent_updates():
+    index = make_index(compact_threshold=32)
+    documents = make_documents(200, seed=3)
+    keys = sorted(documents)
+    errors = []
+
+    def writer(part):
+        try:
+            for key in keys[part::4]:
+                index.add_document(key, documents[key])
+                index.search("физика атом")
+            for key in keys[part::8]:
+                index.remove_document(key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(part,)) for part in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    index.compact()
+
+    assert not errors
+    for key in keys[::8] + keys[1::8] + keys[2::8] + keys[3::8]:
+        documents.pop(key, None)
+    assert len(index) == len(documents)
+    assert_matches_brute_force(index, documents)
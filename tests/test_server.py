@@ -0,0 +1,93 @@
+"""Проверка параметров HTTP API до обращения к движку"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from kb_store import ArticleKey
+from server import ApiServer
+
+
+class FakeEngine:
+    """Движок-заглушка: запоминает вызовы, в сеть не ходит"""
+
+    def __init__(self):
+        self.calls = []
+        self.ready = threading.Event()
+        self.ready.set()
+        self.kb_lock = threading.Lock()
+        self.knowledge_base = {ArticleKey('ru', f"Статья {i}"): {'summary': str(i)}
+                               for i in range(10)}
+
+    def generate_response(self, query, language='ru'):
+        self.calls.append(('ask', query, language))
+        return "ответ"
+
+    def fetch_search_results(self, query, language='ru'):
+        self.calls.append(('wiki', query, language))
+        return ["Физика"]
+
+    def search_articles(self, query, limit=5):
+        self.calls.append(('search', query, limit))
+        return []
+
+    def fetch_and_index_article(self, title, language='ru'):
+        self.calls.append(('add', title, language))
+        raise AssertionError("не должно вызываться")
+
+
+@pytest.fixture
+def api():
+    server = ApiServer(FakeEngine(), workers=2)
+    yield server
+    server.close()
+
+
+def request(api, method, target, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    return asyncio.run(api.dispatch(method, target, body))
+
+
+@pytest.mark.parametrize("method, target, payload", [
+    ("GET", "/ask?q=физика&language=127.0.0.1:9/x?", None),
+    ("GET", "/search?q=физика&wikipedia=1&language=evil.example", None),
+    ("POST", "/kb", {'title': "Физика", 'language': "evil.example/x?"}),
+    ("POST", "/ask", {'q': "физика", 'language': None}),
+])
+def test_unknown_language(api, method, target, payload):
+    status, body = request(api, method, target, payload)
+    assert status == 400 and "язык" in body['error']
+    assert api.engine.calls == []
+
+
+@pytest.mark.parametrize("payload", [
+    {'title': 5}, {'title': "Физика", 'language': ["ru"]}, {'title': {"a": 1}},
+])
+def test_wrong_types_in_body(api, payload):
+    status, body = request(api, "POST", "/kb", payload)
+    assert status == 400
+    assert api.engine.calls == []
+
+
+def test_wrong_types_for_search(api):
+    assert request(api, "POST", "/ask", {'q': 5})[0] == 400
+    assert request(api, "POST", "/ask", [1, 2])[0] == 400
+    assert request(api, "GET", "/search?q=физика&limit=много")[0] == 400
+    assert api.engine.calls == []
+
+
+def test_valid_requests(api):
+    assert request(api, "POST", "/ask", {'q': "физика", 'language': "en"}) == (
+        200, {'query': "физика", 'language': "en", 'response': "ответ"})
+    status, body = request(api, "GET", "/search?q=физика&limit=3")
+    assert status == 200 and body['results'] == []
+    assert api.engine.calls == [('ask', "физика", "en"), ('search', "физика", 3)]
+
+
+def test_list_articles_page(api):
+    status, body = request(api, "GET", "/kb?offset=8&limit=5")
+    assert status == 200 and body['total'] == 10 and body['offset'] == 8
+    assert [article['title'] for article in body['articles']] == ["Статья 8", "Статья 9"]
+    assert request(api, "GET", "/kb?offset=20")[1]['articles'] == []
@@ -0,0 +1,83 @@
+"""Нечёткий поиск по заголовкам: опечатки, перенаправления, удаление и уплотнение"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+from kb_store import ArticleKey
+from title_index import TitleIndex, normalize_title, trigrams
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AI = ArticleKey('ru', "Искусственный интеллект")
+MOSCOW = ArticleKey('ru', "Москва")
+MOSCOW_EN = ArticleKey('en', "Moscow")
+
+
+@pytest.fixture
+def index():
+    index = TitleIndex()
+    index.add(AI, [AI.title, "ИИ", "Машинный интеллект"])
+    index.add(MOSCOW, [MOSCOW.title, "Москва (город)"])
+    index.add(MOSCOW_EN, [MOSCOW_EN.title])
+    return index
+
+
+def test_normalize_title():
+    assert normalize_title("  Ёжик_в   тумане (мультфильм)!") == "ежик в тумане мультфильм"
+    assert trigrams("ии") == {"  и", " ии", "ии "}
+
+
+def test_typos(index):
+    key, score = index.match("искуственный интелект")[0]
+    assert key == AI and 0.6 < score < 1
+    assert index.match("Москва")[0] == (MOSCOW, pytest.approx(1.0))
+    assert index.match("moskow")[0][0] == MOSCOW_EN
+    assert index.match("квантовая хромодинамика") == []
+    assert index.match("!!!") == []
+
+
+def test_redirects_and_best_variant(index):
+    key, score = index.match("машиный интелект")[0]
+    assert key == AI
+    # Статья встречается один раз, с лучшим из своих вариантов
+    matches = index.match("москва город", limit=5)
+    assert [key for key, _ in matches].count(MOSCOW) == 1
+    assert matches[0] == (MOSCOW, pytest.approx(1.0))
+    assert len(index.match("москва", limit=1)) == 1
+
+
+def test_remove_replace_clear(index):
+    index.remove(MOSCOW)
+    assert all(key != MOSCOW for key, _ in index.match("москва"))
+    assert len(index) == 2
+
+    index.add(AI, ["Искусственный разум"])
+    assert all(score < 0.9 for _, score in index.match("искусственный интеллект"))
+    assert index.match("искусственный разум")[0] == (AI, pytest.approx(1.0))
+
+    index.clear()
+    assert len(index) == 0 and index.match("искусственный разум") == []
+
+
+def test_compaction_keeps_results():
+    index = TitleIndex()
+    for round_number in range(3):
+        for i in range(800):
+            index.add(ArticleKey('ru', f"Статья {i}"), [f"Статья номер {i} версия {round_number}"])
+    # Удалённые варианты вычищены, списки не растут с каждой заменой
+    assert len(index._keys) < 2 * 800
+    assert index.match("статья номер 17 версия 2")[0] == (ArticleKey('ru', "Статья 17"),
+                                                         pytest.approx(1.0))
+    assert len(index) == 800
+
+
+def test_no_heavy_imports():
+    # Индекс заголовков не тянет за собой scipy и поисковый индекс
+    code = "import sys, title_index; print(sorted({'scipy', 'search_index'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,139 @@
+import re
+import threading
+
+import numpy as np
+
+from array_utils import grow_array
+from instrumentation import timed
+
+
+NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(text):
+    """Заголовок для сравнения: нижний регистр, ё -> е, только слова через пробел"""
+    return " ".join(NON_WORD_RE.sub(" ", text.lower().replace("ё", "е")).split())
+
+
+def trigrams(text):
+    """Множество триграмм строки; каждое слово дополняется пробелами по краям"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleIndex:
+    """Нечёткий поиск статей по заголовкам и перенаправлениям (триграммы)
+
+    Находит «Искусственный интеллект» по запросу «искуственный интелект»
+    без обращения к Википедии. Списки вариантов для каждой триграммы
+    хранятся в растущих массивах numpy, поэтому добавление статьи дёшево,
+    а общие триграммы считаются сортировкой склеенных списков и подсчётом
+    длин серий одинаковых номеров. Удалённые варианты помечаются
+    и вычищаются уплотнением.
+    """
+
+    def __init__(self, min_similarity=0.45):
+        self.min_similarity = min_similarity
+        self._postings = {}     # триграмма -> [массив номеров вариантов, длина]
+        self._keys = []         # номер варианта -> ключ статьи
+        self._sizes = np.zeros(0, dtype=np.int32)    # число триграмм варианта
+        self._alive = np.zeros(0, dtype=bool)
+        self._by_key = {}       # ключ статьи -> [(номер варианта, нормализованное имя)]
+        self._dead = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def add(self, key, names):
+        """Добавить (или заменить) статью key под названиями names (заголовок и перенаправления)"""
+        with self._lock:
+            self._remove(key)
+            ids = []
+            for normalized in dict.fromkeys(normalize_title(name) for name in names):
+                if normalized:
+                    ids.append((self._add_variant(key, trigrams(normalized)), normalized))
+            self._by_key[key] = ids
+            if self._dead > max(len(self._keys) // 2, 1024):
+                self._compact()
+
+    def _add_variant(self, key, grams):
+        variant_id = len(self._keys)
+        self._keys.append(key)
+        self._sizes = grow_array(self._sizes, variant_id + 1)
+        self._alive = grow_array(self._alive, variant_id + 1)
+        self._sizes[variant_id] = len(grams)
+        self._alive[variant_id] = True
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = [np.zeros(4, dtype=np.int32), 0]
+            posting[0] = grow_array(posting[0], posting[1] + 1)
+            posting[0][posting[1]] = variant_id
+            posting[1] += 1
+        return variant_id
+
+    def remove(self, key):
+        """Убрать статью из индекса"""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        for variant_id, _ in self._by_key.pop(key, ()):
+            self._alive[variant_id] = False
+            self._dead += 1
+
+    def _compact(self):
+        """Перестроить индекс без удалённых вариантов"""
+        variants = self._by_key
+        self._postings, self._keys, self._dead = {}, [], 0
+        self._sizes = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._by_key = {}
+        for key, names in variants.items():
+            self._by_key[key] = [(self._add_variant(key, trigrams(name)), name)
+                                   for _, name in names]
+
+    def clear(self):
+        """Очистить индекс"""
+        with self._lock:
+            self._postings, self._keys, self._by_key, self._dead = {}, [], {}, 0
+            self._sizes = np.zeros(0, dtype=np.int32)
+            self._alive = np.zeros(0, dtype=bool)
+
+    @timed("index.title")
+    def match(self, query, limit=5):
+        """Статьи с похожими названиями: [(ключ статьи, сходство 0..1)] по убыванию
+
+        Сходство - коэффициент Дайса по триграммам; для каждой статьи
+        берётся лучший из её вариантов (заголовок или перенаправление).
+        """
+        grams = trigrams(normalize_title(query))
+        if not grams:
+            return []
+
+        with self._lock:
+            parts = [posting[0][:posting[1]] for posting in map(self._postings.get, grams)
+                     if posting is not None]
+            if not parts:
+                return []
+            # Число общих триграмм для каждого варианта, встретившегося в списках
+            ids = np.sort(np.concatenate(parts))
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            ids, shared = ids[starts], np.diff(np.r_[starts, len(ids)])
+            similarity = 2.0 * shared / (len(grams) + self._sizes[ids])
+            keep = (similarity >= self.min_similarity) & self._alive[ids]
+            ids, similarity = ids[keep], similarity[keep]
+
+            best = {}
+            for variant_id, score in zip(ids[np.argsort(-similarity)], np.sort(similarity)[::-1]):
+                key = self._keys[variant_id]
+                if key not in best:
+                    best[key] = float(score)
+                    if len(best) >= limit:
+                        break
+
+        return list(best.items())